@@ -1,13 +1,25 @@
 from .action import *
 from .activity import *
+from .asyncExecutor import *
+from .codegen import *
+from .compiler import *
+from .configuration import *
 from .context import *
+from .deferral import *
 from .event import *
+from .eventDescriptor import *
+from .eventQueue import *
 from .exceptions import *
 from .executableContent import *
 from .executor import *
 from .helper import *
 from .listeners import *
+from .modelIndex import *
 from .reader import *
+from .registry import *
+from .scheduler import *
+from .session import *
 from .state import *
 from .stateMachine import *
+from .streamReader import *
 from .transition import *
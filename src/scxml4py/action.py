@@ -4,9 +4,11 @@
 
 '''
 
-import logging
+import scxml4py.trace
 from functools import total_ordering
 
+logger = scxml4py.trace.logger
+
 @total_ordering
 class Action(object):
     def __init__(self, theId, theEventQueue = None, theData = None):
@@ -41,7 +43,7 @@ class Action(object):
 
     def sendInternalEvent(self, theEvent):
         if self.mEventQueue != None and theEvent != None:
-            logging.getLogger("scxml4py").debug("Triggering internal event <" + theEvent.__str__() + ">") 
+            logger.debug("Triggering internal event <%s>", theEvent)
             self.mEventQueue.put(theEvent, True, 2)
         
     def execute(self, theCtx):
@@ -49,4 +51,16 @@ class Action(object):
     
     def evaluate(self, theCtx):
         return False
+
+    def isPure(self):
+        """
+        A guard is pure when its result depends only on the context and
+        does not change during a microstep unless the context changes.
+        The result of pure guards is memoized when enabled in the
+        context (see Context.setGuardCacheEnabled), then they are also
+        assumed not to change until the context data changes (see
+        Context.getDataVersion) and event-less transitions found disabled
+        are not evaluated again.
+        """
+        return False
     
\ No newline at end of file
@@ -5,10 +5,11 @@
 '''
 
 import asyncio
+import copy
 import threading
-import logging
+import scxml4py.trace
 
-logger = logging.getLogger("scxml4py")
+logger = scxml4py.trace.logger
 
 class AbstractActivity(object):
     def __init__(self, theId, theEventQueue = None, theData = None):
@@ -16,10 +17,22 @@ class AbstractActivity(object):
         self.mIsRunning = False
         self.mEventQueue = theEventQueue # queue to post internal events
         self.mData = theData # shared data with other actions and activities
+        self.mOwner = None # session using this instance, see Session.getActivity
         
     def __str__(self):
         return str(self.mId)
 
+    def createInstance(self):
+        """
+        Return a new instance of the activity for another session sharing
+        the model. By default a shallow copy sharing the event queue and
+        the data, without runtime information.
+        """
+        instance = copy.copy(self)
+        instance.mIsRunning = False
+        instance.mOwner = None
+        return instance
+
     def getId(self):
         return self.mId
 
@@ -28,7 +41,7 @@ class AbstractActivity(object):
     
     def sendInternalEvent(self, theEvent):
         if self.mEventQueue and theEvent:
-            logger.debug("Activity <%s>: Triggering internal event <%s>"%(self, theEvent)) 
+            logger.debug("Activity <%s>: Triggering internal event <%s>", self, theEvent) 
             self.mEventQueue.put(theEvent, True, 2)
     
     def isRunning(self):
@@ -56,24 +69,29 @@ class ThreadedActivity(AbstractActivity):
     def __init__(self, theId, theEventQueue = None, theData = None):
         super(ThreadedActivity, self).__init__(theId, theEventQueue, theData)
         self.mThread = None
+
+    def createInstance(self):
+        instance = AbstractActivity.createInstance(self)
+        instance.mThread = None
+        return instance
         
     def start(self):
         if self.mThread and self.mThread.is_alive():
-            logger.debug("Activity <%s> already started"%self)
+            logger.debug("Activity <%s> already started", self)
             return
         
-        logger.debug("Starting activity <%s>"%self)
+        logger.debug("Starting activity <%s>", self)
         self.mThread = threading.Thread(target=self.run)
         self.setRunning(True)
         self.mThread.start()
     
     def stop(self):
         if self.mThread and self.isRunning():
-            logger.debug("Stopping activity <%s>"%self)
+            logger.debug("Stopping activity <%s>", self)
             self.setRunning(False)
             self.mThread.join() # #TODO specify timeout?
         else:
-            logger.debug("Activity <%s> already stopped"%self)
+            logger.debug("Activity <%s> already stopped", self)
         
     def run(self):
         # this method has to be implemented in the specialized activity class
@@ -90,20 +108,44 @@ class CoroActivity(AbstractActivity):
     def __init__(self, evid, queue=None, data=None):
         super(CoroActivity, self).__init__(evid, queue, data)
         self.mTask = None
+        self.mLoop = None # owning event loop, if None the current one is used
+
+    def createInstance(self):
+        instance = AbstractActivity.createInstance(self)
+        instance.mTask = None
+        return instance
+
+    def getLoop(self):
+        return self.mLoop
+
+    def setLoop(self, theLoop):
+        self.mLoop = theLoop
 
     def start(self):
-        logger.debug("Starting activity <%s>"%self)
-        self.mTask = asyncio.ensure_future(self.run())
+        logger.debug("Starting activity <%s>", self)
+        if self.mLoop == None:
+            self.mTask = asyncio.ensure_future(self.run())
+        elif self.isOwningLoopRunning():
+            self.mTask = self.mLoop.create_task(self.run())
+        else:
+            # started from another thread (e.g. a threaded Executor)
+            self.mTask = asyncio.run_coroutine_threadsafe(self.run(), self.mLoop)
         self.setRunning(True)
 
+    def isOwningLoopRunning(self):
+        try:
+            return asyncio.get_running_loop() is self.mLoop
+        except RuntimeError:
+            return False
+
     def stop(self):
         if self.mTask and self.isRunning():
-            logger.debug("Stopping activity <%s>"%self)
+            logger.debug("Stopping activity <%s>", self)
             self.mTask.cancel()
             self.mTask = None
             self.setRunning(False)
         else:
-            logger.debug("Activity already stopped <%s>"%self)
+            logger.debug("Activity already stopped <%s>", self)
 
     async def run(self):
         """ Implemented by concrete classes """
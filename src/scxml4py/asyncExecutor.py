@@ -0,0 +1,264 @@
+'''
+    asyncExecutor module part of scxml4py.
+
+    @authors: landolfa
+'''
+
+import asyncio
+from array import array
+from contextlib import asynccontextmanager
+import scxml4py.helper
+import scxml4py.trace
+from scxml4py.activity import CoroActivity
+from scxml4py.eventQueue import QueueType
+from scxml4py.executor import Executor
+
+logger = scxml4py.trace.logger
+
+
+class AsyncExecutor(Executor):
+    """
+    Executor to be used within an asyncio event loop.
+
+    start, stop, processEvent and processEvents are coroutines, the actions
+    and the guards can be either plain methods or coroutines (async def
+    execute/evaluate). By default the queues are asyncio queues, see
+    scxml4py.eventQueue.AsyncQueue.
+    The CoroActivity of the model are scheduled on the loop running start.
+
+    The step semantics is the same as the one of the Executor: the
+    selection of the transitions and the computation of the states to
+    exit and enter are shared, only the execution of the executable
+    content awaits the coroutines.
+    Concurrent calls to processEvent are serialized so that each event
+    is processed with run-to-completion semantics. An action may await
+    processEvent: the event is queued and processed once the current
+    one has been processed.
+    """
+
+    def __init__(self, theStateMachine, theContext, externalEventQueue = None, internalEventQueue = None, theQueueType = QueueType.ASYNC, theSession = None):
+        Executor.__init__(self, theStateMachine, theContext, externalEventQueue, internalEventQueue, theQueueType, theSession)
+        self.mLoop = None
+        self.mLock = asyncio.Lock()
+        self.mLockOwner = None # task processing the events, see isReentrant
+        self.mStopPending = False # stop awaited by an action, see stop
+
+    def getLoop(self):
+        return self.mLoop
+
+    async def isEventProcessable(self, e):
+        self.updateIndex()
+        self.updateTrace()
+        enabledTransitions = await self.selectTransitions(e)
+        return enabledTransitions.__len__() > 0
+
+    @asynccontextmanager
+    async def serialize(self):
+        """
+        Hold the lock which serializes the processing of the events,
+        see isReentrant. The interpreter is exited before the lock is
+        released if an action has stopped the execution.
+        """
+        async with self.mLock:
+            self.mLockOwner = asyncio.current_task()
+            try:
+                yield
+                if self.mStopPending:
+                    await self.exitExecution()
+            finally:
+                self.mLockOwner = None
+
+    def isReentrant(self):
+        """
+        True when called by the task holding the lock, i.e. from an action
+        or a guard awaited by the executor: the lock is not reentrant.
+        """
+        return self.mLockOwner is not None and self.mLockOwner is asyncio.current_task()
+
+    async def start(self):
+        self.mLoop = asyncio.get_running_loop()
+        transList = self.initializeExecution()
+        self.bindActivities()
+        if transList.__len__() == 0:
+            return
+        async with self.serialize():
+            await self.executeTransitionContent(transList)
+            await self.enterStates(transList)
+            await self.processInternalEvents()
+        self.notifyStatusListeners(self.mCurrentStatus)
+
+    def bindActivities(self):
+        # coroutine based activities run on the loop of the executor
+        for s in self.mIndex.getStates():
+            for a in self.mSession.getActivities(s):
+                if isinstance(a, CoroActivity):
+                    a.setLoop(self.mLoop)
+
+    async def stop(self):
+        """
+        See Executor.stop.
+        When awaited by an action or a guard, no further event is processed
+        and the interpreter is exited once the current microstep has been
+        completed, by the call which is running the action.
+        """
+        if self.isReentrant():
+            self.mContinue = False
+            self.mStopPending = True
+            return
+        async with self.serialize():
+            await self.exitExecution()
+
+    async def exitExecution(self):
+        logger.debug("Stopping execution of <%s>", self.mStateMachine.getId())
+        self.mContinue = False
+        await self.exitInterpreter()
+        self.releaseExecution()
+        self.mStopPending = False
+
+    async def exitInterpreter(self):
+        statesToExit = self.computeInterpreterExitSet()
+        for s in statesToExit:
+            await s.getExitActions().executeAsync(self.mContext)
+            self.mSession.cancelActivities(s)
+        self.completeInterpreterExit(statesToExit)
+
+    def postEvent(self, theEvent):
+        if self.mTrace:
+            logger.debug("Adding event <%s> to the external queue", theEvent.getId())
+        self.mExternalEvents.put_nowait(theEvent)
+
+    async def processEvent(self, theEvent):
+        self.updateTrace()
+        self.postEvent(theEvent)
+        await self.processEvents()
+
+    async def processEvents(self):
+        """
+        See Executor.processEvents.
+        When awaited by an action or a guard, the events are left in the
+        queue: they are processed, once the current event has been
+        processed, by the call which is running the action.
+        """
+        if self.checkRunning() == False or self.isReentrant():
+            return
+        async with self.serialize():
+            self.updateIndex()
+            self.updateTrace()
+            for e in self.iterMacrosteps():
+                await self.processMacrostep(e)
+
+    async def processEventBatch(self, theEvents, isNotificationAccumulated = False):
+        """
+        See Executor.processEventBatch.
+        When awaited by an action or a guard, the events are posted to the
+        external queue (see processEvents) and no status is returned.
+        """
+        statuses = array("B")
+        if self.checkRunning() == False:
+            return statuses
+        if self.isReentrant():
+            for e in theEvents:
+                self.postEvent(e)
+            return statuses
+        async with self.serialize():
+            self.updateIndex()
+            self.updateTrace()
+            for e in self.iterMacrosteps():
+                await self.processMacrostep(e)
+            processedEvents = list()
+            with self.accumulateNotifications(isNotificationAccumulated, processedEvents):
+                for e in self.iterBatch(theEvents, statuses, processedEvents):
+                    await self.processMacrostep(e)
+            # events posted by the actions of the batch
+            for e in self.iterMacrosteps():
+                await self.processMacrostep(e)
+        return statuses
+
+    async def processMacrostep(self, externalEvent):
+        if externalEvent is not None:
+            await self.processExternalEvent(externalEvent)
+        if self.mInternalEvents.empty() == False:
+            await self.processInternalEvents()
+
+    async def processExternalEvent(self, externalEvent):
+        self.setCurrentEvent(externalEvent, "external")
+        enabledTransitions = await self.selectTransitions(externalEvent)
+        if enabledTransitions.__len__() > 0:
+            await self.microstep(enabledTransitions)
+            await self.processInternalEvents()
+        self.completeExternalEvent(externalEvent, enabledTransitions.__len__() > 0)
+
+    async def processInternalEvents(self):
+        macroStepCompleted = False
+        while macroStepCompleted == False and self.mContinue:
+            enabledTransitions = await self.selectEventlessTransitions()
+            if enabledTransitions.__len__() == 0:
+                internalEvent = self.nextInternalEvent()
+                if internalEvent != None:
+                    enabledTransitions = await self.selectTransitions(internalEvent)
+                else:
+                    macroStepCompleted = True
+            if enabledTransitions.__len__() != 0:
+                await self.microstep(enabledTransitions)
+
+    async def selectEventlessTransitions(self):
+        enabledTransitions = list()
+        mask = self.getEventlessStates()
+        if mask == 0:
+            return enabledTransitions
+        for s, candidates in self.iterCandidates(self.mCurrentStatus.iterStates(mask), None, enabledTransitions):
+            if await self.enableTransition(candidates, enabledTransitions) == False:
+                self.disableEventless(s)
+        if self.mTrace:
+            logger.debug("Selected event-less transitions:\n%s", scxml4py.helper.formatTransitions(enabledTransitions))
+        return enabledTransitions
+
+    async def selectTransitions(self, e):
+        enabledTransitions = list()
+        eventId = e.getId()
+        for s, candidates in self.iterCandidates(self.mCurrentStatus.getAtomicStates(), eventId, enabledTransitions):
+            await self.enableTransition(candidates, enabledTransitions)
+        if self.mTrace:
+            logger.debug("Selected transitions on event <%s>:\n%s", eventId, scxml4py.helper.formatTransitions(enabledTransitions))
+        return enabledTransitions
+
+    async def enableTransition(self, candidates, enabledTransitions):
+        # see Executor.enableTransition
+        isEnabled = False
+        for t in candidates:
+            if await t.getConditions().evaluateAsync(self.mContext) == True:
+                isEnabled = True
+                if scxml4py.helper.isTransitionInList(t, enabledTransitions) == False:
+                    enabledTransitions.append(t)
+                    break
+        return isEnabled
+
+    async def microstep(self, enabledTransitions):
+        # see Executor.microstep
+        self.mContext.invalidateGuardResults()
+        await self.exitStates(enabledTransitions)
+        await self.executeTransitionContent(enabledTransitions)
+        await self.enterStates(enabledTransitions)
+
+    async def exitStates(self, enabledTransitions):
+        for s in self.computeExitSet(enabledTransitions):
+            if self.mTrace:
+                logger.debug("Exiting state <%s> (%s)", s.getId(), s.getType())
+            await s.getExitActions().executeAsync(self.mContext)
+            self.removeFromStatus(s)
+
+    async def executeTransitionContent(self, enabledTransitions):
+        for t in enabledTransitions:
+            await t.getActions().executeAsync(self.mContext)
+
+    async def enterStates(self, enabledTransitions):
+        statesToEnter, statesForDefaultEntry = self.computeEntrySet(enabledTransitions)
+        if statesForDefaultEntry.__len__() > 0:
+            statesForDefaultEntry = set(statesForDefaultEntry)
+        for s in statesToEnter:
+            self.addToStatus(s)
+            await s.getEntryActions().executeAsync(self.mContext)
+            if s in statesForDefaultEntry:
+                for t in s.getInitialTrans():
+                    await t.getActions().executeAsync(self.mContext)
+            self.checkFinalStates(s)
@@ -0,0 +1,374 @@
+'''
+    benchmark module part of scxml4py.
+
+    Micro and macro benchmarks of the interpreter:
+
+        python -m scxml4py.benchmark --depth 3 --fanout 3 --regions 4 --output result.json
+        python -m scxml4py.benchmark --model test/models/scxmlShutter.xml \
+            --events INIT,INITCLOSED,ENABLE,OPEN,ISOPEN,CLOSE,ISCLOSED,DISABLE,DISABLECLOSED,RESET
+        python -m scxml4py.benchmark --compare previous.json --tolerance 0.1
+        python -m scxml4py.benchmark --generated
+
+    The report is written as JSON so that it can be compared with the
+    results of previous runs.
+
+    @authors: landolfa
+'''
+
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import xml.etree.ElementTree as ET
+import scxml4py.trace
+from scxml4py.action import Action
+from scxml4py.activity import AbstractActivity
+from scxml4py.codegen import GeneratedExecutor
+from scxml4py.context import Context
+from scxml4py.event import Event
+from scxml4py.eventQueue import QueueType
+from scxml4py.executor import Executor
+from scxml4py.reader import Reader
+
+REPORT_VERSION = 1
+
+SCXML_NS = "http://www.w3.org/2005/07/scxml"
+CUSTOM_NS = "http://my.custom-actions.domain/CUSTOM"
+
+
+class GuardStub(Action):
+    """
+    Guard that is always true, used to bind the 'cond' of benchmark models.
+    """
+    def evaluate(self, theCtx):
+        return True
+
+
+class ActivityStub(AbstractActivity):
+    """
+    Activity without thread, used to bind the 'invoke' of benchmark models.
+    """
+    def start(self):
+        self.setRunning(True)
+
+    def stop(self):
+        self.setRunning(False)
+
+
+class TimedExecutor(Executor):
+    """
+    Executor recording the duration of each microstep.
+    """
+    def __init__(self, theStateMachine, theContext):
+        super().__init__(theStateMachine, theContext, theQueueType = QueueType.SIMPLE)
+        self.mMicrostepTimes = list()
+
+    def microstep(self, enabledTransitions):
+        t0 = time.perf_counter()
+        super().microstep(enabledTransitions)
+        self.mMicrostepTimes.append(time.perf_counter() - t0)
+
+
+class TimedGeneratedExecutor(TimedExecutor, GeneratedExecutor):
+    """
+    GeneratedExecutor recording the duration of each microstep.
+    """
+    pass
+
+
+def createStubs(text):
+    """
+    Create the actions, guards and activities referenced by an SCXML document.
+    """
+    root = ET.fromstring(text)
+    actions = {}
+    activities = {}
+    for element in root.iter():
+        theId = element.attrib.get("cond")
+        if theId != None and theId not in actions:
+            actions[theId] = GuardStub(theId)
+        if element.tag == "{" + SCXML_NS + "}invoke":
+            theId = element.attrib.get("id")
+            if theId != None and theId not in activities:
+                activities[theId] = ActivityStub(theId)
+        elif element.tag.startswith("{" + SCXML_NS + "}") == False:
+            theId = element.attrib.get("name")
+            if theId != None and theId not in actions:
+                actions[theId] = Action(theId)
+    return list(actions.values()), list(activities.values())
+
+
+def generateModel(depth, fanout, regions, guardDensity):
+    """
+    Generate a synthetic SCXML model.
+
+    Each region is a tree of compound states of the given depth and fan-out.
+    Each atomic state has a transition on the event 'next' to the following
+    atomic state of the same region (cyclic), so that 'next' walks through
+    all the leaves, exiting and entering the compound states in between.
+    A fraction guardDensity of the transitions is guarded.
+    All states have entry and exit actions, transitions have an action.
+    With regions > 0 the regions are children of the parallel state 'ROOT',
+    otherwise 'ROOT' is a single compound state.
+    Returns the SCXML text and the list of events to send.
+    """
+    counters = {"transitions": 0}
+
+    def leaves(prefix, level):
+        if level == depth:
+            return [prefix]
+        result = list()
+        for n in range(fanout):
+            result.extend(leaves(prefix + "_" + str(n), level + 1))
+        return result
+
+    def guard():
+        i = counters["transitions"]
+        counters["transitions"] += 1
+        if int((i + 1) * guardDensity) > int(i * guardDensity):
+            return ' cond="guard"'
+        return ''
+
+    def state(prefix, level, nextLeaf, indent):
+        tmp = indent + '<state id="' + prefix + '">\n'
+        tmp += indent + '  <onentry><customActionDomain:entry name="entry"/></onentry>\n'
+        tmp += indent + '  <onexit><customActionDomain:exit name="exit"/></onexit>\n'
+        if level == depth:
+            tmp += indent + '  <transition event="next" target="' + nextLeaf[prefix] + '"' + guard() + '>\n'
+            tmp += indent + '    <customActionDomain:trans name="trans"/>\n'
+            tmp += indent + '  </transition>\n'
+        else:
+            tmp += indent + '  <initial><transition target="' + prefix + '_0"/></initial>\n'
+            for n in range(fanout):
+                tmp += state(prefix + "_" + str(n), level + 1, nextLeaf, indent + "  ")
+        tmp += indent + '</state>\n'
+        return tmp
+
+    def region(prefix, indent):
+        leafIds = leaves(prefix, 0)
+        nextLeaf = {}
+        for i in range(leafIds.__len__()):
+            nextLeaf[leafIds[i]] = leafIds[(i + 1) % leafIds.__len__()]
+        return state(prefix, 0, nextLeaf, indent)
+
+    text = '<?xml version="1.0" encoding="us-ascii"?>\n'
+    text += '<scxml xmlns="' + SCXML_NS + '" xmlns:customActionDomain="' + CUSTOM_NS + '" '
+    text += 'version="1.0" initial="ROOT" name="synthetic">\n'
+    if regions > 0:
+        text += '  <parallel id="ROOT">\n'
+        for r in range(regions):
+            text += region("R" + str(r), "    ")
+        text += '  </parallel>\n'
+    else:
+        text += region("ROOT", "  ")
+    text += '</scxml>\n'
+    return text, ["next"]
+
+
+def percentile(values, p):
+    if values.__len__() == 0:
+        return 0.0
+    values = sorted(values)
+    return values[int(round(p / 100.0 * (values.__len__() - 1)))]
+
+
+class Benchmark(object):
+    """
+    Run one benchmark: parse the model, optionally clone a parallel state,
+    send the events and collect the measurements.
+    """
+    def __init__(self, theName, theText, theEvents, theRepeat = 100):
+        self.mName = theName
+        self.mText = theText
+        self.mEvents = theEvents
+        self.mRepeat = theRepeat
+        self.mClones = 0
+        self.mCloneRoot = None
+        self.mIsGenerated = False
+
+    def setClones(self, numberOfClones, rootStateAbsId):
+        self.mClones = numberOfClones
+        self.mCloneRoot = rootStateAbsId
+
+    def setGenerated(self, isGenerated):
+        # run the model with the GeneratedExecutor (see scxml4py.codegen)
+        self.mIsGenerated = isGenerated
+
+    def getName(self):
+        if self.mIsGenerated:
+            return self.mName + "-generated"
+        return self.mName
+
+    def load(self):
+        actions, activities = createStubs(self.mText)
+        t0 = time.perf_counter()
+        sm = Reader().readString(self.mName, self.mText, actions, activities)
+        parseTime = time.perf_counter() - t0
+        cloneTime = 0.0
+        if self.mClones > 0:
+            t0 = time.perf_counter()
+            sm.cloneParallel(self.mClones, self.mCloneRoot, {}, {})
+            cloneTime = time.perf_counter() - t0
+        return sm, parseTime, cloneTime
+
+    def measureMemory(self):
+        tracemalloc.start()
+        try:
+            sm, parseTime, cloneTime = self.load()
+            if self.mIsGenerated:
+                executor = GeneratedExecutor(sm, Context(), theQueueType = QueueType.SIMPLE)
+            else:
+                executor = Executor(sm, Context(), theQueueType = QueueType.SIMPLE)
+            executor.start()
+            for e in self.mEvents:
+                executor.processEvent(Event(e))
+            executor.stop()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak
+
+    def run(self):
+        sm, parseTime, cloneTime = self.load()
+        if self.mIsGenerated:
+            executor = TimedGeneratedExecutor(sm, Context())
+        else:
+            executor = TimedExecutor(sm, Context())
+        executor.start()
+        executor.mMicrostepTimes.clear()
+        macrostepTimes = list()
+        t0 = time.perf_counter()
+        for n in range(self.mRepeat):
+            for e in self.mEvents:
+                t1 = time.perf_counter()
+                executor.processEvent(Event(e))
+                macrostepTimes.append(time.perf_counter() - t1)
+        totalTime = time.perf_counter() - t0
+        executor.stop()
+        numEvents = macrostepTimes.__len__()
+        result = {
+            "name": self.getName(),
+            "states": sm.getIndex().getStates().__len__(),
+            "events": numEvents,
+            "microsteps": executor.mMicrostepTimes.__len__(),
+            "parse_time_s": parseTime,
+            "clone_time_s": cloneTime,
+            "events_per_sec": numEvents / totalTime if totalTime > 0 else 0.0,
+            "microstep_p50_us": percentile(executor.mMicrostepTimes, 50) * 1e6,
+            "microstep_p99_us": percentile(executor.mMicrostepTimes, 99) * 1e6,
+            "macrostep_p50_us": percentile(macrostepTimes, 50) * 1e6,
+            "macrostep_p99_us": percentile(macrostepTimes, 99) * 1e6,
+            "peak_memory_kb": self.measureMemory() / 1024.0,
+        }
+        return result
+
+
+def compare(report, previous, tolerance):
+    """
+    Compare the throughput with a previous report.
+    A benchmark regresses when its events/sec drops by more than 'tolerance'.
+    """
+    previousResults = {}
+    for r in previous.get("results", []):
+        previousResults[r["name"]] = r
+    comparison = list()
+    for r in report["results"]:
+        if r["name"] not in previousResults:
+            continue
+        old = previousResults[r["name"]]
+        ratio = 0.0
+        if old["events_per_sec"] > 0:
+            ratio = r["events_per_sec"] / old["events_per_sec"]
+        comparison.append({
+            "name": r["name"],
+            "events_per_sec_ratio": ratio,
+            "parse_time_ratio": r["parse_time_s"] / old["parse_time_s"] if old["parse_time_s"] > 0 else 0.0,
+            "regression": ratio < 1.0 - tolerance,
+        })
+    return comparison
+
+
+def createReport(benchmarks):
+    report = {
+        "version": REPORT_VERSION,
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+        "results": list(),
+    }
+    # traces would dominate the measurements
+    isTraceEnabled = scxml4py.trace.isEnabled()
+    scxml4py.trace.setEnabled(False)
+    try:
+        for b in benchmarks:
+            report["results"].append(b.run())
+    finally:
+        scxml4py.trace.setEnabled(isTraceEnabled)
+    return report
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog="scxml4py.benchmark", description="scxml4py interpreter benchmarks")
+    parser.add_argument("--depth", type=int, default=3, help="depth of the synthetic state trees")
+    parser.add_argument("--fanout", type=int, default=3, help="number of substates of each compound state")
+    parser.add_argument("--regions", type=int, default=4, help="number of parallel regions (0: no parallel state)")
+    parser.add_argument("--guard-density", type=float, default=0.5, help="fraction of guarded transitions")
+    parser.add_argument("--clones", type=int, default=0, help="clone the regions of the synthetic model n times")
+    parser.add_argument("--model", action="append", default=[], help="SCXML model file (can be repeated)")
+    parser.add_argument("--events", default=None, help="comma separated events to send to the --model files")
+    parser.add_argument("--repeat", type=int, default=100, help="number of times the event sequence is sent")
+    parser.add_argument("--output", default=None, help="JSON report file (default: stdout)")
+    parser.add_argument("--compare", default=None, help="previous JSON report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="accepted throughput loss when comparing")
+    parser.add_argument("--generated", action="store_true", help="also run each benchmark with the generated engine")
+    args = parser.parse_args(argv)
+
+    benchmarks = list()
+    text, events = generateModel(args.depth, args.fanout, args.regions, args.guard_density)
+    name = "synthetic-d%d-f%d-r%d-g%g" % (args.depth, args.fanout, args.regions, args.guard_density)
+    b = Benchmark(name, text, events, args.repeat)
+    if args.clones > 0:
+        # clone the single region of a one region model
+        text, events = generateModel(args.depth, args.fanout, 1, args.guard_density)
+        b = Benchmark(name + "-c%d" % args.clones, text, events, args.repeat)
+        b.setClones(args.clones, "ROOT")
+    benchmarks.append(b)
+    for fileName in args.model:
+        with open(fileName, encoding="utf-8") as f:
+            text = f.read()
+        events = list()
+        if args.events != None:
+            events = [e.strip() for e in args.events.split(",") if e.strip() != ""]
+        benchmarks.append(Benchmark(fileName, text, events, args.repeat))
+    if args.generated:
+        for b in list(benchmarks):
+            g = Benchmark(b.mName, b.mText, b.mEvents, b.mRepeat)
+            g.setClones(b.mClones, b.mCloneRoot)
+            g.setGenerated(True)
+            benchmarks.append(g)
+
+    report = createReport(benchmarks)
+    isRegression = False
+    if args.compare != None:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        report["comparison"] = compare(report, previous, args.tolerance)
+        for c in report["comparison"]:
+            isRegression = isRegression or c["regression"]
+
+    text = json.dumps(report, indent=2)
+    if args.output != None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    for r in report["results"]:
+        sys.stderr.write("%s: %.0f events/s, microstep p50 %.1f us p99 %.1f us, parse %.3f s, peak %.0f kB\n" %
+                         (r["name"], r["events_per_sec"], r["microstep_p50_us"], r["microstep_p99_us"],
+                          r["parse_time_s"], r["peak_memory_kb"]))
+    return 1 if isRegression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
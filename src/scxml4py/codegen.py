@@ -0,0 +1,309 @@
+'''
+    codegen module part of scxml4py.
+
+    Generate a Python module specialized for a model and run it with
+    the GeneratedExecutor.
+
+    @authors: landolfa
+'''
+
+import types
+import threading
+import weakref
+import scxml4py.helper
+import scxml4py.trace
+from scxml4py.eventDescriptor import parseDescriptors
+from scxml4py.executor import Executor
+from scxml4py.eventQueue import QueueType
+
+logger = scxml4py.trace.logger
+
+
+class _Writer(object):
+    """
+    Build the source of the module generated for a model. The objects
+    of the model are referred to by name (T_n transitions, G_n guards,
+    A_n actions, E_n event descriptors) and bound when the module is loaded.
+    """
+
+    def __init__(self, theStateMachine):
+        self.mStateMachine = theStateMachine
+        self.mIndex = theStateMachine.getIndex()
+        self.mLines = list()
+        self.mTransitions = {} # transition -> name
+        self.mObjects = {}     # (prefix, id of guard/action or descriptor) -> name
+        self.mCounters = {}    # prefix -> number of names
+        self.mBindings = {}    # name -> object
+
+    def bind(self, prefix, theObject, key = None):
+        if key == None:
+            key = id(theObject)
+        name = self.mObjects.get((prefix, key))
+        if name == None:
+            n = self.mCounters.get(prefix, 0)
+            self.mCounters[prefix] = n + 1
+            name = prefix + "_" + str(n)
+            self.mObjects[(prefix, key)] = name
+            self.mBindings[name] = theObject
+        return name
+
+    def getTransition(self, t):
+        name = self.mTransitions.get(t)
+        if name == None:
+            name = "T_" + str(self.mTransitions.__len__())
+            self.mTransitions[t] = name
+            self.mBindings[name] = t
+        return name
+
+    def getCondition(self, t):
+        # inlined ExecutableContent.evaluate, None if the transition is not guarded
+        tests = list()
+        for g in t.getConditions().getActions():
+            if g.isPure():
+                tests.append("_evaluatePure(ctx, " + self.bind("G", g) + ") != False")
+            else:
+                tests.append(self.bind("G", g) + ".evaluate(ctx) != False")
+        if tests.__len__() == 0:
+            return None
+        return " and ".join(tests)
+
+    def emit(self, line = ""):
+        self.mLines.append(line)
+
+    def writeSelect(self, leaf, eventId, candidates):
+        name = "select_" + str(leaf.mDocOrder) + "_" + self.bind("E", eventId, eventId)
+        self.emit("def " + name + "(ctx, enabled):")
+        self.emit("    # " + str(leaf.getAbsoluteId()) + " on <" + str(eventId) + ">")
+        for t in candidates:
+            condition = self.getCondition(t)
+            tName = self.getTransition(t)
+            if condition == None:
+                self.emit("    if " + tName + " not in enabled:")
+            else:
+                self.emit("    if " + condition + " and " + tName + " not in enabled:")
+            self.emit("        return " + tName)
+        self.emit("    return None")
+        self.emit()
+        return name
+
+    def writeEventless(self, leaf, candidates):
+        name = "eventless_" + str(leaf.mDocOrder)
+        self.emit("def " + name + "(ctx, enabled):")
+        self.emit("    # " + str(leaf.getAbsoluteId()))
+        self.writeCandidates(candidates)
+        return name
+
+    def writeCandidates(self, candidates):
+        # return the first enabled candidate not yet selected, False if
+        # none is enabled, None if all the enabled ones are already selected
+        self.emit("    result = False")
+        for t in candidates:
+            condition = self.getCondition(t)
+            tName = self.getTransition(t)
+            if condition == None:
+                self.emit("    if " + tName + " not in enabled:")
+                self.emit("        return " + tName)
+                self.emit("    result = None")
+            else:
+                self.emit("    if " + condition + ":")
+                self.emit("        if " + tName + " not in enabled:")
+                self.emit("            return " + tName)
+                self.emit("        result = None")
+        self.emit("    return result")
+        self.emit()
+
+    def getActions(self, t):
+        actions = t.getActions().getActions()
+        if actions.__len__() == 0:
+            return "()"
+        return "(" + ", ".join(self.bind("A", a) for a in actions) + ",)"
+
+    def writeTransition(self, t):
+        self.emit("    " + self.getTransition(t) + ": " + self.getActions(t) + ",")
+
+    def write(self):
+        index = self.mIndex
+        dispatch = {} # descriptor -> list of (document order, select function)
+        for s in index.getStates():
+            for t in s.getTransitions():
+                if t.getEvent() != None:
+                    for d in parseDescriptors(t.getEvent().getId()):
+                        if d not in dispatch:
+                            dispatch[d] = list()
+        eventless = list()
+        for s in index.getStates():
+            if s.isAtomic() == False:
+                continue
+            for d in dispatch:
+                candidates = index.getDescriptorTransitions(s, d)
+                if candidates.__len__() > 0:
+                    dispatch[d].append((s.mDocOrder, self.writeSelect(s, d, candidates)))
+            candidates = index.getTransitions(s, None)
+            if candidates.__len__() > 0:
+                eventless.append((s.mDocOrder, self.writeEventless(s, candidates)))
+        functions = self.mLines
+        self.mLines = list()
+        self.emit("# generated by scxml4py.codegen for model <" + str(self.mStateMachine.getId()) + ">, do not edit")
+        self.emit()
+        self.emit("def _evaluatePure(ctx, guard):")
+        self.emit("    if ctx is not None and ctx.isGuardCacheEnabled():")
+        self.emit("        return ctx.evaluateGuard(guard)")
+        self.emit("    return guard.evaluate(ctx)")
+        self.emit()
+        self.mLines.extend(functions)
+        self.emit("# event descriptor -> {document order of the atomic state: select function}")
+        self.emit("DISPATCH = {")
+        for d, selects in dispatch.items():
+            self.emit("    " + self.bind("E", d, d) + ": {")
+            for docOrder, name in selects:
+                self.emit("        " + str(docOrder) + ": " + name + ",")
+            self.emit("    },")
+        self.emit("}")
+        self.emit()
+        self.emit("EVENTLESS = {")
+        for docOrder, name in eventless:
+            self.emit("    " + str(docOrder) + ": " + name + ",")
+        self.emit("}")
+        self.emit()
+        self.emit("# transition -> actions")
+        self.emit("TRANSITIONS = {")
+        for s in index.getStates():
+            for t in s.getTransitions():
+                self.writeTransition(t)
+        self.emit("}")
+        return "\n".join(self.mLines) + "\n"
+
+
+class GeneratedEngine(object):
+    """
+    Python module generated for a compiled model (ModelIndex):
+
+    - one select function per (atomic state, event) with the guards of the
+      candidate transitions inlined, in the order of the dispatch tables,
+    - one function per atomic state for the event-less transitions,
+    - for each transition the tuple of its actions.
+
+    The states exited and entered come from the transition plans of the
+    index (see ModelIndex.getPlan), as for the Executor.
+
+    The module is a snapshot of the model: guards and actions added to
+    the transitions after the generation are ignored. Changes of the state
+    tree (e.g. cloneParallel) rebuild the index and so the engine.
+    """
+
+    def __init__(self, theStateMachine):
+        writer = _Writer(theStateMachine)
+        self.mIndex = writer.mIndex
+        self.mSource = writer.write()
+        self.mModule = types.ModuleType("scxml4py_generated_" + str(id(self)))
+        self.mModule.__dict__.update(writer.mBindings)
+        exec(compile(self.mSource, "<scxml4py generated: " + str(theStateMachine.getId()) + ">", "exec"), self.mModule.__dict__)
+        self.mDispatch = self.mModule.DISPATCH
+        self.mEventless = self.mModule.EVENTLESS
+        self.mTransitions = self.mModule.TRANSITIONS
+
+    def getIndex(self):
+        return self.mIndex
+
+    def getSource(self):
+        return self.mSource
+
+    def getModule(self):
+        return self.mModule
+
+
+_engines = weakref.WeakKeyDictionary() # ModelIndex -> GeneratedEngine
+_enginesLock = threading.Lock()
+
+def generateSource(theStateMachine):
+    return _Writer(theStateMachine).write()
+
+def getEngine(theStateMachine):
+    """
+    Return the engine of the current index of the model, generated once
+    and shared by all the GeneratedExecutors of the model.
+    """
+    index = theStateMachine.getIndex()
+    with _enginesLock:
+        engine = _engines.get(index)
+        if engine == None:
+            engine = GeneratedEngine(theStateMachine)
+            _engines[index] = engine
+            logger.debug("Generated engine for <%s>", theStateMachine.getId())
+    return engine
+
+
+class GeneratedExecutor(Executor):
+    """
+    Executor using the module generated for the model (see GeneratedEngine)
+    to select the transitions and to execute their actions.
+    The step semantics is the same as the one of the Executor.
+
+    When debug traces are enabled the interpreted path is used, so that
+    the same messages are produced.
+    """
+
+    def __init__(self, theStateMachine, theContext, externalEventQueue = None, internalEventQueue = None, theQueueType = QueueType.THREADED, theSession = None):
+        Executor.__init__(self, theStateMachine, theContext, externalEventQueue, internalEventQueue, theQueueType, theSession)
+        self.mEngine = None
+
+    def getEngine(self):
+        return self.mEngine
+
+    def updateIndex(self):
+        Executor.updateIndex(self)
+        if self.mEngine == None or self.mEngine.getIndex() is not self.mIndex:
+            self.mEngine = getEngine(self.mStateMachine)
+
+    def selectEventlessTransitions(self):
+        if self.mTrace:
+            return Executor.selectEventlessTransitions(self)
+        enabledTransitions = list()
+        mask = self.getEventlessStates()
+        if mask == 0:
+            return enabledTransitions
+        table = self.mEngine.mEventless
+        pureMask = self.getPureEventlessMask()
+        for s in self.mCurrentStatus.iterStates(mask):
+            if scxml4py.helper.isPreempted(s, enabledTransitions) == False:
+                t = table[s.mDocOrder](self.mContext, enabledTransitions)
+                if t:
+                    enabledTransitions.append(t)
+                elif t is False and (pureMask >> s.mDocOrder) & 1 == 1:
+                    self.mEventlessDisabled |= 1 << s.mDocOrder
+        return enabledTransitions
+
+    def selectTransitions(self, e):
+        if self.mTrace:
+            return Executor.selectTransitions(self, e)
+        descriptors = self.mIndex.getDescriptors(e.getId())
+        if descriptors.__len__() > 1:
+            # candidates of several descriptors are merged by the index
+            return Executor.selectTransitions(self, e)
+        enabledTransitions = list()
+        table = self.mEngine.mDispatch.get(descriptors[0]) if descriptors.__len__() == 1 else None
+        if table is None:
+            return enabledTransitions
+        for s in self.mCurrentStatus.getAtomicStates():
+            select = table.get(s.mDocOrder)
+            if select is not None and scxml4py.helper.isPreempted(s, enabledTransitions) == False:
+                t = select(self.mContext, enabledTransitions)
+                if t is not None:
+                    enabledTransitions.append(t)
+        return enabledTransitions
+
+    def executeTransitionContent(self, enabledTransitions):
+        if self.mTrace:
+            Executor.executeTransitionContent(self, enabledTransitions)
+            return
+        transitions = self.mEngine.mTransitions
+        for t in enabledTransitions:
+            info = transitions.get(t)
+            if info is None:
+                t.getActions().execute(self.mContext)
+            elif info.__len__() > 0:
+                for a in info:
+                    a.execute(self.mContext)
+                # see ExecutableContent.execute
+                if self.mContext != None:
+                    self.mContext.incrementVersion()
@@ -0,0 +1,262 @@
+'''
+    compiler module part of scxml4py.
+
+    Compile a resolved model into a binary artifact that can be loaded
+    without parsing the SCXML document again.
+
+    @authors: landolfa
+'''
+
+import os
+import struct
+import marshal
+import hashlib
+import tempfile
+import scxml4py.trace
+from scxml4py.exceptions import ScxmlError, ScxmlSyntaxError
+from scxml4py.event import Event
+from scxml4py.reader import Reader
+from scxml4py.registry import Registry
+from scxml4py.state import StateType, HistoryType, StateAtomic, StateCompound, StateParallel, StateHistory
+from scxml4py.stateMachine import StateMachine
+from scxml4py.transition import Transition
+
+logger = scxml4py.trace.logger
+
+# artifact layout: magic, format version, marshal version, sha256 of the payload, payload
+MAGIC = b"SCXC"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct(">4sHH32s")
+
+_STATE_CLASSES = {StateType.ATOMIC.value: StateAtomic,
+                  StateType.COMPOUND.value: StateCompound,
+                  StateType.PARALLEL.value: StateParallel}
+
+
+def _ids(theActions):
+    return tuple(a.getId() for a in theActions)
+
+def _compileTransition(t, order):
+    theEventId = None
+    if t.getEvent() != None:
+        theEventId = t.getEvent().getId()
+    return (tuple(order[s] for s in t.getTargets()),
+            theEventId,
+            _ids(t.getConditions().getActions()),
+            _ids(t.getActions().getActions()))
+
+def compileModel(theStateMachine):
+    """
+    Return the artifact (bytes) of a model: the state tree, the transitions
+    and the ids of the actions, guards and activities, without the runtime
+    data. States are referred to by their document order.
+    """
+    index = theStateMachine.getIndex()
+    states = index.getStates()
+    order = {}
+    for s in states:
+        order[s] = s.getDocumentOrder()
+    stateRecords = list()
+    for s in states:
+        historyType = None
+        history = -1
+        if s.getType() == StateType.HISTORY:
+            historyType = s.getHistoryType().value
+        if s.getHistory() != None:
+            history = order.get(s.getHistory(), -1)
+        stateRecords.append((s.getType().value,
+                             s.getId(),
+                             s.getAbsoluteId(),
+                             tuple(order[c] for c in s.getSubstates()),
+                             history,
+                             historyType,
+                             s.isInitial(),
+                             s.isFinal(),
+                             _ids(s.getEntryActions().getActions()),
+                             _ids(s.getExitActions().getActions()),
+                             _ids(s.getActivities()),
+                             tuple(_compileTransition(t, order) for t in s.getTransitions()),
+                             tuple(_compileTransition(t, order) for t in s.getInitialTrans())))
+    statesMap = list()
+    for absId, s in theStateMachine.mStatesMap.items():
+        statesMap.append((absId, order[s]))
+    payload = marshal.dumps((theStateMachine.getId(),
+                             tuple(stateRecords),
+                             tuple(order[s] for s in theStateMachine.getSubstates()),
+                             tuple(order[s] for s in theStateMachine.getParallel()),
+                             tuple(_compileTransition(t, order) for t in theStateMachine.getInitialTrans()),
+                             tuple(statesMap)))
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, marshal.version, hashlib.sha256(payload).digest()) + payload
+
+
+class _Binder(object):
+    """
+    Resolve the ids stored in an artifact with the actions and activities
+    provided by the application. The registries are built once, so
+    loading is linear in the size of the model.
+    """
+
+    def __init__(self, actionList, activityList):
+        self.mActions = Registry.create(actionList)
+        self.mActivities = Registry.create(activityList)
+
+    def getAction(self, theActionId):
+        theAction = self.mActions.get(theActionId)
+        if theAction == None:
+            raise ScxmlSyntaxError("Custom action id '" + str(theActionId) + "' not found.")
+        return theAction
+
+    def getGuard(self, theGuardId):
+        theGuard = self.mActions.get(theGuardId)
+        if theGuard == None:
+            raise ScxmlSyntaxError("Custom guard id '" + str(theGuardId) + "' not found.")
+        return theGuard
+
+    def getActivity(self, theActivityId):
+        theActivity = self.mActivities.get(theActivityId)
+        if theActivity == None:
+            raise ScxmlSyntaxError("Activity id '" + str(theActivityId) + "' not found.")
+        return theActivity
+
+    def getTransition(self, record, source, states):
+        targets, theEventId, guardIds, actionIds = record
+        t = Transition()
+        t.setSource(source)
+        t.setTargets([states[n] for n in targets])
+        if theEventId != None:
+            t.setEvent(Event(theEventId))
+        for theGuardId in guardIds:
+            t.addCondition(self.getGuard(theGuardId))
+        for theActionId in actionIds:
+            t.addAction(self.getAction(theActionId))
+        return t
+
+
+def _unpack(data):
+    if data.__len__() < _HEADER.size:
+        raise ScxmlError("Model artifact is truncated.")
+    magic, formatVersion, marshalVersion, checksum = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ScxmlError("Not a compiled model artifact.")
+    if formatVersion != FORMAT_VERSION or marshalVersion != marshal.version:
+        raise ScxmlError("Unsupported model artifact version " + str(formatVersion) + "." + str(marshalVersion) + ".")
+    payload = data[_HEADER.size:]
+    if hashlib.sha256(payload).digest() != checksum:
+        raise ScxmlError("Model artifact checksum mismatch.")
+    return marshal.loads(payload)
+
+def loadModel(data, actionList, activityList):
+    """
+    Rebuild the StateMachine of an artifact produced by compileModel, binding
+    the ids to the given actions and activities.
+    Raises ScxmlError if the artifact is invalid and ScxmlSyntaxError if
+    an action, guard or activity is missing (as the Reader does).
+    """
+    theId, stateRecords, substates, parallel, initialTrans, statesMap = _unpack(data)
+    binder = _Binder(actionList, activityList)
+    sm = StateMachine(theId)
+    states = list()
+    for record in stateRecords:
+        theType, stateId, absId = record[0], record[1], record[2]
+        if theType == StateType.HISTORY.value:
+            s = StateHistory(stateId, HistoryType(record[5]))
+        else:
+            s = _STATE_CLASSES[theType](stateId)
+        s.setAbsoluteId(absId)
+        states.append(s)
+    for s, record in zip(states, stateRecords):
+        children, history, historyType, isInitial, isFinal, entryIds, exitIds, activityIds, transitions, initials = record[3:]
+        for n in children:
+            s.addSubstate(states[n])
+        if history >= 0:
+            s.setHistory(states[history])
+        s.setIsInitial(isInitial)
+        s.setIsFinal(isFinal)
+        s.getEntryActions().setActions([binder.getAction(i) for i in entryIds])
+        s.getExitActions().setActions([binder.getAction(i) for i in exitIds])
+        for i in activityIds:
+            s.addActivity(binder.getActivity(i))
+        s.setTransitions([binder.getTransition(t, s, states) for t in transitions])
+        for t in initials:
+            s.getInitialTrans().append(binder.getTransition(t, None, states))
+    for n in substates:
+        sm.addSubstate(states[n])
+    for n in parallel:
+        sm.addParallel(states[n])
+    for t in initialTrans:
+        sm.getInitialTrans().append(binder.getTransition(t, None, states))
+    for absId, n in statesMap:
+        sm.updateStatesMap(absId, states[n])
+    sm.finalize()
+    return sm
+
+
+class ModelCache(object):
+    """
+    On-disk cache of compiled models, keyed by the hash of the SCXML
+    document and of the model name, for warm starts:
+
+        cache = ModelCache("/tmp/scxml4py")
+        sm = cache.read("model.xml", actionList, activityList)
+
+    A missing, stale or corrupted artifact is replaced by parsing the
+    document with the Reader.
+    """
+
+    def __init__(self, theDirectory):
+        self.mDirectory = theDirectory
+        self.mHits = 0
+        self.mMisses = 0
+
+    def getHits(self):
+        return self.mHits
+
+    def getMisses(self):
+        return self.mMisses
+
+    def getPath(self, modelName, text):
+        h = hashlib.sha256(text)
+        # the model name is the default id of the StateMachine
+        h.update(b"\0" + str(modelName).encode("utf-8"))
+        return os.path.join(self.mDirectory, h.hexdigest() + "." + str(FORMAT_VERSION) + ".scxc")
+
+    def read(self, fileName, actionList, activityList):
+        with open(fileName, "rb") as f:
+            text = f.read()
+        return self.readString(fileName, text, actionList, activityList)
+
+    def readString(self, modelName, text, actionList, activityList):
+        if isinstance(text, str):
+            text = text.encode("utf-8")
+        path = self.getPath(modelName, text)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = None
+        if data != None:
+            try:
+                sm = loadModel(data, actionList, activityList)
+                self.mHits += 1
+                return sm
+            except ScxmlSyntaxError:
+                raise
+            except (ScxmlError, ValueError, EOFError, TypeError) as e:
+                logger.warning("Discarding compiled model <%s>: %s", path, e)
+        self.mMisses += 1
+        sm = Reader().readString(modelName, text, actionList, activityList)
+        self.store(path, compileModel(sm))
+        return sm
+
+    def store(self, path, data):
+        # written to a temporary file first so that readers never see a partial artifact
+        os.makedirs(self.mDirectory, exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(dir=self.mDirectory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmpPath, path)
+        except OSError:
+            logger.warning("Cannot write compiled model <%s>", path)
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
@@ -0,0 +1,129 @@
+'''
+    configuration module part of scxml4py.
+
+    @authors: landolfa
+'''
+
+from collections.abc import MutableSet
+from scxml4py.exceptions import ScxmlError
+
+
+class Configuration(MutableSet):
+    """
+    Set of active states encoded as an integer bitmask, one bit per state
+    in document order as assigned by the ModelIndex.
+
+    It can be used wherever a set of states is expected (iteration, 'in',
+    len, add, remove, ...). In addition it provides O(1) membership tests,
+    union/difference on the bitmask, the active atomic states and cheap
+    snapshots. The mask returned by getKey can be used as a hashable key to
+    compare configurations across microsteps.
+    Iteration returns the states in document order.
+    """
+
+    def __init__(self, theIndex = None, theMask = 0):
+        self.mIndex = theIndex
+        self.mMask = theMask
+
+    def __str__(self):
+        tmp = ""
+        for s in self:
+            if tmp.__len__() > 0:
+                tmp += " "
+            tmp += s.getId()
+        return tmp
+
+    def __contains__(self, s):
+        if s is None or s.mModelIndex is not self.mIndex or self.mIndex is None:
+            return False
+        return (self.mMask >> s.mDocOrder) & 1 == 1
+
+    def __iter__(self):
+        return self.iterStates(self.mMask)
+
+    def __len__(self):
+        return self.mMask.bit_count()
+
+    def __or__(self, other):
+        if isinstance(other, Configuration) and other.mIndex is self.mIndex:
+            return self.union(other)
+        return MutableSet.__or__(self, other)
+
+    def __sub__(self, other):
+        if isinstance(other, Configuration) and other.mIndex is self.mIndex:
+            return self.difference(other)
+        return MutableSet.__sub__(self, other)
+
+    def __and__(self, other):
+        if isinstance(other, Configuration) and other.mIndex is self.mIndex:
+            return self.intersection(other)
+        return MutableSet.__and__(self, other)
+
+    def _from_iterable(self, it):
+        # used by the set operators inherited from MutableSet
+        c = Configuration(self.mIndex)
+        for s in it:
+            c.add(s)
+        return c
+
+    def iterStates(self, mask):
+        states = self.mIndex.getStates() if self.mIndex != None else None
+        while mask != 0:
+            low = mask & -mask
+            yield states[low.bit_length() - 1]
+            mask ^= low
+
+    def getIndex(self):
+        return self.mIndex
+
+    def getKey(self):
+        return self.mMask
+
+    def getBit(self, s):
+        if self.mIndex is None or s.mModelIndex is not self.mIndex:
+            raise ScxmlError("State <" + s.getId() + "> is not part of the compiled model.")
+        return 1 << s.mDocOrder
+
+    def isActive(self, s):
+        return self.__contains__(s)
+
+    def add(self, s):
+        self.mMask |= self.getBit(s)
+
+    def discard(self, s):
+        if self.__contains__(s):
+            self.mMask &= ~(1 << s.mDocOrder)
+
+    def clear(self):
+        self.mMask = 0
+
+    def copy(self):
+        return Configuration(self.mIndex, self.mMask)
+
+    def snapshot(self):
+        # integers are immutable: a snapshot is just a new wrapper
+        return self.copy()
+
+    def union(self, other):
+        return Configuration(self.mIndex, self.mMask | other.mMask)
+
+    def difference(self, other):
+        return Configuration(self.mIndex, self.mMask & ~other.mMask)
+
+    def intersection(self, other):
+        return Configuration(self.mIndex, self.mMask & other.mMask)
+
+    def getAtomicStates(self):
+        if self.mIndex is None:
+            return list()
+        return list(self.iterStates(self.mMask & self.mIndex.getAtomicMask()))
+
+    def rebind(self, theIndex):
+        """
+        Re-encode the active states with a new (rebuilt) index.
+        """
+        states = list(self) if self.mIndex != None else list()
+        self.mIndex = theIndex
+        self.mMask = 0
+        for s in states:
+            self.add(s)
@@ -4,6 +4,9 @@
     
 '''
 
+# name of the element bound to the event being processed (SCXML _event)
+EVENT_ELEMENT = "_event"
+
 
 class Context(object):
     def __init__(self):
@@ -11,6 +14,11 @@ class Context(object):
         self.mSessionId = ""
         self.mLastEvent = None
         self.mElements = dict()
+        self.mVersion = 0 # incremented each time the context may have changed
+        self.mDataVersion = 0 # same, except at the beginning of a microstep
+        self.mGuardCacheEnabled = False
+        self.mGuardResults = dict() # guard id -> result, valid for mGuardResultsVersion
+        self.mGuardResultsVersion = 0
         
     def __str__(self):
         return self.mName.__str__() + "_" + self.mSessionId.__str__()
@@ -23,6 +31,29 @@ class Context(object):
 
     def getLastEvent(self):
         return self.mLastEvent;
+
+    def getEventData(self):
+        """
+        Payload of the event being processed, the same object
+        which was attached to the Event (not a copy).
+        """
+        if self.mLastEvent is None:
+            return None
+        return self.mLastEvent.getData()
+
+    def getVersion(self):
+        return self.mVersion
+
+    def getDataVersion(self):
+        """
+        Version of what the pure guards depend on: it changes with the
+        elements, the last event and when actions are executed, but not
+        at the beginning of a microstep (see invalidateGuardResults).
+        """
+        return self.mDataVersion
+
+    def isGuardCacheEnabled(self):
+        return self.mGuardCacheEnabled
     
     def getElement(self, theName):
         if theName in self.mElements.keys():
@@ -37,13 +68,72 @@ class Context(object):
         self.mSessionId = theId
             
     def setLastEvent(self, theEvent):
+        """
+        Set the event being processed and bind it to the _event element,
+        so that actions and guards can read _event.name and _event.data.
+        """
         self.mLastEvent = theEvent
+        self.mElements[EVENT_ELEMENT] = theEvent
+        self.mVersion += 1
+        self.mDataVersion += 1
+
+    def setGuardCacheEnabled(self, isEnabled):
+        """
+        Enable the memoization of the pure guards (see Action.isPure).
+        """
+        self.mGuardCacheEnabled = isEnabled
+        self.mGuardResults.clear()
+
+    def incrementVersion(self):
+        """
+        Invalidate the memoized guard results. It is called when an element
+        is added or removed, when the last event changes and when actions
+        are executed.
+        """
+        self.mVersion += 1
+        self.mDataVersion += 1
+
+    def invalidateGuardResults(self):
+        """
+        Invalidate the memoized guard results at the beginning of each
+        microstep, the data version is not changed.
+        """
+        self.mVersion += 1
+
+    def evaluateGuard(self, theGuard):
+        """
+        Evaluate a pure guard, reusing its result if the context has not
+        changed since it was computed.
+        """
+        result = self.getGuardResult(theGuard)
+        if result is None:
+            result = theGuard.evaluate(self)
+            self.setGuardResult(theGuard, result)
+        return result
+
+    def getGuardResult(self, theGuard):
+        """
+        Return the memoized result of a guard, None if not available
+        for the current version of the context.
+        """
+        if self.mGuardResultsVersion != self.mVersion:
+            self.mGuardResults.clear()
+            self.mGuardResultsVersion = self.mVersion
+        return self.mGuardResults.get(theGuard.getId())
+
+    def setGuardResult(self, theGuard, theResult):
+        if self.mGuardResultsVersion == self.mVersion:
+            self.mGuardResults[theGuard.getId()] = theResult
     
     def addElement(self, theName, theElement):
         if theElement != None and theName != None:
             self.mElements[theName] = theElement
+            self.mVersion += 1
+            self.mDataVersion += 1
     
     def delElement(self, theName):
         if theName in self.mElements.keys():
             del self.mElements[theName]
+            self.mVersion += 1
+            self.mDataVersion += 1
         
\ No newline at end of file
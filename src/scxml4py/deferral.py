@@ -0,0 +1,168 @@
+'''
+    deferral module part of scxml4py.
+
+    Deferred events for the EventHandlingPolicy.DEFFERRED policy
+    of the Executor.
+
+    @authors: landolfa
+'''
+
+from enum import Enum
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from scxml4py.event import EventStatus
+
+
+class OverflowPolicy(Enum):
+    DROP_OLDEST = 0  # the oldest deferred event is dropped (IGNORED)
+    REJECT = 1       # the event which does not fit is REJECTED
+
+
+class DeferredEventQueue(object):
+    """
+    Bounded queue of the events which could not be processed in the
+    configuration they arrived in.
+
+    The events are indexed by id: release returns, in arrival order, only
+    the events whose id is in the given set (the events accepted by the
+    new configuration, see ModelIndex.isEventAccepted), without scanning
+    the other ones. Adding, dropping and releasing an event are O(1).
+
+    A released event which is deferred again goes back to its place
+    (its arrival order is kept).
+
+    When the queue is full, theOverflowPolicy selects whether the oldest
+    event is dropped to make room or the new event is rejected.
+    The counters report the number of events deferred, released, dropped
+    and rejected since the creation of the queue (or the last resetCounters).
+    """
+
+    def __init__(self, theCapacity = 1024, theOverflowPolicy = OverflowPolicy.DROP_OLDEST):
+        assert(theCapacity > 0)
+        self.mCapacity = theCapacity
+        self.mOverflowPolicy = theOverflowPolicy
+        self.mEvents = OrderedDict() # sequence number -> event, in arrival order
+        self.mIds = {}               # event id -> deque of sequence numbers
+        self.mReleased = {}          # id(event) -> (sequence number, event) of the released events
+        self.mSequence = 0
+        self.resetCounters()
+
+    def __len__(self):
+        return self.mEvents.__len__()
+
+    def __iter__(self):
+        return iter(list(self.mEvents.values()))
+
+    def getCapacity(self):
+        return self.mCapacity
+
+    def getOverflowPolicy(self):
+        return self.mOverflowPolicy
+
+    def getDeferredCount(self):
+        return self.mDeferredCount
+
+    def getReleasedCount(self):
+        return self.mReleasedCount
+
+    def getDroppedCount(self):
+        return self.mDroppedCount
+
+    def getRejectedCount(self):
+        return self.mRejectedCount
+
+    def getIds(self):
+        return set(self.mIds.keys())
+
+    def resetCounters(self):
+        self.mDeferredCount = 0
+        self.mReleasedCount = 0
+        self.mDroppedCount = 0
+        self.mRejectedCount = 0
+
+    def defer(self, theEvent):
+        """
+        Add theEvent to the queue and mark it as DEFERRED.
+        Returns the event discarded because of an overflow (the oldest one
+        marked IGNORED, or theEvent itself marked REJECTED), None otherwise.
+        """
+        discarded = None
+        sequence = self.getReleasedSequence(theEvent)
+        if self.mEvents.__len__() >= self.mCapacity:
+            if self.mOverflowPolicy == OverflowPolicy.REJECT:
+                theEvent.setStatus(EventStatus.REJECTED)
+                self.mRejectedCount += 1
+                return theEvent
+            n, discarded = self.mEvents.popitem(last = False)
+            self.removeId(discarded.getId())
+            discarded.setStatus(EventStatus.IGNORED)
+            self.mDroppedCount += 1
+        if sequence == None:
+            self.mSequence += 1
+            sequence = self.mSequence
+        self.mEvents[sequence] = theEvent
+        sequences = self.mIds.get(theEvent.getId())
+        if sequences == None:
+            sequences = deque()
+            self.mIds[theEvent.getId()] = sequences
+        if sequences.__len__() > 0 and sequences[-1] > sequence:
+            sequences.insert(bisect_left(sequences, sequence), sequence)
+        else:
+            sequences.append(sequence)
+        if sequence != self.mSequence:
+            # back to its place among the events deferred after it
+            for n in [n for n in self.mEvents if n > sequence]:
+                self.mEvents.move_to_end(n)
+        theEvent.setStatus(EventStatus.DEFERRED)
+        self.mDeferredCount += 1
+        return discarded
+
+    def getReleasedSequence(self, theEvent):
+        """
+        Return the sequence number of theEvent if it has been released
+        and not processed since (its status is still DEFERRED), None otherwise.
+        """
+        if self.mReleased.__len__() == 0:
+            return None
+        released = self.mReleased.pop(id(theEvent), None)
+        if released == None or released[1] is not theEvent or theEvent.getStatus() != EventStatus.DEFERRED:
+            return None
+        return released[0]
+
+    def removeId(self, theId):
+        # the oldest event with theId is always the first of its deque
+        sequences = self.mIds[theId]
+        sequences.popleft()
+        if sequences.__len__() == 0:
+            del self.mIds[theId]
+
+    def release(self, theAcceptedIds):
+        """
+        Remove and return, in arrival order, the events whose id
+        is in theAcceptedIds.
+        """
+        if self.mIds.__len__() == 0:
+            return list()
+        if self.mIds.__len__() < theAcceptedIds.__len__():
+            ids = [i for i in self.mIds if i in theAcceptedIds]
+        else:
+            ids = [i for i in theAcceptedIds if i in self.mIds]
+        if ids.__len__() == 0:
+            return list()
+        sequences = list()
+        for i in ids:
+            sequences.extend(self.mIds.pop(i))
+        if ids.__len__() > 1:
+            sequences.sort()
+        events = [self.mEvents.pop(n) for n in sequences]
+        self.mReleasedCount += events.__len__()
+        # forget the released events which have been processed since
+        self.mReleased = {k: v for k, v in self.mReleased.items() if v[1].getStatus() == EventStatus.DEFERRED}
+        for n, e in zip(sequences, events):
+            self.mReleased[id(e)] = (n, e)
+        return events
+
+    def clear(self):
+        self.mEvents.clear()
+        self.mIds.clear()
+        self.mReleased.clear()
@@ -3,40 +3,38 @@ import threading
 from queue import Queue
 
 import scxml4py.helper
+from scxml4py.trace import LazyFormat
 from scxml4py.reader import Reader
 from scxml4py.context import Context
 from scxml4py.event import Event
 from scxml4py.executor import Executor
+from scxml4py.registry import Registry
+
+logger = logging.getLogger("scxml4py")
 
 class ActionMgr(object):
     # generated class    
     def __init__(self):
-        self.mActionList = list()
-        self.mActivityList = list()
+        self.mActionList = Registry()
+        self.mActivityList = Registry()
 
     def getAction(self, theActionId):
-        for a in self.mActionList:
-            if a.getId() == theActionId:
-                return a
-        return None
+        return self.mActionList.get(theActionId)
 
     def getActions(self):
         return self.mActionList
     
     def getActivity(self, theActivityId):
-        for a in self.mActivityList:
-            if a.getId() == theActivityId:
-                return a
-        return None
+        return self.mActivityList.get(theActivityId)
     
     def getActivities(self):
         return self.mActivityList
     
     def createActions(self, theData, action_classes):
-        self.mActionList = [cls(theData) for cls in action_classes]
+        self.mActionList = Registry([cls(theData) for cls in action_classes])
 
     def createActivities(self, theEventQueue, theData, activity_classes):
-        self.mActivityList = [cls(theEventQueue, theData) for cls in activity_classes]
+        self.mActivityList = Registry([cls(theEventQueue, theData) for cls in activity_classes])
 
 
 class Application(threading.Thread):   
@@ -51,30 +49,30 @@ class Application(threading.Thread):
         self.mActionMgr.createActivities(theEventQueue=self.mEventQueue, theData=self.mData, activity_classes=activities)
         
         self.mContext = Context()
-        logging.getLogger("scxml4py").info("Loading SCXML model") 
+        logger.info("Loading SCXML model") 
         self.mModel = Reader().readString("modelName", scxml_doc_str, self.mActionMgr.getActions(), self.mActionMgr.getActivities())
-        logging.getLogger("scxml4py").debug("Loaded SCXML model: " + scxml4py.helper.formatModel(self.mModel))
+        logger.debug("Loaded SCXML model: %s", LazyFormat(scxml4py.helper.formatModel, self.mModel))
         self.mExecutor = Executor(self.mModel, self.mContext)
         self.mExecutor.addStatusListener(self.mActionMgr.getAction("ActionStatus"))
-        logging.getLogger("scxml4py").info("Status: <" + scxml4py.helper.formatStatus(self.mExecutor.getStatus()) + ">")
+        logger.info("Status: <%s>", LazyFormat(scxml4py.helper.formatStatus, self.mExecutor.getStatus()))
         
     def run(self):
-        logging.getLogger("scxml4py").info("Starting execution of <" + self.mModel.getId() + ">")
+        logger.info("Starting execution of <%s>", self.mModel.getId())
         self.mRunning = True
         self.mExecutor.start()
-        logging.getLogger("scxml4py").info("Status: <" + scxml4py.helper.formatStatus(self.mExecutor.getStatus()) + ">")
+        logger.info("Status: <%s>", LazyFormat(scxml4py.helper.formatStatus, self.mExecutor.getStatus()))
         while self.mRunning == True:
             theEvent = self.mEventQueue.get(True, None)
             #Queue().get(block, timeout)
             # loop on the event queue send the event to the SM engine
-            logging.getLogger("scxml4py").debug("Application received event = <" + theEvent.__str__() + ">")
+            logger.debug("Application received event = <%s>", theEvent)
             self.mExecutor.processEvent(theEvent)
             if theEvent.getId() == "_EXIT":
-                logging.getLogger("scxml4py").debug("Application exiting...")
+                logger.debug("Application exiting...")
                 self.mRunning = False
-        logging.getLogger("scxml4py").info("Stopping execution of <" + self.mModel.getId() + ">")
+        logger.info("Stopping execution of <%s>", self.mModel.getId())
         self.mExecutor.stop()
-        logging.getLogger("scxml4py").info("Status: <" + scxml4py.helper.formatStatus(self.mExecutor.getStatus()) + ">")
+        logger.info("Status: <%s>", LazyFormat(scxml4py.helper.formatStatus, self.mExecutor.getStatus()))
 
 class SCXML_Engine:
     def __init__(self, scxml_doc: str, actions, activities, data):
@@ -4,6 +4,7 @@
 
 '''
 
+import sys
 from enum import Enum
 from functools import total_ordering
 
@@ -22,29 +23,67 @@ class EventStatus(Enum):
     REJECTED = 3
     DEFERRED = 4
 
+# bound of the number of shared signals, see getSignal
+MAX_SIGNALS = 4096
+
+# prefixes of the events generated when a final state is reached
+DONE_STATE = "done.state."
+DONE_INVOKE = "done.invoke."
+
+def internId(theId):
+    # string ids are interned: equal ids are the same object
+    if type(theId) == str:
+        return sys.intern(theId)
+    return theId
+
 @total_ordering
 class Event(object):
+    """
+    Events are compared by id. String ids are interned, so that comparing
+    the ids of the events and of the transitions is mostly an identity test.
+    theData is an optional payload, passed as it is (no copy).
+    """
+    __slots__ = ("mId", "mType", "mStatus", "mData")
 
-    def __init__(self, theId, theType = EventType.CHANGE_EVENT, theStatus = EventStatus.TOBEPROCESSED):
-        self.mId = theId
+    def __init__(self, theId, theType = EventType.CHANGE_EVENT, theStatus = EventStatus.TOBEPROCESSED, theData = None):
+        self.mId = internId(theId)
         self.mType = theType
         self.mStatus = theStatus
+        self.mData = theData
         
     def __str__(self):
         return self.mId.__str__()
 
     def __lt__(self, other):
-        if other == None:
-            return False        
+        if other is None:
+            return False
+        if self.mId is other.mId:
+            return False
         return self.mId.__str__() < other.mId.__str__()
 
     def __eq__(self, other):
-        if other == None:
-            return False        
+        if other is None:
+            return False
+        if self is other or self.mId is other.mId:
+            return True
         return self.mId.__str__() == other.mId.__str__()
 
+    __hash__ = None # mutable
+
     def getId(self):
         return self.mId
+
+    # fields of the SCXML _event variable, see Context.setLastEvent
+    @property
+    def name(self):
+        return self.mId
+
+    @property
+    def data(self):
+        return self.mData
+
+    def getData(self):
+        return self.mData
         
     def getType(self, theType):
         self.mType = theType
@@ -53,7 +92,10 @@ class Event(object):
         return(self.mStatus)
             
     def setId(self, theId):
-        self.mId = theId
+        self.mId = internId(theId)
+
+    def setData(self, theData):
+        self.mData = theData
     
     def setType(self, theType):
         assert (theType >= EventType.CALL_EVENT and theType <= EventType.ERROR_EVENT)
@@ -71,4 +113,22 @@ class Event(object):
         # runtime info does not need to be cloned
         #clonedEvent.mStatus = self.mStatus
         return clonedEvent
-    
\ No newline at end of file
+
+
+_signals = {} # event id -> shared Event
+
+def getSignal(theId):
+    """
+    Return an Event without payload shared by all the occurrences of the
+    signal theId, so that no Event is allocated per signal.
+    The status of a shared Event is the one of its last processing, by any
+    Executor: it is meant for internal events whose status nobody reads.
+    Events which reach the event listeners, the deferral queue or
+    processEventBatch must be new Events.
+    """
+    e = _signals.get(theId)
+    if e is None:
+        e = Event(theId, EventType.SIGNAL_EVENT)
+        if _signals.__len__() < MAX_SIGNALS:
+            e = _signals.setdefault(e.getId(), e)
+    return e
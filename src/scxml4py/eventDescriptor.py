@@ -0,0 +1,116 @@
+'''
+    eventDescriptor module part of scxml4py.
+
+    Matching of event names against the event descriptors of the
+    transitions (see SCXML 3.12.1 Event Descriptors).
+
+    @authors: landolfa
+'''
+
+WILDCARD = "*"
+SEPARATOR = "."
+
+
+def parseDescriptors(theEventAttribute):
+    """
+    Split the event attribute of a transition (a space separated list
+    of descriptors) into normalized descriptors: the trailing ".*" (or ".")
+    is removed and "*" becomes the empty descriptor which matches any event.
+    """
+    descriptors = list()
+    if theEventAttribute == None:
+        return descriptors
+    for d in str(theEventAttribute).split():
+        if d == WILDCARD:
+            d = ""
+        else:
+            if d.endswith(SEPARATOR + WILDCARD):
+                d = d[:-2]
+            d = d.rstrip(SEPARATOR)
+        if d not in descriptors:
+            descriptors.append(d)
+    return descriptors
+
+
+def isDescriptorMatching(theDescriptor, theEventId):
+    """
+    A normalized descriptor matches an event name if its tokens are
+    a prefix of the tokens of the name: "error" matches "error" and
+    "error.send" but not "errors".
+    """
+    if theDescriptor == "":
+        return True
+    theEventId = str(theEventId)
+    if theEventId.startswith(theDescriptor) == False:
+        return False
+    return theEventId.__len__() == theDescriptor.__len__() or theEventId[theDescriptor.__len__()] == SEPARATOR
+
+
+def isEventMatching(theEventAttribute, theEventId):
+    """
+    True if one of the descriptors of theEventAttribute matches theEventId.
+    """
+    for d in parseDescriptors(theEventAttribute):
+        if isDescriptorMatching(d, theEventId):
+            return True
+    return False
+
+
+class _Node(object):
+    __slots__ = ("mChildren", "mDescriptor")
+
+    def __init__(self):
+        self.mChildren = {}      # token -> _Node
+        self.mDescriptor = None  # normalized descriptor ending at this node
+
+
+class DescriptorTrie(object):
+    """
+    Token trie of the normalized descriptors of a model.
+
+    match walks the tokens of an event name once and returns all the
+    descriptors matching it (the ones ending on the path), instead of
+    testing every descriptor of the model.
+    """
+
+    def __init__(self):
+        self.mRoot = _Node()
+        self.mSize = 0
+
+    def __len__(self):
+        return self.mSize
+
+    def add(self, theDescriptor):
+        """
+        Add a normalized descriptor, returns False if already present.
+        """
+        node = self.mRoot
+        if theDescriptor != "":
+            for token in theDescriptor.split(SEPARATOR):
+                child = node.mChildren.get(token)
+                if child == None:
+                    child = _Node()
+                    node.mChildren[token] = child
+                node = child
+        if node.mDescriptor != None:
+            return False
+        node.mDescriptor = theDescriptor
+        self.mSize += 1
+        return True
+
+    def match(self, theEventId):
+        """
+        Return the tuple of descriptors matching theEventId,
+        the most generic first.
+        """
+        node = self.mRoot
+        descriptors = list()
+        if node.mDescriptor != None:
+            descriptors.append(node.mDescriptor)
+        for token in str(theEventId).split(SEPARATOR):
+            node = node.mChildren.get(token)
+            if node == None:
+                break
+            if node.mDescriptor != None:
+                descriptors.append(node.mDescriptor)
+        return tuple(descriptors)
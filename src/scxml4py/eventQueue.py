@@ -0,0 +1,101 @@
+'''
+    eventQueue module part of scxml4py.
+
+    Event queue backends for the Executor.
+    All backends provide the subset of the queue.Queue interface used by
+    the Executor, the actions and the activities (put, put_nowait,
+    get_nowait, empty, qsize) plus clear.
+
+    @authors: landolfa
+'''
+
+import asyncio
+import queue
+from enum import Enum
+from collections import deque
+
+
+class QueueType(Enum):
+    THREADED = 0   # queue.Queue, events can be posted by other threads
+    SIMPLE = 1     # collections.deque, single threaded
+    ASYNC = 2      # asyncio.Queue, events posted from the event loop
+
+
+class SimpleQueue(object):
+    """
+    Event queue without locks, to be used when a single thread
+    drives the Executor and posts the events.
+    """
+    __slots__ = ("mItems",)
+
+    def __init__(self):
+        self.mItems = deque()
+
+    def put(self, item, block = True, timeout = None):
+        # unbounded: never blocks
+        self.mItems.append(item)
+
+    def put_nowait(self, item):
+        self.mItems.append(item)
+
+    def get(self, block = True, timeout = None):
+        # nobody else can put an event while we wait
+        return self.get_nowait()
+
+    def get_nowait(self):
+        if not self.mItems:
+            raise queue.Empty
+        return self.mItems.popleft()
+
+    def empty(self):
+        return not self.mItems
+
+    def qsize(self):
+        return self.mItems.__len__()
+
+    def clear(self):
+        self.mItems.clear()
+
+
+class AsyncQueue(asyncio.Queue):
+    """
+    Unbounded asyncio queue accepting the queue.Queue put signature
+    used by the actions and activities (put(item, True, 2)).
+    The coroutine interface is available as putAsync/getAsync.
+    It must be used from the thread running the event loop.
+    """
+
+    def put(self, item, block = True, timeout = None):
+        self.put_nowait(item)
+
+    async def putAsync(self, item):
+        self.put_nowait(item)
+
+    async def getAsync(self):
+        return await asyncio.Queue.get(self)
+
+    def clear(self):
+        while self.empty() == False:
+            self.get_nowait()
+
+
+def createQueue(theQueueType):
+    if theQueueType == QueueType.SIMPLE:
+        return SimpleQueue()
+    elif theQueueType == QueueType.ASYNC:
+        return AsyncQueue()
+    return queue.Queue()
+
+
+def clearQueue(theQueue):
+    """
+    Remove all the events from a queue, whatever its backend.
+    """
+    if hasattr(theQueue, "clear"):
+        theQueue.clear()
+    elif hasattr(theQueue, "mutex"):
+        with theQueue.mutex:
+            theQueue.queue.clear()
+    else:
+        while theQueue.empty() == False:
+            theQueue.get_nowait()
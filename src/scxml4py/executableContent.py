@@ -25,9 +25,12 @@
     $Id: executableContent.py 1061 2015-07-13 15:03:59Z landolfa $
 '''
 
-import logging
+import inspect
+import scxml4py.trace
 from functools import total_ordering
 
+logger = scxml4py.trace.logger
+
 @total_ordering
 class ExecutableContent(object):
     
@@ -66,19 +69,72 @@ class ExecutableContent(object):
             self.mActions.append(theAction)
 
     def execute(self, theContext):
-        for a in self.mActions:
-            logging.getLogger('scxml4py').debug("Executing action <" + a.getId() + ">")    
-            a.execute(theContext)
+        if scxml4py.trace.isDebugEnabled():
+            for a in self.mActions:
+                logger.debug("Executing action <%s>", a.getId())
+                a.execute(theContext)
+        else:
+            for a in self.mActions:
+                a.execute(theContext)
+        if theContext != None and self.mActions.__len__() > 0:
+            # actions may change what the guards depend on
+            theContext.incrementVersion()
             
     def evaluate(self, theContext):
-        res = True
+        if self.mActions.__len__() == 0:
+            return True
+        isDebug = scxml4py.trace.isDebugEnabled()
+        isCached = theContext != None and theContext.isGuardCacheEnabled()
         for a in self.mActions:
-            if a.evaluate(theContext) == False:
-                res = False
-                logging.getLogger('scxml4py').debug("Evaluating guard <" + a.getId() + "> == false")    
-                break
+            if isCached and a.isPure():
+                result = theContext.evaluateGuard(a)
             else:
-                logging.getLogger('scxml4py').debug("Evaluating guard <" + a.getId() + "> == true")           
-        return res 
-            
-    
\ No newline at end of file
+                result = a.evaluate(theContext)
+            if result == False:
+                if isDebug:
+                    logger.debug("Evaluating guard <%s> == false", a.getId())
+                return False
+            elif isDebug:
+                logger.debug("Evaluating guard <%s> == true", a.getId())
+        return True
+
+    async def executeAsync(self, theContext):
+        """
+        Same as execute but actions may be coroutines (async def execute).
+        """
+        isDebug = scxml4py.trace.isDebugEnabled()
+        for a in self.mActions:
+            if isDebug:
+                logger.debug("Executing action <%s>", a.getId())
+            result = a.execute(theContext)
+            if inspect.isawaitable(result):
+                await result
+        if theContext != None and self.mActions.__len__() > 0:
+            theContext.incrementVersion()
+
+    async def evaluateAsync(self, theContext):
+        """
+        Same as evaluate but guards may be coroutines (async def evaluate).
+        """
+        if self.mActions.__len__() == 0:
+            return True
+        isDebug = scxml4py.trace.isDebugEnabled()
+        isCached = theContext != None and theContext.isGuardCacheEnabled()
+        for a in self.mActions:
+            result = None
+            isPure = isCached and a.isPure()
+            if isPure:
+                result = theContext.getGuardResult(a)
+            if result is None:
+                result = a.evaluate(theContext)
+                if inspect.isawaitable(result):
+                    result = await result
+                if isPure:
+                    theContext.setGuardResult(a, result)
+            if result == False:
+                if isDebug:
+                    logger.debug("Evaluating guard <%s> == false", a.getId())
+                return False
+            elif isDebug:
+                logger.debug("Evaluating guard <%s> == true", a.getId())
+        return True
@@ -4,14 +4,20 @@
     @authors: landolfa
 '''
 
-import logging
-import functools
 import scxml4py.helper
+import scxml4py.trace
 from enum import Enum
-from queue import Queue
-from scxml4py.event import EventStatus
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from scxml4py.event import Event, EventStatus, DONE_INVOKE
+from scxml4py.configuration import Configuration
+from scxml4py.deferral import DeferredEventQueue
+from scxml4py.eventQueue import QueueType, createQueue, clearQueue
+from scxml4py.session import Session
 from scxml4py.state import HistoryType, StateAtomic, StateParallel, StateCompound, StateHistory
 
+logger = scxml4py.trace.logger
 
 class EventHandlingPolicy(Enum):
     SILENT = 0
@@ -21,25 +27,54 @@ class EventHandlingPolicy(Enum):
 
 class Executor(object):
     
-    def __init__(self, theStateMachine, theContext, externalEventQueue = None, internalEventQueue = None):
+    def __init__(self, theStateMachine, theContext, externalEventQueue = None, internalEventQueue = None, theQueueType = QueueType.THREADED, theSession = None):
+        """
+        theQueueType selects the backend of the queues created by the
+        Executor (the ones not given as parameters), see scxml4py.eventQueue:
+        THREADED (queue.Queue) when events are posted by other threads,
+        SIMPLE (deque, no locks) when a single thread drives the Executor,
+        ASYNC (asyncio.Queue) when the Executor runs in an event loop.
+
+        The runtime data (history values, activities) is kept in theSession
+        (see scxml4py.session), a new one is created if not given.
+        Several Executors, each with its own Session, can share the same
+        StateMachine.
+        """
         self.mStateMachine = theStateMachine
+        self.mIndex = None # dispatch tables compiled from the model
         self.mContext = theContext
         self.mEventHandlingPolicy = EventHandlingPolicy.SILENT
         self.mEventListeners = list()
         self.mStatusListeners = list()
-        self.mCurrentStatus = set()
-        self.mPreviousStatus = set()
+        self.mCurrentStatus = Configuration()
+        self.mPreviousStatus = Configuration()
         self.mStatesToInvoke = set()
+        if theSession == None:
+            theSession = Session(theContext, self.mCurrentStatus)
+        elif theSession.getConfiguration() != None:
+            self.mCurrentStatus = theSession.getConfiguration()
+        else:
+            theSession.setConfiguration(self.mCurrentStatus)
+        if theContext != None:
+            theSession.setContext(theContext)
+        self.mSession = theSession
         if internalEventQueue == None:
-            self.mInternalEvents = Queue()
+            self.mInternalEvents = createQueue(theQueueType)
         else:
             self.mInternalEvents = internalEventQueue
         if externalEventQueue == None:
-            self.mExternalEvents = Queue()
+            self.mExternalEvents = createQueue(theQueueType)
         else:
             self.mExternalEvents = externalEventQueue
         self.mContinue = False # is interpreted started
         self.mFinal = False    # is top level final state reached
+        self.mCompletion = {}  # compound/parallel state -> active final children/regions in a final state
+        self.mTrace = False    # debug traces enabled, see updateTrace
+        self.mDeferredEvents = DeferredEventQueue() # see EventHandlingPolicy.DEFFERRED
+        self.mReleasedEvents = deque() # deferred events to be processed again
+        self.mDeferredKey = None       # configuration the deferred events were last examined in
+        self.mEventlessDisabled = 0    # atomic states without enabled event-less transitions
+        self.mEventlessVersion = None  # context data version mEventlessDisabled refers to
 
     def getStatus(self):
         return self.mCurrentStatus
@@ -49,10 +84,19 @@ class Executor(object):
 
     def getContext(self):
         return self.mContext
+
+    def getSession(self):
+        return self.mSession
     
     def getEventHandlingPolicy(self):
         return self.mEventHandlingPolicy
 
+    def getDeferredEvents(self):
+        return self.mDeferredEvents
+
+    def getPreviousStatus(self):
+        return self.mPreviousStatus
+
     def isRunning(self):
         return self.mContinue
 
@@ -67,7 +111,10 @@ class Executor(object):
         - SILENT simply ignore the event
         - REJECT return an error message
         - DEFERRED leave the event in the queue until it can be process
+          (see deferEvent)
          """
+        self.updateIndex()
+        self.updateTrace()
         enabledTransitions = self.selectTransitions(e)
         return enabledTransitions.__len__() > 0
 
@@ -86,9 +133,7 @@ class Executor(object):
         @TODO
         if !(valid(doc)) {fail with error}
         """
-        logging.getLogger("scxml4py").debug("Starting execution of <" + self.mStateMachine.getId() + ">")
-        self.mContinue = True
-        self.mFinal = False
+        transList = self.initializeExecution()
 
         """
         Call executeTransitionContent on the initial transition that is a
@@ -101,7 +146,6 @@ class Executor(object):
         # List<Transition> transList = new LinkedList<Transition>();
         # transList.add(initalTrans);
 
-        transList = self.mStateMachine.getInitialTrans()
         if transList.__len__() == 0:
             # @TODO: throw exception no INITIAL state defined!
             return
@@ -118,41 +162,50 @@ class Executor(object):
         When all such transitions have been taken, we move to the main event loop,
         which is driven by external events.
         """
-        initialStepComplete = False
-        while initialStepComplete == False:
-            enabledTransitions = self.selectEventlessTransitions();
-            if enabledTransitions.__len__() == 0:
-                if self.mInternalEvents.empty() == False:
-                    # need to wait?
-                    internalEvent = self.mInternalEvents.get_nowait()
-                    #datamodel.assignValue("event", internalEvent)
-                    enabledTransitions = self.selectTransitions(internalEvent)
-            if enabledTransitions.__len__() > 0:
-                self.microstep(enabledTransitions)
-            else:
-                initialStepComplete = True
+        self.processInternalEvents()
         self.notifyStatusListeners(self.mCurrentStatus)
 
+    def initializeExecution(self):
+        """
+        Reset the execution state and return the initial transitions
+        of the model, see start.
+        """
+        self.updateTrace()
+        logger.debug("Starting execution of <%s>", self.mStateMachine.getId())
+        self.mContinue = True
+        self.mFinal = False
+        self.mCompletion.clear()
+        self.updateIndex()
+        return self.mStateMachine.getInitialTrans()
+
     def stop(self): 
-        logging.getLogger("scxml4py").debug("Stopping execution of <" + self.mStateMachine.getId() + ">")
+        logger.debug("Stopping execution of <%s>", self.mStateMachine.getId())
         self.mContinue = False
         self.exitInterpreter()
+        self.releaseExecution()
+
+    def releaseExecution(self):
+        """
+        Drop the configuration, the pending events and the session
+        data once the interpreter has been exited, see stop.
+        """
         self.mCurrentStatus.clear()
         self.mPreviousStatus.clear()
-        with self.mInternalEvents.mutex:
-            self.mInternalEvents.queue.clear()
-        with self.mExternalEvents.mutex:
-            self.mExternalEvents.queue.clear()
+        clearQueue(self.mInternalEvents)
+        clearQueue(self.mExternalEvents)
+        self.clearDeferredEvents()
+        self.mSession.release()
 
     def postEvent(self, theEvent):
-        logging.getLogger("scxml4py").debug("Adding event <" + theEvent.getId() + "> to the external queue")
+        if self.mTrace:
+            logger.debug("Adding event <%s> to the external queue", theEvent.getId())
         # @TODO: check the timeout option
         self.mExternalEvents.put(theEvent, True, 2) 
 
     def processEvent(self, theEvent):
-        logging.getLogger("scxml4py").debug("Adding event <" + theEvent.getId() + "> to the external queue")
-        # @TODO: check the timeout option
-        self.mExternalEvents.put(theEvent, True, 2) 
+        # the trace level may have changed since the last call
+        self.updateTrace()
+        self.postEvent(theEvent)
         self.processEvents()
         
     def processEvents(self):
@@ -189,87 +242,276 @@ class Executor(object):
         by the client every time there is an external event. This allows the
         client to implement the event loop
         """
+        if self.checkRunning() == False:
+            return
+        # the model may have been modified (e.g. cloned) since the last call
+        self.updateIndex()
+        self.updateTrace()
+        for e in self.iterMacrosteps():
+            self.processMacrostep(e)
+
+    def checkRunning(self):
         if self.mContinue == False:
             # @TODO throw exception: SM not started
-            logging.getLogger('scxml4py').debug("Events cannot be processed because execution has been stopped")
-            return
+            logger.debug("Events cannot be processed because execution has been stopped")
+        return self.mContinue
+
+    def hasPendingEvents(self):
+        return self.mExternalEvents.empty() == False or self.mInternalEvents.empty() == False or self.mReleasedEvents.__len__() > 0
 
-        # run until no events are left in the queues and no eventless transitions are enabled
-        while self.mExternalEvents.empty() == False or self.mInternalEvents.empty() == False:
+    def iterMacrosteps(self):
+        """
+        Yield the external event of each macrostep (None if only internal
+        events are left) to be processed by processMacrostep, until no
+        events are left in the queues. The macrostep is completed when
+        the iteration is resumed.
+        """
+        while self.mContinue and self.hasPendingEvents():
+            # deferred events released by the last configuration change come first
+            if self.mReleasedEvents.__len__() > 0:
+                yield self.mReleasedEvents.popleft()
             # this call should/could blocks until an event is available
-            if self.mExternalEvents.empty() == False:
+            elif self.mExternalEvents.empty() == False:
                 # @TODO with or without timeout?
-                externalEvent = self.mExternalEvents.get_nowait()
-                self.mContext.setLastEvent(externalEvent)
-                logging.getLogger("scxml4py").debug("Processing external event <" + externalEvent.getId() + ">")
+                yield self.mExternalEvents.get_nowait()
+            else:
+                yield None
+            self.completeMacrostep()
 
-                # @TODO
-                # datamodel.assignValue("event",externalEvent)
-                enabledTransitions = self.selectTransitions(externalEvent)
-                if enabledTransitions.__len__() > 0:
-                    self.microstep(enabledTransitions)
-                    # now take any newly enabled null transitions
-                    # and any transitions triggered by internal events
-                    self.processInternalEvents()
-                    externalEvent.setStatus(EventStatus.PROCESSED);
-                else:
-                    if self.getEventHandlingPolicy() == EventHandlingPolicy.REJECT:
-                        externalEvent.setStatus(EventStatus.REJECTED)
-                    else:
-                        externalEvent.setStatus(EventStatus.IGNORED)
-                self.notifyEventListeners(externalEvent)
-            if self.mInternalEvents.empty() == False:
-                self.processInternalEvents()
-            # Note that invokation may rise internal events.
+    def iterBatch(self, theEvents, theStatuses, theProcessedEvents):
+        """
+        Same as iterMacrosteps for the events of a batch, each one followed
+        by the deferred events it releases. The status of the events of the
+        batch is appended to theStatuses, all the processed events
+        to theProcessedEvents.
+        """
+        for e in theEvents:
+            if self.mContinue == False:
+                break
+            yield e
+            self.completeMacrostep()
+            theStatuses.append(e.getStatus().value)
+            theProcessedEvents.append(e)
+            while self.mReleasedEvents.__len__() > 0:
+                released = self.mReleasedEvents.popleft()
+                yield released
+                self.completeMacrostep()
+                theProcessedEvents.append(released)
+
+    def processMacrostep(self, externalEvent):
+        if externalEvent is not None:
+            self.processExternalEvent(externalEvent)
+        if self.mInternalEvents.empty() == False:
+            self.processInternalEvents()
+
+    def processEventBatch(self, theEvents, isNotificationAccumulated = False):
+        """
+        Process a sequence (any iterable, e.g. a generator) of external events
+        without going through the external event queue.
+        Each event is processed with run-to-completion semantics, exactly
+        as if it was passed to processEvent.
+
+        If isNotificationAccumulated is True the listeners are notified only
+        once the whole batch has been processed: the event listeners receive
+        the events in processing order and the status listeners receive
+        only the final configuration.
+
+        Returns an array('B') with the EventStatus value of each processed event.
+        """
+        statuses = array("B")
+        if self.checkRunning() == False:
+            return statuses
+        self.updateIndex()
+        self.updateTrace()
+        # events already in the queues come first
+        for e in self.iterMacrosteps():
+            self.processMacrostep(e)
+        processedEvents = list()
+        with self.accumulateNotifications(isNotificationAccumulated, processedEvents):
+            for e in self.iterBatch(theEvents, statuses, processedEvents):
+                self.processMacrostep(e)
+        return statuses
+
+    @contextmanager
+    def accumulateNotifications(self, isNotificationAccumulated, theProcessedEvents):
+        """
+        If isNotificationAccumulated is True, hold the notifications
+        until the end of the block, then notify the event listeners of
+        theProcessedEvents and the status listeners of the final
+        configuration (see processEventBatch).
+        """
+        if isNotificationAccumulated == False:
+            yield
+            return
+        eventListeners = self.mEventListeners
+        statusListeners = self.mStatusListeners
+        self.mEventListeners = list()
+        self.mStatusListeners = list()
+        try:
+            yield
+        finally:
+            self.mEventListeners = eventListeners
+            self.mStatusListeners = statusListeners
+        for e in theProcessedEvents:
+            self.notifyEventListeners(e)
+        if theProcessedEvents.__len__() > 0:
+            self.notifyStatusListeners(self.mCurrentStatus)
+
+    def processExternalEvent(self, externalEvent):
+        """
+        Select and execute the transitions enabled by an external event,
+        then take the transitions enabled by internal events
+        and notify the event listeners.
+        """
+        self.setCurrentEvent(externalEvent, "external")
+        enabledTransitions = self.selectTransitions(externalEvent)
+        if enabledTransitions.__len__() > 0:
+            self.microstep(enabledTransitions)
+            # now take any newly enabled null transitions
+            # and any transitions triggered by internal events
+            self.processInternalEvents()
+        self.completeExternalEvent(externalEvent, enabledTransitions.__len__() > 0)
+
+    def setCurrentEvent(self, theEvent, theKind):
+        self.mContext.setLastEvent(theEvent)
+        if self.mTrace:
+            logger.debug("Processing %s event <%s>", theKind, theEvent.getId())
+
+    def completeExternalEvent(self, externalEvent, isProcessed):
+        """
+        Set the status of an external event according to the event
+        handling policy if it did not enable any transition,
+        then notify the event listeners if the status has changed:
+        they are not notified again of a released event deferred again.
+        """
+        status = externalEvent.getStatus()
+        if isProcessed:
+            externalEvent.setStatus(EventStatus.PROCESSED)
+        elif self.getEventHandlingPolicy() == EventHandlingPolicy.REJECT:
+            externalEvent.setStatus(EventStatus.REJECTED)
+        elif self.getEventHandlingPolicy() == EventHandlingPolicy.DEFFERRED:
+            self.deferEvent(externalEvent)
+        else:
+            externalEvent.setStatus(EventStatus.IGNORED)
+        if status != EventStatus.DEFERRED or externalEvent.getStatus() != EventStatus.DEFERRED:
+            self.notifyEventListeners(externalEvent)
+
+    def deferEvent(self, theEvent):
+        """
+        Keep theEvent in the deferred events queue (status DEFERRED) until
+        a configuration which accepts it is reached, see releaseDeferredEvents.
+        A released event deferred again keeps its arrival order.
+        The event listeners are notified of an event dropped because the
+        queue is full, theEvent is REJECTED if it does not fit.
+        """
+        discarded = self.mDeferredEvents.defer(theEvent)
+        if self.mTrace:
+            logger.debug("Deferring event <%s>", theEvent.getId())
+        if discarded is not None and discarded is not theEvent:
+            self.notifyEventListeners(discarded)
+
+    def releaseDeferredEvents(self):
+        """
+        If the configuration has changed since the deferred events were
+        last examined, move the ones accepted by the new configuration
+        (see ModelIndex.isEventAccepted) to the released events, which
+        are processed before the next external event.
+        The other deferred events are not examined.
+        """
+        key = self.mCurrentStatus.getKey()
+        if key == self.mDeferredKey:
+            return
+        self.mDeferredKey = key
+        accepted = self.mIndex.getAcceptedEvents(key)
+        ids = {i for i in self.mDeferredEvents.getIds() if self.mIndex.isEventAccepted(accepted, i)}
+        events = self.mDeferredEvents.release(ids)
+        if events.__len__() > 0:
+            if self.mTrace:
+                logger.debug("Releasing deferred events <%s>", " ".join(str(e.getId()) for e in events))
+            self.mReleasedEvents.extend(events)
+
+    def clearDeferredEvents(self):
+        self.mDeferredEvents.clear()
+        self.mReleasedEvents.clear()
+        self.mDeferredKey = None
+
+    def completeMacrostep(self):
+        # Note that invokation may rise internal events.
+        if self.mStatesToInvoke.__len__() > 0:
             for s in self.mStatesToInvoke:
                 if type(s) == StateAtomic:
-                    s.startActivities()
+                    self.mSession.startActivities(s)
             self.mStatesToInvoke.clear()
-            self.mPreviousStatus = self.mCurrentStatus
-
+        self.mPreviousStatus = self.mCurrentStatus.snapshot()
+        if self.mDeferredEvents.__len__() > 0:
+            self.releaseDeferredEvents()
 
     def processInternalEvents(self): 
         macroStepCompleted = False
-        while macroStepCompleted == False:
+        while macroStepCompleted == False and self.mContinue:
             enabledTransitions = self.selectEventlessTransitions()
             if enabledTransitions.__len__() == 0:
-                if self.mInternalEvents.empty() == False:
-                    # @TODO do we need a timeout?
-                    internalEvent = self.mInternalEvents.get_nowait()
-                    #mInternalEvents.pop();
-                    assert(internalEvent != None)
-                    self.mContext.setLastEvent(internalEvent)
-                    logging.getLogger("scxml4py").debug("Processing internal event <" + internalEvent.getId() + ">")
-                    # @TODO
-                    #datamodel.assignValue("event", internalEvent)
+                internalEvent = self.nextInternalEvent()
+                if internalEvent != None:
                     enabledTransitions = self.selectTransitions(internalEvent);
                 else:
                     macroStepCompleted = True    
             if enabledTransitions.__len__() != 0:
                 self.microstep(enabledTransitions)
 
+    def nextInternalEvent(self):
+        """
+        Take the next internal event and make it the last event of the
+        context, return None if the internal queue is empty.
+        """
+        if self.mInternalEvents.empty():
+            return None
+        # @TODO do we need a timeout?
+        internalEvent = self.mInternalEvents.get_nowait()
+        self.setCurrentEvent(internalEvent, "internal")
+        return internalEvent
+
     def exitInterpreter(self):
         """
         The purpose of this procedure is to exit the current SCXML process
         by exiting all active states.
         If the machine is in a top-level final state, a Done event is generated.
         """
-        inFinalState = False
+        statesToExit = self.computeInterpreterExitSet()
+        for s in statesToExit:
+            s.getExitActions().execute(self.mContext)
+            self.mSession.cancelActivities(s)
+        self.completeInterpreterExit(statesToExit)
+
+    def computeInterpreterExitSet(self):
         statesToExit = scxml4py.helper.getAncestorsList(self.mCurrentStatus)
         # sort statesToExit in exitOrder
-        statesToExit.sort(key=functools.cmp_to_key(scxml4py.helper.compareStates), reverse=True)
+        statesToExit.sort(key=scxml4py.helper.exitOrder, reverse=True)
+        return statesToExit
+
+    def completeInterpreterExit(self, statesToExit):
+        """
+        Clear the configuration once statesToExit have been exited and
+        send the done event if one of them is a top-level final state.
+        """
+        inFinalState = False
         for s in statesToExit:
-            s.getExitActions().execute(self.mContext)
-            s.cancelActivities()
             if s.isFinal() == True and s.getParent() == None:
                 inFinalState = True
-                
         self.mCurrentStatus.clear()
+        self.mCompletion.clear()
 
         if inFinalState:
-            # @TODO
-            # sendDoneEvent(???);
-            pass
+            self.sendDoneEvent()
+
+    def sendDoneEvent(self):
+        """
+        Report that the machine has reached a top-level final state
+        (SCXML returnDoneEvent): there is no invoking session,
+        the done.invoke event is notified to the event listeners.
+        """
+        doneEvent = Event(DONE_INVOKE + str(self.mStateMachine.getId()), theStatus = EventStatus.PROCESSED)
+        self.notifyEventListeners(doneEvent)
 
     def selectEventlessTransitions(self):
         """
@@ -286,21 +528,61 @@ class Executor(object):
         configuration. If no such transition is found in the state or its ancestors,
         proceed to the next state in the configuration. When all atomic states have
         been visited and transitions selected, return the set of enabled transitions.
+
+        Only the active atomic states with event-less candidates are visited
+        (see ModelIndex.getEventlessMask): there is nothing to do in the
+        configurations without event-less transitions. The states whose
+        candidates are guarded by pure guards only and were found disabled
+        are not visited again as long as they stay active and the context
+        data does not change (see Context.getDataVersion), provided the
+        guard cache is enabled (see getPureEventlessMask).
         """
         enabledTransitions = list()
-        atomicStates = scxml4py.helper.getAtomicStates(self.mCurrentStatus)
-        for s in atomicStates:
-            if scxml4py.helper.isPreempted(s, enabledTransitions) == False:
-                ancestors = scxml4py.helper.getAncestorsList([s])
-                # order ancestors in exitOrder
-                ancestors.sort(key=functools.cmp_to_key(scxml4py.helper.compareStates), reverse=True)
-                for a in ancestors:
-                    transitions = a.getTransitions()
-                    for t in transitions:
-                        if t.isEnabled(self.mContext) == True:
-                            enabledTransitions.append(t)                           
-        logging.getLogger("scxml4py").debug("Selected event-less transitions:\n" + scxml4py.helper.formatTransitions(enabledTransitions))
+        mask = self.getEventlessStates()
+        if mask == 0:
+            return enabledTransitions
+        for s, candidates in self.iterCandidates(self.mCurrentStatus.iterStates(mask), None, enabledTransitions):
+            if self.enableTransition(candidates, enabledTransitions) == False:
+                self.disableEventless(s)
+        if self.mTrace:
+            logger.debug("Selected event-less transitions:\n%s", scxml4py.helper.formatTransitions(enabledTransitions))
         return enabledTransitions
+
+    def getPureEventlessMask(self):
+        """
+        Atomic states whose disabled event-less candidates are not evaluated
+        again until the context data changes. Pure guards are only stable
+        during a microstep (see Action.isPure): across microsteps their
+        result is reused only when the guard cache is enabled
+        (see Context.setGuardCacheEnabled).
+        """
+        if self.mContext == None or self.mContext.isGuardCacheEnabled() == False:
+            return 0
+        return self.mIndex.getPureEventlessMask()
+
+    def disableEventless(self, s):
+        # none of the event-less candidates of s is enabled
+        if (self.getPureEventlessMask() >> s.mDocOrder) & 1 == 1:
+            self.mEventlessDisabled |= 1 << s.mDocOrder
+
+    def getEventlessStates(self):
+        """
+        Return the mask of the active atomic states whose event-less
+        candidates have to be evaluated. The states added to
+        mEventlessDisabled are skipped until the context data changes.
+        """
+        key = self.mCurrentStatus.getKey()
+        mask = key & self.mIndex.getEventlessMask()
+        if mask == 0:
+            return 0
+        version = self.mContext.getDataVersion() if self.mContext != None else None
+        if version == self.mEventlessVersion:
+            # still active and disabled since the last selection
+            self.mEventlessDisabled &= key
+            return mask & ~self.mEventlessDisabled
+        self.mEventlessDisabled = 0
+        self.mEventlessVersion = version
+        return mask
  
     def selectTransitions(self, e):
         """
@@ -326,8 +608,20 @@ class Executor(object):
         return the set of enabled transitions.
         """
         enabledTransitions = list()
-        atomicStates = scxml4py.helper.getAtomicStates(self.mCurrentStatus)
-        for s in atomicStates:
+        eventId = e.getId()
+        for s, candidates in self.iterCandidates(self.mCurrentStatus.getAtomicStates(), eventId, enabledTransitions):
+            self.enableTransition(candidates, enabledTransitions)
+        if self.mTrace:
+            logger.debug("Selected transitions on event <%s>:\n%s", eventId, scxml4py.helper.formatTransitions(enabledTransitions))
+        return enabledTransitions
+
+    def iterCandidates(self, theStates, theEventId, enabledTransitions):
+        """
+        Yield the atomic states of theStates which are not preempted by
+        the transitions already in enabledTransitions, with their candidate
+        transitions for theEventId (None for the event-less ones).
+        """
+        for s in theStates:
             """
             @TODO
             event is the result of an <invoke> in this state
@@ -336,33 +630,32 @@ class Executor(object):
             }
             """
             if scxml4py.helper.isPreempted(s, enabledTransitions) == False:
-                ancestors = scxml4py.helper.getAncestorsList([s])
-                # order ancestors in exitOrder
-                ancestors.sort(key=functools.cmp_to_key(scxml4py.helper.compareStates), reverse=True)
-                foundTrans = False
-                for a in ancestors:
-                    transList = a.getTransitions()
-                    for t in transList:
-                        if t.isEnabled(self.mContext, e) == True:
-                            """
-                            Care has to be taken not to add the SAME transition more than once.
-                            Consider the case of 2 active substates (orthogonal regions) and a
-                            common superstate with internal transition or self-transition:
-                            the transition should NOT be executed twice (one per region)!
-                            """
-                            #if (t in enabledTransitions) == False:
-                            if scxml4py.helper.isTransitionInList(t, enabledTransitions) == False:
-                                enabledTransitions.append(t)
-                                foundTrans = True
-                                break
-                    """
-                    one transition has been found, proceed with the next
-                    atomic state in the configuration.
-                    """
-                    if foundTrans == True:
-                        break;
-        logging.getLogger("scxml4py").debug("Selected transitions on event <" + e.getId() + ">:\n" + scxml4py.helper.formatTransitions(enabledTransitions))
-        return enabledTransitions
+                # candidates are the transitions triggered by the event,
+                # already in exit order (state first, then ancestors)
+                # and in document order: only the guards have to be evaluated.
+                yield s, self.mIndex.getTransitions(s, theEventId)
+
+    def enableTransition(self, candidates, enabledTransitions):
+        """
+        Add to enabledTransitions the first of the candidates whose guard
+        is true. Return True if the guard of one of the candidates is true.
+        """
+        isEnabled = False
+        for t in candidates:
+            if t.getConditions().evaluate(self.mContext) == True:
+                isEnabled = True
+                """
+                Care has to be taken not to add the SAME transition more than once.
+                Consider the case of 2 active substates (orthogonal regions) and a
+                common superstate with internal transition or self-transition:
+                the transition should NOT be executed twice (one per region)!
+                """
+                if scxml4py.helper.isTransitionInList(t, enabledTransitions) == False:
+                    enabledTransitions.append(t)
+                    # one transition has been found, proceed with the next
+                    # atomic state in the configuration.
+                    break
+        return isEnabled
 
     def microstep(self, enabledTransitions):
         """
@@ -373,6 +666,8 @@ class Executor(object):
         in the sense that their source states must first be exited, then their actions must
         be executed, and finally their target states entered.
         """
+        # guards are pure only for the duration of a microstep
+        self.mContext.invalidateGuardResults()
         self.exitStates(enabledTransitions)
         self.executeTransitionContent(enabledTransitions)
         self.enterStates(enabledTransitions)
@@ -416,45 +711,57 @@ class Executor(object):
                   cancelInvoke(inv)
                configuration.delete(s)
         """
+        statesToExit = self.computeExitSet(enabledTransitions)
+        # finally exit the states by executing the exit actions
+        for s in statesToExit:
+            if self.mTrace:
+                logger.debug("Exiting state <%s> (%s)", s.getId(), s.getType())
+            s.getExitActions().execute(self.mContext)
+            self.removeFromStatus(s)
+
+    def computeExitSet(self, enabledTransitions):
+        """
+        Return the states exited by the transitions in exit order,
+        after updating the history values.
+        """
         statesToExit = list()
         for t in enabledTransitions:
-            targets = t.getTargets()
-            if targets.__len__() > 0:
-                LCA = scxml4py.helper.findLeastCommonAncestor(t.getSource(), targets[0])
-                for s in self.mCurrentStatus:
-                    if s.isDescendantFrom(LCA) == True:
-                        statesToExit.append(s)        
-                # self transition specified with target state -> change of state required
-                if t.getSource() == targets[0] and t.getSource() != None:
-                    statesToExit.append(t.getSource())
+            self.addStatesToExit(t, statesToExit)
 
         # Remove from the list of activities to start the ones related to states to be exited
-        for s in statesToExit:
-            if scxml4py.helper.isStateInList(s, self.mStatesToInvoke) == True:
-                self.mStatesToInvoke.remove(s)
+        if self.mStatesToInvoke.__len__() > 0:
+            for s in statesToExit:
+                self.mStatesToInvoke.discard(s)
 
         # sort the exit states in reverse order (nested states first)
-        statesToExit.sort(key=functools.cmp_to_key(scxml4py.helper.compareStates), reverse=True)
+        statesToExit.sort(key=scxml4py.helper.exitOrder, reverse=True)
     
         # Update history stack (if any).
         for s in statesToExit:
             h = s.getHistory()
             if h != None:
-                for s0 in self.mCurrentStatus:
-                    if h.getHistoryType() == HistoryType.DEEP:
-                        if type(s0) == StateAtomic and s0.isDescendantFrom(s):
-                            h.pushHistoryValue(s0)
-                    else:
-                        assert(h.getHistoryType() == HistoryType.SHALLOW)
-                        if s0.getParent() == s:
-                            h.pushHistoryValue(s0)
-                            
-        # finally exit the states by executing the exit actions
-        for s in statesToExit:
-            logging.getLogger('scxml4py').debug("Exiting state <" + s.getId() + "> (" + s.getType().__str__() + ")")
-            s.getExitActions().execute(self.mContext)
-            s.cancelActivities()
-            self.mCurrentStatus.remove(s)
+                # active atomic descendants or active children of s
+                if h.getHistoryType() == HistoryType.DEEP:
+                    mask = self.mIndex.getDescendantMask(s) & self.mIndex.getAtomicMask()
+                else:
+                    assert(h.getHistoryType() == HistoryType.SHALLOW)
+                    mask = self.mIndex.getChildMask(s)
+                for s0 in self.mCurrentStatus.iterStates(self.mCurrentStatus.getKey() & mask):
+                    self.mSession.pushHistoryValue(h, s0)
+        return statesToExit
+
+    def addStatesToExit(self, t, statesToExit):
+        """
+        Add the active states exited by t (not yet in exit order):
+        the active states in the exit mask of the transition plan
+        (see ModelIndex.getPlan).
+        """
+        plan = self.mIndex.getPlan(t)
+        mask = self.mCurrentStatus.getKey() & plan.mExitMask
+        if mask != 0:
+            statesToExit.extend(self.mCurrentStatus.iterStates(mask))
+        if plan.mSource is not None:
+            statesToExit.append(plan.mSource)
 
     def executeTransitionContent(self, enabledTransitions):
         # For each transition in the list of enabledTransitions, execute its executable content.
@@ -462,86 +769,149 @@ class Executor(object):
             t.getActions().execute(self.mContext)
 
     def enterStates(self, enabledTransitions):
+        statesToEnter, statesForDefaultEntry = self.computeEntrySet(enabledTransitions)
+        if statesForDefaultEntry.__len__() > 0:
+            statesForDefaultEntry = set(statesForDefaultEntry)
+
+        # Update current status and execute entry and initial transition actions.
+        for s in statesToEnter:
+            self.addToStatus(s)
+            s.getEntryActions().execute(self.mContext)
+            
+            if s in statesForDefaultEntry:
+                # @TODO
+                #executeContent(s.initial.transition.children())
+                initTrans = s.getInitialTrans()
+                for t in initTrans:
+                    t.getActions().execute(self.mContext)
+            self.checkFinalStates(s)
+
+    def computeEntrySet(self, enabledTransitions):
+        """
+        Return the states entered by the transitions in entry order
+        and the compound states entered by default.
+
+        The entries which do not involve history states are taken from
+        the transition plans (see ModelIndex.getPlan), the other ones are
+        computed by addStatesToEnter.
+        """
+        if enabledTransitions.__len__() == 1:
+            plan = self.mIndex.getPlan(enabledTransitions[0])
+            if plan.mStatesToEnter is not None:
+                # already in entry order
+                for h in plan.mHistories:
+                    self.mSession.clearHistoryValues(h)
+                return list(plan.mSortedStatesToEnter), list(plan.mStatesForDefaultEntry)
+
         statesToEnter = list()
         statesForDefaultEntry = list()
 
         # Build a list of the states to enter.
         for t in enabledTransitions:
+            plan = self.mIndex.getPlan(t)
+            if plan.mStatesToEnter is not None:
+                statesToEnter.extend(plan.mStatesToEnter)
+                statesForDefaultEntry.extend(plan.mStatesForDefaultEntry)
+                continue
             targets = t.getTargets()
             if targets.__len__() > 0:
                 # @TODO should be LCA between source and all targets !!! TOBEFIXED
                 # LCA = findLCA([t.parent()].append(getTargetStates(t)))
-                LCA = scxml4py.helper.findLeastCommonAncestor(t.getSource(), targets[0])
+                LCA = t.getDomain()
                 self.addStatesToEnter(targets[0], LCA, statesToEnter, statesForDefaultEntry)
 
         # Reset history state after entering states containing history.
         for s in statesToEnter:
             h = s.getHistory()
             if h != None:
-                h.clearHistoryValues()
+                self.mSession.clearHistoryValues(h)
 
-        # Update current status and execute entry and initial transition actions.
-        statesToEnter.sort(key=functools.cmp_to_key(scxml4py.helper.compareStates), reverse=False)
-        for s in statesToEnter:
-            self.mCurrentStatus.add(s)
-            self.mStatesToInvoke.add(s)
+        statesToEnter.sort(key=scxml4py.helper.entryOrder)
+        return statesToEnter, statesForDefaultEntry
 
-            """
-            After updating the current status with the entering states and
-            before executing the entry actions, notify the listener on the
-            change of state. This allows the listener to get the new state
-            configuration before for example a reply is sent by an entry 
-            action (for example an ONLINE command which changes states from
-            STANDBY to ONLINE: the reply should be sent after the notification
-            has been done.
-            """
-            self.notifyStatusListeners(self.mCurrentStatus)
-            logging.getLogger("scxml4py").debug("Entering state <"+s.getId()+">")
-            s.getEntryActions().execute(self.mContext)
-            
-            #if s in statesForDefaultEntry == True:
-            if scxml4py.helper.isStateInList(s, statesForDefaultEntry) == True:
-                # @TODO
-                #executeContent(s.initial.transition.children())
-                initTrans = s.getInitialTrans()
-                for t in initTrans:
-                    t.getActions().execute(self.mContext)
-    
-            # if s is a final state, generate relevant Done events
-            if s.isFinal() == True:
-                #State parent = s.getParent();
-                #State grandparent = parent.getParent();
-                # @TODO
-                """
-                doneEvent = Event(parent.getId()+".Done", Event.EventType.CHANGE_EVENT);
-                mInternalEvents.add(doneEvent);
-                if (grandparent.isParallel() == true) {
-                    List<State> substates = grandparent.getSubstates();
-                    for (Iterator<State> it1 = substates.iterator(); it1.hasNext();) {
-                            State s1 = it1.next();
-                        if (isInFinalState(s) == true) {
-                                    Event doneEvent1 = new Event(s1.getParent().getId()+".Done", Event.EventType.CHANGE_EVENT);
-                        mInternalEvents.add(doneEvent1);
-                            }
-                    }
-                }
-                """
-                    
-            # If we have reached a top-level final state, exit the interpreter.
-            for s in self.mCurrentStatus:
-                if s.isFinal() == True and s.getParent() == None:
-                    self.mFinal = True;
-                    # self.mContinue = False
-                    logging.getLogger('scxml4py').debug("enterStates: reached top-level final state -> mFinal = true")
+    def addToStatus(self, s):
+        self.mCurrentStatus.add(s)
+        self.mStatesToInvoke.add(s)
+
+        """
+        After updating the current status with the entering states and
+        before executing the entry actions, notify the listener on the
+        change of state. This allows the listener to get the new state
+        configuration before for example a reply is sent by an entry 
+        action (for example an ONLINE command which changes states from
+        STANDBY to ONLINE: the reply should be sent after the notification
+        has been done.
+        """
+        self.notifyStatusListeners(self.mCurrentStatus)
+        if self.mTrace:
+            logger.debug("Entering state <%s>", s.getId())
 
+    def removeFromStatus(self, s):
+        # once the exit actions have been executed
+        self.mSession.cancelActivities(s)
+        self.mCurrentStatus.remove(s)
+        if s.mIsFinal:
+            self.updateCompletion(s, -1)
+
+    def checkFinalStates(self, s):
+        """
+        If s is a final state, post the done.state events to the internal
+        queue in the order of the SCXML enterStates procedure: the one of
+        the parent of s, then the one of its grandparent if it is a
+        parallel state whose regions are all in a final state.
+        The regions are not scanned, see updateCompletion.
+        """
+        if s.mIsFinal == False:
+            return
+        parent = s.getParent()
+        if parent == None:
+            # top-level final state
+            self.mFinal = True
+            logger.debug("enterStates: reached top-level final state -> mFinal = true")
+            return
+        self.updateCompletion(s, 1)
+        self.mInternalEvents.put_nowait(Event(self.mIndex.getDoneEventId(parent)))
+        grandparent = parent.getParent()
+        if grandparent != None and grandparent.isParallel() and self.isInFinalState(grandparent):
+            self.mInternalEvents.put_nowait(Event(self.mIndex.getDoneEventId(grandparent)))
+
+    def isInFinalState(self, s):
+        """
+        A compound state is in a final state if one of its final children
+        is active, a parallel state if all its regions are in a final state.
+        """
+        n = self.mCompletion.get(s, 0)
+        if s.isParallel():
+            return n == self.mIndex.getRegionCount(s)
+        return n > 0
+
+    def updateCompletion(self, s, delta):
+        """
+        Update the completion counters when the final state s is entered
+        (delta = 1) or exited (delta = -1): the counter of its parent and,
+        as long as their completion changes, the ones of the enclosing
+        parallel states. It costs O(1) per nesting level whatever the
+        number of regions.
+        """
+        p = s.getParent()
+        if p == None or p.isCompound() == False:
+            return
+        while True:
+            wasInFinalState = self.isInFinalState(p)
+            self.mCompletion[p] = self.mCompletion.get(p, 0) + delta
+            if self.isInFinalState(p) == wasInFinalState:
+                return
+            p = p.getParent()
+            if p == None or p.isParallel() == False:
+                return
 
     def addStatesToEnter(self, s, root, statesToEnter, statesForDefaultEntry): 
         assert(s != None)
         # 'root' can be NULL
-        #logging.getLogger('scxml4py').debug("State to enter: <" + s.getId() + "> (" + s.getType().__str__() + ")")    
+        #logger.debug("State to enter: <" + s.getId() + "> (" + s.getType().__str__() + ")")    
         if type(s) == StateHistory:
             # transition to history state
-            values = s.getHistoryValues()
+            values = self.mSession.getHistoryValues(s)
             if values.__len__() > 0:
                 # Add the states in the history stack to the list of states to enter.
                 for h in values:
@@ -583,16 +953,46 @@ class Executor(object):
                             self.addStatesToEnter(substate, ancestor, statesToEnter, statesForDefaultEntry)
 
 
+    def updateIndex(self):
+        """
+        Get the compiled model index, the StateMachine rebuilds it if the
+        model has been modified. The configurations are re-encoded
+        when the index changes.
+        """
+        index = self.mStateMachine.getIndex()
+        if index is not self.mIndex:
+            self.mIndex = index
+            self.mEventlessDisabled = 0
+            self.mEventlessVersion = None
+            self.mCurrentStatus.rebind(index)
+            self.mPreviousStatus.rebind(index)
+
+    def updateTrace(self):
+        """
+        Evaluate once per macrostep whether debug traces have to be produced
+        (see scxml4py.trace): when they are disabled the hot loop does not
+        format any message nor query the logger.
+        """
+        self.mTrace = scxml4py.trace.isDebugEnabled()
+
     def setModel(self, theStateMachine):
         self.mStateMachine = theStateMachine
         
     def setContext(self, theContext):
         self.mContext = theContext
+        self.mSession.setContext(theContext)
         
     def setEventHandlingPolicy(self, policy):
-        assert(policy >= EventHandlingPolicy.SILENT)
-        assert(policy <= EventHandlingPolicy.DEFFERRED)
+        assert(policy in EventHandlingPolicy)
         self.mEventHandlingPolicy = policy
+
+    def setDeferredEvents(self, theDeferredEvents):
+        """
+        Replace the deferred events queue, e.g. to change its capacity
+        or its overflow policy (see scxml4py.deferral).
+        """
+        self.clearDeferredEvents()
+        self.mDeferredEvents = theDeferredEvents
             
     def addEventListener(self, eventListener):
         assert(eventListener != None)
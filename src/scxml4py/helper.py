@@ -4,7 +4,12 @@
     @authors: landolfa
 '''
 
+from scxml4py.registry import Registry
+
 def getAtomicStates(states):
+    if hasattr(states, "getAtomicStates"):
+        # scxml4py.configuration.Configuration
+        return states.getAtomicStates()
     atomicStates = list()
     for s in states:
         if s.isAtomic() == True:
@@ -37,7 +42,10 @@ def getAncestorsSet(states):
 def findLeastCommonAncestor(s1, s2):
     if s1 == None or s2 == None:
         return None
-    if s1.getId() == s2.getId():
+    if s1.isFinalized() and s2.mModelIndex is s1.mModelIndex:
+        # constant time query on the compiled model
+        return s1.mModelIndex.findLeastCommonAncestor(s1, s2)
+    if s1 is s2:
         return s1 # self-transition
     elif s1.isDescendantFrom(s2) == True: 
         return s2 # s2 is ancestor of s1
@@ -63,6 +71,8 @@ def findLeastCommonAncestor(s1, s2):
 def findActionInList(theActionId, theList):
     if theList == None:
         return None
+    if isinstance(theList, Registry):
+        return theList.get(theActionId)
     for a in theList:
         if a.getId() == theActionId:
             return a
@@ -71,6 +81,8 @@ def findActionInList(theActionId, theList):
 def findActivityInList(theActivityId, theList):
     if theList == None:
         return None
+    if isinstance(theList, Registry):
+        return theList.get(theActivityId)
     for a in theList:
         if a.getId() == theActivityId:
             return a
@@ -89,10 +101,8 @@ def isPreempted(s, transitions):
      """
     preempted = False
     for t in transitions:
-        source = t.getSource()
-        targets = t.getTargets()
-        if targets.__len__() > 0:
-            LCA = findLeastCommonAncestor(source, targets[0])
+        if t.getTargets().__len__() > 0:
+            LCA = t.getDomain()
             if s.isDescendantFrom(LCA):
                 preempted = True
                 break
@@ -105,8 +115,8 @@ def compareStates(s1, s2):
     returns false: otherwise.
     """    
     if s1 != s2:
-        p1 = s1.countParents()
-        p2 = s2.countParents()
+        p1 = s1.getDepth()
+        p2 = s2.getDepth()
         if p1 < p2:
             return -1
         elif p1 > p2:
@@ -115,6 +125,20 @@ def compareStates(s1, s2):
             return 0
     return 0
 
+def exitOrder(s):
+    """
+    Sort key for exit order (reverse document order: nested states first,
+    then the later siblings first), to be used with reverse=True.
+    The states must be part of a compiled model, see ModelIndex.
+    """
+    return s.getDocumentOrder()
+
+def entryOrder(s):
+    """
+    Sort key for entry order (document order: ancestors first).
+    """
+    return s.getDocumentOrder()
+
 def isStateInList(theState, theList):
     for s in theList:
         # if myState.getId() == s.getId():
@@ -123,10 +147,8 @@ def isStateInList(theState, theList):
     return False
     
 def isTransitionInList(theTrans, theList):
-    for t in theList:
-        if t == theTrans:
-            return True
-    return False
+    # transitions are compared by identity
+    return theTrans in theList
         
 def getClonedStateAbsId(regionNo, rootState, state, absId):
     
@@ -0,0 +1,509 @@
+'''
+    modelIndex module part of scxml4py.
+
+    @authors: landolfa
+'''
+
+import threading
+from scxml4py.exceptions import ScxmlError
+from scxml4py.event import DONE_STATE, internId
+from scxml4py.eventDescriptor import DescriptorTrie, parseDescriptors
+
+# bound of the caches of accepted events per configuration
+# and of matching descriptors per event id
+MAX_ACCEPTED_SETS = 4096
+MAX_EVENT_IDS = 4096
+
+
+class TransitionPlan(object):
+    """
+    States exited and entered by a transition, computed once by the
+    ModelIndex (see ModelIndex.getPlan):
+
+    - mExitMask: the proper descendants of the domain of the transition,
+      a range in document order. The states exited are the active ones
+      in the mask (plus mSource for a self transition).
+    - mStatesToEnter: the states entered, in the order they are added
+      by Executor.addStatesToEnter, mSortedStatesToEnter the same states
+      in entry order, mStatesForDefaultEntry the compound states entered
+      by default and mHistories the history states to reset.
+      None if a history state is entered: the entry depends on the
+      history values of the session.
+    """
+    __slots__ = ("mExitMask", "mSource", "mStatesToEnter", "mSortedStatesToEnter", "mStatesForDefaultEntry", "mHistories")
+
+    def __init__(self):
+        self.mExitMask = None
+        self.mSource = None
+        self.mStatesToEnter = None
+        self.mSortedStatesToEnter = None
+        self.mStatesForDefaultEntry = None
+        self.mHistories = None
+
+    def isStatic(self):
+        return self.mStatesToEnter is not None
+
+
+class ModelIndex(object):
+    """
+    Lookup tables compiled once from a StateMachine and used by the Executor
+    on every event.
+
+    For each state the dispatch table maps an event descriptor (None for
+    event-less transitions) to the tuple of candidate transitions of the
+    state and of its ancestors, in exit order (the state itself first, then
+    its parent, and so on) and in document order within each state.
+    The descriptors matching an event name are found with one walk of a
+    token trie built from the event attributes of all the transitions
+    (see scxml4py.eventDescriptor); when several match, their candidates
+    are merged once per state and kept.
+    The Executor only has to evaluate the guards of the candidates.
+
+    Each state is also stamped with frozen tree metadata: document order,
+    depth, tuple of proper ancestors and pre/post-order interval, so that
+    descendant tests and exit/entry ordering do not walk the parent chain.
+    Least common ancestor queries are answered in constant time with a
+    sparse table built over the Euler tour of the state tree.
+    The descendants of a state are a range in document order, so the
+    states exited by a transition are an intersection of bitmasks; the
+    exit masks and the entry sequences of the transitions are computed
+    on first use and kept by the index (see TransitionPlan).
+
+    The index is owned by the StateMachine which rebuilds it when the model
+    is modified (see StateMachine.finalize and StateMachine.cloneParallel).
+    Modifying the tree of a finalized state invalidates the index and the
+    states fall back to walking the parent chain. The lookups of the
+    Executor only accept the states of the index and raise ScxmlError for
+    the other ones (see checkState).
+
+    The atomic states which have event-less candidates are also recorded,
+    so that the event-less transitions are looked up only in the
+    configurations where some can be enabled.
+
+    The caches filled on first use (transition plans, done event ids,
+    matching descriptors, merged candidates, accepted events) are shared
+    by all the Executors of the model, possibly running in different
+    threads: the lookups are lock free, a missing entry is computed and
+    stored under mLock. A frozen index (see freeze) has its plans and done
+    event ids computed beforehand, only the caches keyed by event ids and
+    configurations are still filled at runtime.
+    """
+
+    def __init__(self, theStateMachine):
+        self.mValid = True
+        self.mFrozen = False    # see StateMachine.freeze
+        self.mStates = list()   # all states of the model in document order
+        self.mAtomicMask = 0    # bitmask of the atomic states (see Configuration)
+        self.mEventlessMask = 0 # atomic states with event-less candidates
+        self.mPureEventlessMask = 0 # same, all candidates guarded by pure guards only
+        self.mDispatch = {}     # state -> {eventId: tuple of transitions}
+        self.mCounter = 0       # pre/post-order tick
+        self.mEuler = list()    # Euler tour, None stands for the (virtual) root
+        self.mEulerDepth = list()
+        self.mFirst = {}        # state -> first position in the Euler tour
+        self.mSparse = list()   # mSparse[k][i]: position of min depth in mEuler[i:i+2^k]
+        self.mChildMasks = {}   # state -> bitmask of its substates
+        self.mRegionCounts = {} # state -> number of its substates, history states excluded
+        self.mDoneEventIds = {} # state -> id of its done.state event
+        self.mPlans = {}        # transition -> TransitionPlan
+        self.mAccepted = {}     # atomic states mask -> frozenset of descriptors
+        self.mTrie = DescriptorTrie()
+        self.mDescriptors = {}  # event id -> tuple of matching descriptors
+        self.mMerged = {}       # (state, tuple of descriptors) -> tuple of transitions
+        self.mInitialTrans = () # initial transitions of the StateMachine
+        self.mLock = threading.Lock() # held while filling the caches
+        self.build(theStateMachine)
+
+    def getStates(self):
+        return self.mStates
+
+    def getAtomicMask(self):
+        return self.mAtomicMask
+
+    def getEventlessMask(self):
+        return self.mEventlessMask
+
+    def getPureEventlessMask(self):
+        """
+        Atomic states whose event-less candidates are all guarded and only
+        by pure guards (see Action.isPure): they cannot become enabled
+        while the state stays active and the context data does not change.
+        """
+        return self.mPureEventlessMask
+
+    def isValid(self):
+        return self.mValid
+
+    def isFrozen(self):
+        return self.mFrozen
+
+    def freeze(self):
+        """
+        Compute the plans of all the transitions and the done event ids,
+        so that they are not added while the model is shared.
+        """
+        for s in self.mStates:
+            for t in s.getTransitions() + s.getInitialTrans():
+                self.getPlan(t)
+            if s.isAtomic() == False:
+                self.getDoneEventId(s)
+        for t in self.mInitialTrans:
+            self.getPlan(t)
+        self.mFrozen = True
+
+    def invalidate(self):
+        if self.mFrozen:
+            raise ScxmlError("The model is frozen and cannot be modified.")
+        self.mValid = False
+
+    def getTransitions(self, theState, theEventId):
+        """
+        Return the candidate transitions of theState for the event named
+        theEventId (None for the event-less transitions).
+        """
+        table = self.mDispatch.get(theState)
+        if table == None:
+            self.checkState(theState)
+        if theEventId == None:
+            return table.get(None, ())
+        descriptors = self.mDescriptors.get(theEventId)
+        if descriptors == None:
+            descriptors = self.getDescriptors(theEventId)
+        if descriptors.__len__() == 1:
+            return table.get(descriptors[0], ())
+        if descriptors.__len__() == 0:
+            return ()
+        candidates = self.mMerged.get((theState, descriptors))
+        if candidates == None:
+            candidates = self.mergeCandidates(theState, table, descriptors)
+        return candidates
+
+    def getDescriptorTransitions(self, theState, theDescriptor):
+        """
+        Return the candidate transitions of theState with the (normalized)
+        descriptor theDescriptor, see getDescriptors.
+        """
+        table = self.mDispatch.get(theState)
+        if table == None:
+            self.checkState(theState)
+        return table.get(theDescriptor, ())
+
+    def getDescriptors(self, theEventId):
+        """
+        Return the tuple of the descriptors of the model matching theEventId.
+        """
+        descriptors = self.mDescriptors.get(theEventId)
+        if descriptors == None:
+            with self.mLock:
+                if self.mDescriptors.__len__() >= MAX_EVENT_IDS:
+                    self.mDescriptors.clear()
+                descriptors = self.mTrie.match(theEventId)
+                self.mDescriptors[theEventId] = descriptors
+        return descriptors
+
+    def isEventAccepted(self, theAcceptedDescriptors, theEventId):
+        for d in self.getDescriptors(theEventId):
+            if d in theAcceptedDescriptors:
+                return True
+        return False
+
+    def mergeCandidates(self, theState, table, descriptors):
+        # candidates of several descriptors, in exit and document order
+        matched = set()
+        for d in descriptors:
+            matched.update(table.get(d, ()))
+        candidates = list()
+        s = theState
+        while s != None:
+            for t in s.getTransitions():
+                if t in matched and t not in candidates:
+                    candidates.append(t)
+            s = s.getParent()
+        candidates = tuple(candidates)
+        with self.mLock:
+            self.mMerged[(theState, descriptors)] = candidates
+        return candidates
+
+    def getAcceptedEvents(self, theMask):
+        """
+        Return the descriptors of the transitions which can be triggered
+        (regardless of the guards) in the configuration theMask, see
+        isEventAccepted. The sets are computed once per set of active
+        atomic states.
+        """
+        theMask &= self.mAtomicMask
+        accepted = self.mAccepted.get(theMask)
+        if accepted is None:
+            ids = set()
+            mask = theMask
+            while mask != 0:
+                low = mask & -mask
+                ids.update(self.mDispatch[self.mStates[low.bit_length() - 1]])
+                mask ^= low
+            ids.discard(None)
+            accepted = frozenset(ids)
+            with self.mLock:
+                if self.mAccepted.__len__() >= MAX_ACCEPTED_SETS:
+                    self.mAccepted.clear()
+                self.mAccepted[theMask] = accepted
+        return accepted
+
+    def getDescendantRange(self, theState):
+        """
+        Return the (first, last + 1) document orders of the proper
+        descendants of theState, all the states for None.
+        """
+        if theState is None:
+            return 0, self.mStates.__len__()
+        return theState.mDocOrder + 1, theState.mLastDescendant + 1
+
+    def getDescendantMask(self, theState):
+        first, last = self.getDescendantRange(theState)
+        return ((1 << last) - 1) ^ ((1 << first) - 1)
+
+    def getChildMask(self, theState):
+        return self.mChildMasks.get(theState, 0)
+
+    def getRegionCount(self, theState):
+        """
+        Number of the regions of a parallel state (its substates
+        which are not history states).
+        """
+        n = self.mRegionCounts.get(theState)
+        if n is None:
+            self.checkState(theState)
+            n = 0
+        return n
+
+    def getDoneEventId(self, theState):
+        eventId = self.mDoneEventIds.get(theState)
+        if eventId is None:
+            eventId = internId(DONE_STATE + str(theState.getId()))
+            with self.mLock:
+                self.mDoneEventIds[theState] = eventId
+        return eventId
+
+    def getPlan(self, theTransition):
+        plan = self.mPlans.get(theTransition)
+        if plan is None:
+            # computed outside the lock: two threads may compute the same
+            # plan, the result is the same
+            plan = self.compileTransition(theTransition)
+            with self.mLock:
+                plan = self.mPlans.setdefault(theTransition, plan)
+        return plan
+
+    def findLeastCommonAncestor(self, s1, s2):
+        """
+        Return the deepest state that is an ancestor of (or equal to) both
+        s1 and s2, None if they belong to different top-level states.
+        Both states must be part of the index.
+        """
+        i = self.mFirst[s1]
+        j = self.mFirst[s2]
+        if i > j:
+            i, j = j, i
+        k = (j - i + 1).bit_length() - 1
+        row = self.mSparse[k]
+        a = row[i]
+        b = row[j - (1 << k) + 1]
+        if self.mEulerDepth[b] < self.mEulerDepth[a]:
+            a = b
+        return self.mEuler[a]
+
+    def build(self, theStateMachine):
+        self.mInitialTrans = tuple(theStateMachine.getInitialTrans())
+        roots = list()
+        roots.extend(theStateMachine.getSubstates())
+        roots.extend(theStateMachine.getParallel())
+        for t in theStateMachine.getInitialTrans():
+            roots.extend(t.getTargets())
+        visited = set()
+        while roots.__len__() > 0:
+            pending = list()
+            for r in roots:
+                # states may be reachable only as transition targets
+                # (no container), start from their top-level ancestor
+                while r.getParent() != None:
+                    r = r.getParent()
+                pending.extend(self.visit(r, visited))
+            roots = pending
+        for s in self.mStates:
+            table = self.compileState(s)
+            if s.isAtomic():
+                self.mAtomicMask |= 1 << s.mDocOrder
+                if None in table:
+                    self.mEventlessMask |= 1 << s.mDocOrder
+                    if all(self.isPurelyGuarded(t) for t in table[None]):
+                        self.mPureEventlessMask |= 1 << s.mDocOrder
+            p = s.getParent()
+            if p != None and p.mModelIndex is self:
+                self.mChildMasks[p] = self.mChildMasks.get(p, 0) | (1 << s.mDocOrder)
+                if s.isHistory() == False:
+                    self.mRegionCounts[p] = self.mRegionCounts.get(p, 0) + 1
+        self.buildSparseTable()
+
+    def buildSparseTable(self):
+        depth = self.mEulerDepth
+        row = list(range(depth.__len__()))
+        self.mSparse = [row]
+        width = 1
+        while 2 * width <= depth.__len__():
+            previous = row
+            row = list()
+            for i in range(depth.__len__() - 2 * width + 1):
+                a = previous[i]
+                b = previous[i + width]
+                if depth[b] < depth[a]:
+                    a = b
+                row.append(a)
+            self.mSparse.append(row)
+            width *= 2
+
+    def visit(self, theRoot, visited):
+        """
+        Add theRoot and its descendants in document order and stamp them
+        with the tree metadata.
+        Returns the targets of their transitions so that states which
+        are not contained in the StateMachine can be discovered.
+        """
+        targets = list()
+        # (state, True) is pushed to close the pre/post-order interval
+        stack = [(theRoot, False)]
+        while stack.__len__() > 0:
+            s, isClosing = stack.pop()
+            if isClosing == True:
+                s.mPostOrder = self.mCounter
+                s.mLastDescendant = self.mStates.__len__() - 1
+                self.mCounter += 1
+                # back to the parent in the Euler tour
+                p = s.getParent()
+                self.mEuler.append(p)
+                if p == None:
+                    self.mEulerDepth.append(-1)
+                else:
+                    self.mEulerDepth.append(p.mDepth)
+                continue
+            if s in visited:
+                continue
+            visited.add(s)
+            s.mModelIndex = self
+            s.mDocOrder = self.mStates.__len__()
+            s.mPreOrder = self.mCounter
+            self.mCounter += 1
+            p = s.getParent()
+            if p == None:
+                s.mAncestors = ()
+            else:
+                s.mAncestors = (p,) + p.mAncestors
+            s.mDepth = s.mAncestors.__len__()
+            self.mStates.append(s)
+            self.mFirst[s] = self.mEuler.__len__()
+            self.mEuler.append(s)
+            self.mEulerDepth.append(s.mDepth)
+            for t in s.getTransitions() + s.getInitialTrans():
+                for target in t.getTargets():
+                    if target not in visited:
+                        targets.append(target)
+            stack.append((s, True))
+            for substate in reversed(s.getSubstates()):
+                stack.append((substate, False))
+        return targets
+
+    def checkState(self, theState):
+        """
+        Raise ScxmlError if theState is not part of the index, as
+        Configuration.add does: the Executor only handles the states of
+        the compiled model (the index is rebuilt when the model changes,
+        see Executor.updateIndex).
+        """
+        if theState is None or theState.mModelIndex is not self:
+            raise ScxmlError("State <" + str(theState.getId() if theState is not None else None) + "> is not part of the compiled model.")
+
+    def compileState(self, theState):
+        table = {}
+        s = theState
+        while s != None:
+            for t in s.getTransitions():
+                if t.getEvent() == None:
+                    descriptors = [None]
+                else:
+                    descriptors = parseDescriptors(t.getEvent().getId())
+                for d in descriptors:
+                    if d not in table:
+                        table[d] = list()
+                    table[d].append(t)
+                    if d != None and self.mTrie.add(d):
+                        # the matching descriptors may have changed
+                        self.mDescriptors.clear()
+            s = s.getParent()
+        for d in table:
+            table[d] = tuple(table[d])
+        self.mDispatch[theState] = table
+        return table
+
+    def isPurelyGuarded(self, t):
+        guards = t.getConditions().getActions()
+        return guards.__len__() > 0 and all(g.isPure() for g in guards)
+
+    def compileTransition(self, t):
+        plan = TransitionPlan()
+        targets = t.getTargets()
+        if targets.__len__() == 0:
+            # targetless: nothing is exited nor entered
+            plan.mExitMask = 0
+            plan.mStatesToEnter = plan.mSortedStatesToEnter = ()
+            plan.mStatesForDefaultEntry = plan.mHistories = ()
+            return plan
+        source = t.getSource()
+        target = targets[0]
+        if target.isHistory():
+            # the entry of a history state depends on the history values
+            # (the plan has no entry, see addStatesToEnter), only the exit
+            # mask is computed: check its parent, which is indexed even when
+            # the history state is only set with setHistory (not a substate)
+            target = target.getParent()
+        if source != None:
+            self.checkState(source)
+        self.checkState(target)
+        domain = t.getDomain()
+        plan.mExitMask = self.getDescendantMask(domain)
+        if source is targets[0]:
+            plan.mSource = source
+        statesToEnter = list()
+        statesForDefaultEntry = list()
+        if self.addStatesToEnter(targets[0], domain, statesToEnter, statesForDefaultEntry):
+            plan.mStatesToEnter = tuple(statesToEnter)
+            plan.mSortedStatesToEnter = tuple(sorted(statesToEnter, key=lambda s: s.mDocOrder))
+            plan.mStatesForDefaultEntry = tuple(statesForDefaultEntry)
+            plan.mHistories = tuple(s.getHistory() for s in statesToEnter if s.getHistory() != None)
+        return plan
+
+    def addStatesToEnter(self, s, root, statesToEnter, statesForDefaultEntry):
+        """
+        Same as Executor.addStatesToEnter for the entries which do not depend
+        on the runtime data. Returns False if a history state is reached.
+        """
+        if s.isHistory():
+            return False
+        statesToEnter.append(s)
+        if s.isParallel():
+            for substate in s.getSubstates():
+                if self.addStatesToEnter(substate, s, statesToEnter, statesForDefaultEntry) == False:
+                    return False
+        elif s.isCompound():
+            statesForDefaultEntry.append(s)
+            if s.getInitialState() == None:
+                # entered by the interpreter which reports the error
+                return False
+            if self.addStatesToEnter(s.getInitialState(), s, statesToEnter, statesForDefaultEntry) == False:
+                return False
+        for ancestor in s.getProperAncestors(root):
+            if ancestor not in statesToEnter:
+                statesToEnter.append(ancestor)
+            if ancestor.isParallel():
+                for substate in ancestor.getSubstates():
+                    if substate.isDescendantFrom(ancestor) == False:
+                        if self.addStatesToEnter(substate, ancestor, statesToEnter, statesForDefaultEntry) == False:
+                            return False
+        return True
@@ -4,14 +4,17 @@
     @authors: landolfa
 '''
 
-import logging
 import xml.etree.ElementTree as ET
 import scxml4py.helper
+import scxml4py.trace
 from scxml4py.exceptions import ScxmlSyntaxError
+from scxml4py.registry import Registry
 from scxml4py.stateMachine import StateMachine
 from scxml4py.event import Event
 from scxml4py.state import HistoryType, StateHistory, StateAtomic, StateCompound, StateParallel
 
+logger = scxml4py.trace.logger
+
 
 class stateInfo(object):
     def __init__(self, state, element):
@@ -96,7 +99,7 @@ class Reader(object):
                 if theActivity == None:
                     raise ScxmlSyntaxError("Activity id '" + theId + "' not found.")  
                 self.mStatesInfo[key].mState.addActivity(theActivity)
-                logging.getLogger("scxml4py").debug("Found activity " + theActivity.__str__() + " for state " + self.mStatesInfo[key].mState.__str__())            
+                logger.debug("Found activity %s for state %s", theActivity, self.mStatesInfo[key].mState)            
     
     def parseTransitions(self):
         for key in self.mStatesInfo:
@@ -112,7 +115,7 @@ class Reader(object):
                     if theTarget == None:
                         raise ScxmlSyntaxError("Transition from History state must have a target state.")                    
                 self.mStatesInfo[key].mState.addTransition(theTarget, theEvent, theAction, theGuard)
-                logging.getLogger("scxml4py").debug("Found new transition to state: " + theTarget.__str__())            
+                logger.debug("Found new transition to state: %s", theTarget)            
 
             # initial transitions
             for element in self.mStatesInfo[key].mElement.findall('scxml:initial', self.mNamespaces):
@@ -123,7 +126,7 @@ class Reader(object):
                     theAction = self.parseAction(child) # action may or may not be specified
                     # According to SCXML guard and event are not supported for initial transition
                     self.mStatesInfo[key].mState.setInitialState(theTarget, theAction)
-                    logging.getLogger("scxml4py").debug("Found initial transition to state: " + theTarget.__str__())            
+                    logger.debug("Found initial transition to state: %s", theTarget)            
 
     def parseStates(self, parentState, element):
         stateList = element.findall('scxml:state', self.mNamespaces)
@@ -171,7 +174,7 @@ class Reader(object):
             # @TODO should be AbsoluteId   
             #self.mStatesInfo[newState.getAbsoluteId()] = stateInfo(newState, item)
             self.mStatesInfo[newState.getId()] = stateInfo(newState, item)
-            logging.getLogger("scxml4py").debug("Found new state: " + newState.__str__())            
+            logger.debug("Found new state: %s", newState)            
             # onentry
             for onentryElement in item.findall('scxml:onentry', self.mNamespaces):
                 entryActions = self.parseActions(onentryElement)
@@ -194,7 +197,7 @@ class Reader(object):
             if initialStateId not in self.mStatesInfo:
                 raise ScxmlSyntaxError("Initial state '" + initialStateId + "' is not part of the parsed states.")
             self.mStateMachine.setInitialState(self.mStatesInfo[initialStateId].mState, None)
-            logging.getLogger("scxml4py").debug("Found initial transition to state: " + self.mStatesInfo[initialStateId].mState.__str__())
+            logger.debug("Found initial transition to state: %s", self.mStatesInfo[initialStateId].mState)
         else:
             # @TODO parse initial transition
             assert(False)
@@ -213,25 +216,25 @@ class Reader(object):
         """
         if ns1 == None or ns2 == None:
             # throw exception missing mandatory NS attributes
-            logging.getLogger("scxml4py").error("Missing mandatory NS attribute.")
+            logger.error("Missing mandatory NS attribute.")
             return        
         self.mNamespaces = {'scxml': ns1, 'customActionDomain': ns2}
-        logging.getLogger("scxml4py").debug("Namaspaces: " + ns1 + ", " + ns2)
+        logger.debug("Namaspaces: %s, %s", ns1, ns2)
         """
         
         # Parsing version attribute (mandatory)
         ver = self.parseAttribute(scxmlElement, "version", True)
         if ver != "1.0":
             raise ScxmlSyntaxError("The 'version' attribute of an <scxml> element must have value 1.0.")
-        logging.getLogger("scxml4py").debug("Version: " + ver)
+        logger.debug("Version: %s", ver)
         
         # Parsing name attribute (optional)
         name = self.parseAttribute(scxmlElement, "name", False)
         if name != None:
             self.mStateMachine.setId(name)
-            logging.getLogger("scxml4py").debug("Name: " + name)
+            logger.debug("Name: %s", name)
         else:
-            logging.getLogger("scxml4py").debug("Optional name attribute not available.")
+            logger.debug("Optional name attribute not available.")
 
     def createStatesMap(self):
         for key in self.mStatesInfo:
@@ -247,10 +250,11 @@ class Reader(object):
         self.parseTransitions()
         self.parseInvokes()
         self.createStatesMap()
+        self.mStateMachine.finalize()
           
     def read(self, fileName, actionList, activityList):
-        self.mActionList = actionList
-        self.mActivityList = activityList
+        self.mActionList = Registry.create(actionList)
+        self.mActivityList = Registry.create(activityList)
         tree = ET.parse(fileName)
         # by default set the StateMachine ID as the filename
         # to be overwritten by the name provided in the name attribute
@@ -260,8 +264,8 @@ class Reader(object):
         return self.mStateMachine
     
     def readString(self, modelName, text, actionList, activityList):
-        self.mActionList = actionList
-        self.mActivityList = activityList
+        self.mActionList = Registry.create(actionList)
+        self.mActivityList = Registry.create(activityList)
         if modelName != None:
             self.mStateMachine.setId(modelName)
         tree = ET.fromstring(text)
@@ -0,0 +1,62 @@
+'''
+    registry module part of scxml4py.
+
+    @authors: landolfa
+'''
+
+from scxml4py.exceptions import ScxmlError
+
+
+class Registry(object):
+    """
+    Actions, guards or activities indexed by id.
+
+    A Registry can be given to the Reader (and to ActionMgr) instead of a
+    list: references are resolved with one dictionary lookup instead of a
+    scan of the list. Adding two elements with the same id raises
+    ScxmlError. Iteration follows the order of insertion.
+    """
+    __slots__ = ("mItems",)
+
+    def __init__(self, theItems = None):
+        self.mItems = {}
+        if theItems != None:
+            for item in theItems:
+                self.add(item)
+
+    def __iter__(self):
+        return iter(self.mItems.values())
+
+    def __len__(self):
+        return self.mItems.__len__()
+
+    def __contains__(self, theId):
+        return theId in self.mItems
+
+    def __str__(self):
+        return " ".join(str(theId) for theId in self.mItems)
+
+    def add(self, theItem):
+        theId = theItem.getId()
+        if theId in self.mItems:
+            raise ScxmlError("Duplicate id '" + str(theId) + "' in registry.")
+        self.mItems[theId] = theItem
+
+    def remove(self, theId):
+        return self.mItems.pop(theId, None)
+
+    def get(self, theId):
+        return self.mItems.get(theId)
+
+    def getIds(self):
+        return list(self.mItems.keys())
+
+    @staticmethod
+    def create(theItems):
+        """
+        Return theItems if it is already a Registry, otherwise a new
+        Registry with the elements of the list (None for an empty one).
+        """
+        if isinstance(theItems, Registry):
+            return theItems
+        return Registry(theItems)
@@ -0,0 +1,274 @@
+'''
+    scheduler module part of scxml4py.
+
+    Host many Executors on a fixed-size pool of worker threads.
+
+    @authors: landolfa
+'''
+
+import time
+import threading
+from queue import Queue
+from collections import deque
+import scxml4py.trace
+from scxml4py.exceptions import ScxmlError
+
+logger = scxml4py.trace.logger
+
+# control items of the per machine queues
+_START = object()
+_STOP = object()
+
+
+class MachineMetrics(object):
+    """
+    Counters of one machine hosted by the Scheduler.
+    The latency of an event is the time between Scheduler.sendEvent and
+    the end of its processing (macrostep).
+    """
+    __slots__ = ("mProcessed", "mErrors", "mQueueDepth", "mMaxQueueDepth",
+                 "mTotalLatency", "mMaxLatency", "mLastLatency")
+
+    def __init__(self):
+        self.mProcessed = 0
+        self.mErrors = 0
+        self.mQueueDepth = 0
+        self.mMaxQueueDepth = 0
+        self.mTotalLatency = 0.0
+        self.mMaxLatency = 0.0
+        self.mLastLatency = 0.0
+
+    def __str__(self):
+        return ("processed: " + str(self.mProcessed) + " errors: " + str(self.mErrors) +
+                " queue depth: " + str(self.mQueueDepth) + " (max " + str(self.mMaxQueueDepth) + ")" +
+                " latency: mean " + "%.6f" % self.getMeanLatency() + " s max " + "%.6f" % self.mMaxLatency + " s")
+
+    def getProcessed(self):
+        return self.mProcessed
+
+    def getErrors(self):
+        return self.mErrors
+
+    def getQueueDepth(self):
+        return self.mQueueDepth
+
+    def getMaxQueueDepth(self):
+        return self.mMaxQueueDepth
+
+    def getMeanLatency(self):
+        if self.mProcessed == 0:
+            return 0.0
+        return self.mTotalLatency / self.mProcessed
+
+    def getMaxLatency(self):
+        return self.mMaxLatency
+
+    def getLastLatency(self):
+        return self.mLastLatency
+
+    def copy(self):
+        c = MachineMetrics()
+        for name in MachineMetrics.__slots__:
+            setattr(c, name, getattr(self, name))
+        return c
+
+
+class _Machine(object):
+    """
+    An Executor with its pending events. The machine is processed by at
+    most one worker at a time (mIsScheduled), which preserves the order
+    of the events and the run-to-completion semantics.
+    """
+    __slots__ = ("mSessionId", "mExecutor", "mEvents", "mIsScheduled", "mMetrics")
+
+    def __init__(self, theSessionId, theExecutor):
+        self.mSessionId = theSessionId
+        self.mExecutor = theExecutor
+        self.mEvents = deque() # (event, time of sendEvent)
+        self.mIsScheduled = False
+        self.mMetrics = MachineMetrics()
+
+
+class Scheduler(object):
+    """
+    Run many Executors on a fixed number of worker threads.
+
+    Executors are registered with their session id (by default the one of
+    their Context) and the events are routed to them by session id:
+
+        scheduler = Scheduler(4)
+        scheduler.addExecutor(Executor(model, context))
+        scheduler.sendEvent(context.getSessionId(), Event("INIT"))
+        ...
+        scheduler.shutdown()
+
+    A worker processes up to theBatchSize events of a machine before
+    letting the other machines run.
+    """
+
+    def __init__(self, numberOfWorkers = 4, theBatchSize = 16):
+        assert(numberOfWorkers > 0)
+        assert(theBatchSize > 0)
+        self.mBatchSize = theBatchSize
+        self.mMachines = dict()
+        self.mLock = threading.Lock()
+        self.mIdle = threading.Condition(self.mLock)
+        self.mPending = 0 # items queued or being processed
+        self.mReady = Queue() # machines with pending events
+        self.mRunning = True
+        self.mWorkers = list()
+        for n in range(numberOfWorkers):
+            w = threading.Thread(target=self.run, name="scxml4py-worker-" + str(n), daemon=True)
+            self.mWorkers.append(w)
+            w.start()
+
+    def getSessionIds(self):
+        with self.mLock:
+            return list(self.mMachines.keys())
+
+    def getExecutor(self, theSessionId):
+        return self.getMachine(theSessionId).mExecutor
+
+    def getStatus(self, theSessionId):
+        return self.getMachine(theSessionId).mExecutor.getStatus()
+
+    def getMetrics(self, theSessionId):
+        """
+        Return a copy of the metrics of a machine.
+        """
+        machine = self.getMachine(theSessionId)
+        with self.mLock:
+            return machine.mMetrics.copy()
+
+    def getMachine(self, theSessionId):
+        with self.mLock:
+            machine = self.mMachines.get(theSessionId)
+        if machine == None:
+            raise ScxmlError("Unknown session <" + str(theSessionId) + ">")
+        return machine
+
+    def addExecutor(self, theExecutor, theSessionId = None, isStarted = True):
+        """
+        Host an Executor. If isStarted is True the Executor is started by
+        a worker before processing any event.
+        Returns the session id.
+        """
+        if theSessionId == None:
+            theSessionId = theExecutor.getContext().getSessionId()
+        with self.mLock:
+            if theSessionId in self.mMachines:
+                raise ScxmlError("Session <" + str(theSessionId) + "> already exists")
+            machine = _Machine(theSessionId, theExecutor)
+            self.mMachines[theSessionId] = machine
+            if isStarted:
+                self.enqueue(machine, _START)
+        return theSessionId
+
+    def removeExecutor(self, theSessionId, isStopped = True):
+        """
+        Remove an Executor once its pending events have been processed.
+        If isStopped is True the Executor is also stopped.
+        """
+        machine = self.getMachine(theSessionId)
+        with self.mLock:
+            if self.mMachines.get(theSessionId) is not machine:
+                raise ScxmlError("Session <" + str(theSessionId) + "> has been removed")
+            # no more events are routed to the machine
+            del self.mMachines[theSessionId]
+            self.enqueue(machine, _STOP if isStopped else None)
+
+    def sendEvent(self, theSessionId, theEvent):
+        machine = self.getMachine(theSessionId)
+        with self.mLock:
+            if self.mMachines.get(theSessionId) is not machine:
+                raise ScxmlError("Session <" + str(theSessionId) + "> has been removed")
+            self.enqueue(machine, theEvent)
+
+    def enqueue(self, machine, item):
+        # called with mLock held
+        if self.mRunning == False:
+            raise ScxmlError("Scheduler has been shut down")
+        machine.mEvents.append((item, time.perf_counter()))
+        self.mPending += 1
+        depth = machine.mEvents.__len__()
+        machine.mMetrics.mQueueDepth = depth
+        if depth > machine.mMetrics.mMaxQueueDepth:
+            machine.mMetrics.mMaxQueueDepth = depth
+        if machine.mIsScheduled == False:
+            machine.mIsScheduled = True
+            self.mReady.put(machine)
+
+    def waitIdle(self, timeout = None):
+        """
+        Wait until all the events sent so far have been processed.
+        Returns False on timeout.
+        """
+        with self.mIdle:
+            return self.mIdle.wait_for(lambda: self.mPending == 0, timeout)
+
+    def shutdown(self, isStopped = True):
+        """
+        Process the pending events, optionally stop all the Executors
+        and terminate the workers.
+        """
+        if isStopped:
+            for theSessionId in self.getSessionIds():
+                try:
+                    self.removeExecutor(theSessionId, True)
+                except ScxmlError:
+                    pass
+        self.waitIdle()
+        with self.mLock:
+            self.mRunning = False
+        for w in self.mWorkers:
+            self.mReady.put(None)
+        for w in self.mWorkers:
+            w.join()
+
+    def run(self):
+        while True:
+            machine = self.mReady.get()
+            if machine == None:
+                return
+            self.processMachine(machine)
+
+    def processMachine(self, machine):
+        for n in range(self.mBatchSize):
+            with self.mLock:
+                item, timestamp = machine.mEvents.popleft()
+                machine.mMetrics.mQueueDepth = machine.mEvents.__len__()
+            isError = False
+            try:
+                if item is _START:
+                    machine.mExecutor.start()
+                elif item is _STOP:
+                    machine.mExecutor.stop()
+                elif item is None:
+                    pass
+                else:
+                    machine.mExecutor.processEvent(item)
+            except Exception:
+                isError = True
+                logger.exception("Error processing <%s> in session <%s>", item, machine.mSessionId)
+            latency = time.perf_counter() - timestamp
+            with self.mLock:
+                if item is not _START and item is not _STOP and item is not None:
+                    metrics = machine.mMetrics
+                    metrics.mProcessed += 1
+                    metrics.mTotalLatency += latency
+                    metrics.mLastLatency = latency
+                    if latency > metrics.mMaxLatency:
+                        metrics.mMaxLatency = latency
+                if isError:
+                    machine.mMetrics.mErrors += 1
+                self.mPending -= 1
+                isLast = machine.mEvents.__len__() == 0
+                if isLast:
+                    machine.mIsScheduled = False
+                elif n == self.mBatchSize - 1:
+                    # let the other machines run
+                    self.mReady.put(machine)
+                if self.mPending == 0:
+                    self.mIdle.notify_all()
+            if isLast:
+                return
@@ -0,0 +1,112 @@
+'''
+    session module part of scxml4py.
+
+    @authors: landolfa
+'''
+
+import scxml4py.trace
+
+logger = scxml4py.trace.logger
+
+
+class Session(object):
+    """
+    Runtime record of one execution of a StateMachine: context,
+    configuration, history values and running activities.
+
+    The StateMachine only holds the compiled model, the runtime data
+    changed by the Executor is kept here, so that many Executors can
+    share the same (possibly frozen, see StateMachine.freeze) model.
+
+    Activities bound to the model are prototypes: the first session
+    starting an activity uses the prototype itself, the other sessions
+    use their own instance (see AbstractActivity.createInstance).
+    When theEventQueue is given, the session always uses its own instances,
+    which post their events to theEventQueue instead of the queue of the
+    prototypes: the events of the activities identify their session.
+    """
+    __slots__ = ("mContext", "mConfiguration", "mHistoryValues", "mActivities", "mEventQueue")
+
+    def __init__(self, theContext = None, theConfiguration = None, theEventQueue = None):
+        self.mContext = theContext
+        self.mConfiguration = theConfiguration
+        self.mHistoryValues = None # history state -> list of states
+        self.mActivities = None    # activity of the model -> session instance
+        self.mEventQueue = theEventQueue # queue of the activity instances, None for the model one
+
+    def getContext(self):
+        return self.mContext
+
+    def getConfiguration(self):
+        return self.mConfiguration
+
+    def getEventQueue(self):
+        return self.mEventQueue
+
+    def setContext(self, theContext):
+        self.mContext = theContext
+
+    def setConfiguration(self, theConfiguration):
+        self.mConfiguration = theConfiguration
+
+    def getHistoryValues(self, theHistoryState):
+        if self.mHistoryValues == None:
+            return ()
+        return self.mHistoryValues.get(theHistoryState, ())
+
+    def pushHistoryValue(self, theHistoryState, s):
+        if s != None:
+            if self.mHistoryValues == None:
+                self.mHistoryValues = dict()
+            values = self.mHistoryValues.get(theHistoryState)
+            if values == None:
+                values = list()
+                self.mHistoryValues[theHistoryState] = values
+            values.append(s)
+
+    def clearHistoryValues(self, theHistoryState):
+        if self.mHistoryValues != None:
+            self.mHistoryValues.pop(theHistoryState, None)
+
+    def getActivity(self, theActivity):
+        """
+        Return the instance of an activity of the model used by the session.
+        """
+        if self.mActivities == None:
+            self.mActivities = dict()
+        instance = self.mActivities.get(theActivity)
+        if instance == None:
+            if self.mEventQueue == None and (theActivity.mOwner == None or theActivity.mOwner is self):
+                theActivity.mOwner = self
+                instance = theActivity
+            else:
+                instance = theActivity.createInstance()
+                if self.mEventQueue != None:
+                    instance.mEventQueue = self.mEventQueue
+            self.mActivities[theActivity] = instance
+        return instance
+
+    def getActivities(self, s):
+        return [self.getActivity(a) for a in s.getActivities()]
+
+    def startActivities(self, s):
+        for a in s.getActivities():
+            self.getActivity(a).start()
+            logger.info("Activity: %s started.", a.getId())
+
+    def cancelActivities(self, s):
+        if s.getActivities().__len__() == 0:
+            return
+        for a in s.getActivities():
+            self.getActivity(a).stop()
+            logger.info("Activity: %s stopped.", a.getId())
+
+    def release(self):
+        """
+        Give back the prototypes of the activities used by the session.
+        """
+        if self.mActivities != None:
+            for a in self.mActivities.keys():
+                if a.mOwner is self:
+                    a.mOwner = None
+            self.mActivities = None
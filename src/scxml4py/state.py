@@ -4,19 +4,26 @@
     @authors: landolfa
 '''
 
-import logging
+import itertools
+import scxml4py.trace
 from enum import Enum
 from scxml4py.executableContent import ExecutableContent
 from scxml4py.transition import Transition
 
+logger = scxml4py.trace.logger
+
 class StateType(Enum):
     ATOMIC = 0
     COMPOUND = 1
     PARALLEL = 2
     HISTORY = 3
 
+# node ids are unique per process and assigned when the model is loaded
+_nodeIds = itertools.count()
+
 class State(object):
     def __init__(self, theId, theType):
+        self.mNodeId = next(_nodeIds)
         self.mId = theId
         self.mAbsId = None
         self.mType = theType # @TODO could be removed
@@ -30,6 +37,14 @@ class State(object):
         self.mInitialTrans = list()
         self.mIsInitial = False
         self.mIsFinal = False
+        # tree metadata stamped by the ModelIndex when the model is finalized
+        self.mModelIndex = None
+        self.mDocOrder = -1
+        self.mDepth = -1
+        self.mAncestors = ()
+        self.mPreOrder = -1
+        self.mPostOrder = -1
+        self.mLastDescendant = -1 # document order of the last descendant
         
     def __str__(self):
         return self.getAbsoluteId().__str__()
@@ -56,23 +71,25 @@ class State(object):
         return tmp 
         """
         
+    # States are compared by identity: each instance is a distinct node
+    # of the model. __str__ is only used for display.
     def __lt__(self, other):
-        if other == None:
+        if other is None:
             return False
-        return self.__str__() < other.__str__()
+        return self.mNodeId < other.mNodeId
     
     def __eq__(self, other):
-        if other == None:
-            return False
-        return self.__str__() == other.__str__()
+        return self is other
     
-    def __hash__(self, *args, **kwargs):
-        # needed to avoid the 'TypeError: unhashable type' when defining __eq__ 
-        return object.__hash__(self, *args, **kwargs)
+    def __hash__(self):
+        return self.mNodeId
     
     def getId(self):
         return self.mId
 
+    def getNodeId(self):
+        return self.mNodeId
+
     def getAbsoluteId(self):
         if self.mAbsId == None:
             self.resolveAbsoluteId()
@@ -112,8 +129,39 @@ class State(object):
     
     def getActivities(self):
         return self.mActivities
+
+    def getDocumentOrder(self):
+        # -1 if the model has not been finalized
+        if self.isFinalized():
+            return self.mDocOrder
+        return -1
+
+    def getDepth(self):
+        if self.isFinalized():
+            return self.mDepth
+        return self.countParents()
+
+    def getAncestors(self):
+        """
+        Return the tuple of proper ancestors, parent first.
+        """
+        if self.isFinalized():
+            return self.mAncestors
+        ancestors = list()
+        s = self.getParent()
+        while s != None:
+            ancestors.append(s)
+            s = s.getParent()
+        return tuple(ancestors)
     
     def getProperAncestors(self, upperBoundState):
+        if self.isFinalized():
+            ancestors = list()
+            for s in self.mAncestors:
+                if s is upperBoundState:
+                    break
+                ancestors.append(s)
+            return ancestors
         ancestors = list()
         # proper ancestor does not include given state,
         # therefore starts from the parent of the given state
@@ -141,6 +189,7 @@ class State(object):
         self.mAbsId = theAbsId
         
     def setParent(self, theParent):
+        self.invalidateIndex()
         self.mParent = theParent
         
     def setIsInitial(self, isInitial):
@@ -150,9 +199,11 @@ class State(object):
         self.mIsFinal = isFinal
     
     def setHistory(self, history):
+        self.invalidateIndex()
         self.mHistory = history
          
     def setInitialState(self, initialState, theAction): 
+        self.invalidateIndex()
         t = Transition()
         t.setSource(None)
         t.addTarget(initialState)
@@ -164,9 +215,11 @@ class State(object):
         finalState.setIsFinal(True)
         
     def setSubstates(self, substates):
+        self.invalidateIndex()
         self.mSubstates = substates
         
     def setTransitions(self, transitions):
+        self.invalidateIndex()
         self.mTransitions = transitions
         
     def setActivities(self, activities):
@@ -190,9 +243,21 @@ class State(object):
     def isHistory(self):
         return self.mType == StateType.HISTORY
 
+    def isFinalized(self):
+        return self.mModelIndex != None and self.mModelIndex.isValid()
+
+    def invalidateIndex(self):
+        # the tree has been modified after the model has been finalized
+        if self.mModelIndex != None:
+            self.mModelIndex.invalidate()
+            self.mModelIndex = None
+
     def isDescendantFrom(self, parent):
-        if parent == None:
+        if parent is None:
             return True
+        if self.isFinalized() and parent.mModelIndex is self.mModelIndex:
+            # pre/post-order interval of parent contains the one of self
+            return parent.mPreOrder < self.mPreOrder and self.mPostOrder < parent.mPostOrder
         p = self.getParent()
         while p != None:
             # @TODO: is == operator sufficient?
@@ -202,6 +267,8 @@ class State(object):
         return False
 
     def countParents(self):
+        if self.isFinalized():
+            return self.mDepth
         numParents = 0
         s1 = self.getParent();
         while s1 != None:
@@ -243,19 +310,21 @@ class State(object):
     def startActivities(self):
         for a in self.mActivities:
             a.start()
-            logging.getLogger('scxml4py').info("Activity: " + a.getId() + " started.")
+            logger.info("Activity: %s started.", a.getId())
                    
     def cancelActivities(self):
         for a in self.mActivities:
             a.stop()
-            logging.getLogger('scxml4py').info("Activity: " + a.getId() + " stopped.")
+            logger.info("Activity: %s stopped.", a.getId())
             
     def addSubstate(self, s):
         if s != None:
+            self.invalidateIndex()
             s.setParent(self);
             self.mSubstates.append(s)
         
     def addTransition(self, target, event, action, condition = None):
+        self.invalidateIndex()
         t = Transition()
         t.setSource(self)
         #t.setTargets(targets)
@@ -376,7 +445,7 @@ class StateHistory(State):
     def pushHistoryValue(self, s):
         if s != None:
             # @TODO check for duplicates?
-            logging.getLogger('scxml4py').info("HistoryState: adding " + s.getId() + " to history stack.")
+            logger.info("HistoryState: adding %s to history stack.", s.getId())
             self.mHistoryValues.append(s)
 
     def setHistoryValues(self, historyValues):
@@ -8,6 +8,8 @@ import logging
 import scxml4py.helper
 from scxml4py.transition import Transition
 from scxml4py.state import StateParallel
+from scxml4py.modelIndex import ModelIndex
+from scxml4py.exceptions import ScxmlError
 
 
 
@@ -19,6 +21,7 @@ class StateMachine(object):
         self.mSubstates = list()
         self.mParallel = list()
         self.mStatesMap = {}
+        self.mIndex = None
         
     def __str__(self):
         tmp = self.mId.__str__() + "\n"
@@ -45,10 +48,17 @@ class StateMachine(object):
     def getParallel(self):
         return self.mParallel
 
+    def getIndex(self):
+        # the index is (re)built lazily when the model has been modified
+        if self.mIndex == None or self.mIndex.isValid() == False:
+            self.finalize()
+        return self.mIndex
+
     def setId(self, theId):
         self.mId = theId
         
     def setInitialState(self, initialState, a = None):
+        self.invalidate()
         t = Transition()
         t.setSource(None)
         t.addTarget(initialState)
@@ -61,17 +71,46 @@ class StateMachine(object):
         finalState.setIsFinal(True)
 
     def setSubstates(self, substates):
+        self.invalidate()
         self.mSubstates = substates
         
     def setParallel(self, parallel):
+        self.invalidate()
         self.mParallel = parallel
 
     def addSubstate(self, s):
+        self.invalidate()
         self.mSubstates.append(s)
     
     def addParallel(self, s):
+        self.invalidate()
         self.mParallel.append(s)
 
+    def finalize(self):
+        """
+        Compile the lookup tables used by the Executor.
+        It has to be called once the model is complete: it is done by
+        the Reader after parsing and by cloneParallel after cloning.
+        """
+        self.mIndex = ModelIndex(self)
+
+    def freeze(self):
+        """
+        Make the compiled model immutable: any further modification of the
+        state tree raises ScxmlError. A frozen model can be shared by any
+        number of Executors, the runtime data of each one being kept in
+        its Session.
+        """
+        self.getIndex().freeze()
+
+    def isFrozen(self):
+        return self.mIndex != None and self.mIndex.isFrozen()
+
+    def invalidate(self):
+        if self.mIndex != None:
+            self.mIndex.invalidate()
+        self.mIndex = None
+
     def updateStatesMap(self, absId, s):
         if s != None and absId != None and absId not in self.mStatesMap.keys():
             self.mStatesMap[absId] = s
@@ -86,6 +125,8 @@ class StateMachine(object):
         # duplicate n times what is inside the parallel state defined by sourceAbsId
         if numberOfClones < 1:
             return
+        if self.isFrozen():
+            raise ScxmlError("Model <" + str(self.mId) + "> is frozen and cannot be cloned.")
         # find cloning root
         rootState = self.findStateInMap(rootStateAbsId)
         if rootState == None or type(rootState) != StateParallel:
@@ -127,6 +168,8 @@ class StateMachine(object):
         # add cloned states to the state machines
         for newState in newSubstates:
             rootState.addSubstate(newState)
+        # the cloned regions change the dispatch tables
+        self.finalize()
             
             
                 
\ No newline at end of file
@@ -0,0 +1,248 @@
+'''
+    streamReader module part of scxml4py.
+
+    @authors: landolfa
+'''
+
+import io
+import xml.etree.ElementTree as ET
+import scxml4py.helper
+import scxml4py.trace
+from scxml4py.exceptions import ScxmlSyntaxError
+from scxml4py.reader import Reader
+from scxml4py.registry import Registry
+from scxml4py.state import StateHistory, StateAtomic, StateCompound, StateParallel
+
+logger = scxml4py.trace.logger
+
+
+class _Frame(object):
+    """
+    State (or <scxml>) element being parsed: what has been collected from
+    its children until its end tag.
+    """
+    __slots__ = ("mElement", "mId", "mAbsId", "mPreOrder", "mChildren", "mTransitions",
+                 "mInitials", "mEntryActions", "mExitActions", "mActivities")
+
+    def __init__(self, element, theId, theAbsId, thePreOrder):
+        self.mElement = element
+        self.mId = theId
+        self.mAbsId = theAbsId
+        self.mPreOrder = thePreOrder
+        self.mChildren = {}        # tag -> list of states, in document order
+        self.mTransitions = list() # (target id, event, guard, action)
+        self.mInitials = list()    # (target id, action)
+        self.mEntryActions = None
+        self.mExitActions = None
+        self.mActivities = list()
+
+
+class StreamReader(Reader):
+    """
+    Single pass SCXML reader for very large documents.
+
+    The document is read with ElementTree.iterparse: a state is built when
+    its end tag is read, from what has been collected from its children,
+    and the consumed elements are released, so that the whole DOM is never
+    kept in memory. Targets may refer to states that have not been read
+    yet: the transitions are created without target and completed from a
+    fix-up table once the whole document has been read.
+
+    The resulting StateMachine is the same as the one built by the Reader.
+    """
+
+    def __init__(self):
+        Reader.__init__(self)
+        ns = "{" + self.mNamespaces['scxml'] + "}"
+        self.mScxmlTag = ns + "scxml"
+        self.mStateTag = ns + "state"
+        self.mParallelTag = ns + "parallel"
+        self.mFinalTag = ns + "final"
+        self.mHistoryTag = ns + "history"
+        self.mTransitionTag = ns + "transition"
+        self.mInitialTag = ns + "initial"
+        self.mOnEntryTag = ns + "onentry"
+        self.mOnExitTag = ns + "onexit"
+        self.mInvokeTag = ns + "invoke"
+        # same order as Reader.parseStates
+        self.mStateTags = (self.mStateTag, self.mParallelTag, self.mFinalTag, self.mHistoryTag)
+        self.mStates = {}        # state id -> (pre-order, state)
+        self.mPreOrder = list()  # states in the order of their start tag
+        self.mFixups = list()    # (transition, target id) to be resolved
+        self.mInitialFixups = list() # (state, target id, action) to be resolved
+        self.mInitialStateId = None
+
+    def addChild(self, frame, tag, s):
+        children = frame.mChildren.get(tag)
+        if children == None:
+            children = list()
+            frame.mChildren[tag] = children
+        children.append(s)
+
+    def addChildren(self, frame, parentState):
+        if self.mStateTag in frame.mChildren and self.mParallelTag in frame.mChildren:
+            raise ScxmlSyntaxError("An SCXML element cannot have substates and parallel states at the same time.")
+        for tag in self.mStateTags:
+            for s in frame.mChildren.get(tag, ()):
+                if parentState == None:
+                    self.mStateMachine.addSubstate(s)
+                else:
+                    if tag == self.mHistoryTag:
+                        parentState.setHistory(s)
+                    parentState.addSubstate(s)
+
+    def startScxml(self, element):
+        if element.tag != self.mScxmlTag:
+            raise ScxmlSyntaxError("Root element of an SCXML document must be an <scxml> element.")
+        self.parseScxml(element)
+        self.mInitialStateId = self.parseAttribute(element, "initial", False)
+        return _Frame(element, None, None, -1)
+
+    def startState(self, element, parentFrame):
+        stateId = self.parseAttribute(element, "id", True)
+        absId = stateId
+        if parentFrame.mAbsId != None:
+            absId = parentFrame.mAbsId + StateAtomic.getSeparator() + stateId
+        self.mPreOrder.append(None)
+        return _Frame(element, stateId, absId, self.mPreOrder.__len__() - 1)
+
+    def endState(self, frame, parentFrame):
+        element = frame.mElement
+        if element.tag == self.mStateTag:
+            if self.mStateTag in frame.mChildren:
+                newState = StateCompound(frame.mId)
+            else:
+                newState = StateAtomic(frame.mId)
+        elif element.tag == self.mParallelTag:
+            newState = StateParallel(frame.mId)
+        elif element.tag == self.mHistoryTag:
+            newState = StateHistory(frame.mId, self.parseHistoryType(element))
+        else:
+            newState = StateAtomic(frame.mId)
+            newState.setIsFinal(True)
+        self.addChildren(frame, newState)
+        newState.setAbsoluteId(frame.mAbsId)
+        if frame.mEntryActions != None:
+            newState.getEntryActions().setActions(frame.mEntryActions)
+        if frame.mExitActions != None:
+            newState.getExitActions().setActions(frame.mExitActions)
+        for theActivity in frame.mActivities:
+            newState.addActivity(theActivity)
+        for theTargetId, theEvent, theGuard, theAction in frame.mTransitions:
+            # transition from history state must have destination state
+            if type(newState) == StateHistory and theTargetId == None:
+                raise ScxmlSyntaxError("Transition from History state must have a target state.")
+            newState.addTransition(None, theEvent, theAction, theGuard)
+            if theTargetId != None:
+                self.mFixups.append((newState.getTransitions()[-1], theTargetId))
+        for theTargetId, theAction in frame.mInitials:
+            self.mInitialFixups.append((newState, theTargetId, theAction))
+        # as with the Reader, the last state with a given id is the target
+        previous = self.mStates.get(frame.mId)
+        if previous == None or previous[0] < frame.mPreOrder:
+            self.mStates[frame.mId] = (frame.mPreOrder, newState)
+        self.mPreOrder[frame.mPreOrder] = newState
+        self.addChild(parentFrame, element.tag, newState)
+        logger.debug("Found new state: %s", newState)
+
+    def endElement(self, element, frame):
+        # element is a child of the state element of frame
+        if frame.mAbsId == None:
+            # only the states are read from the children of <scxml>
+            return
+        if element.tag == self.mTransitionTag:
+            frame.mTransitions.append((self.parseAttribute(element, "target", False),
+                                       self.parseEvent(element),
+                                       self.parseGuard(element),
+                                       self.parseAction(element)))
+        elif element.tag == self.mInitialTag:
+            for child in element:
+                if child.tag == self.mTransitionTag:
+                    theTargetId = self.parseAttribute(child, "target", False)
+                    if theTargetId == None:
+                        raise ScxmlSyntaxError("Initial transition must specify target state.")
+                    # According to SCXML guard and event are not supported for initial transition
+                    frame.mInitials.append((theTargetId, self.parseAction(child)))
+        elif element.tag == self.mOnEntryTag:
+            frame.mEntryActions = self.parseActions(element)
+        elif element.tag == self.mOnExitTag:
+            frame.mExitActions = self.parseActions(element)
+        elif element.tag == self.mInvokeTag:
+            theId = self.parseAttribute(element, "id", True)
+            theActivity = scxml4py.helper.findActivityInList(theId, self.mActivityList)
+            if theActivity == None:
+                raise ScxmlSyntaxError("Activity id '" + theId + "' not found.")
+            frame.mActivities.append(theActivity)
+
+    def findTarget(self, theTargetId):
+        if theTargetId not in self.mStates:
+            raise ScxmlSyntaxError("Target state '" + theTargetId + "' is not part of the parsed states.")
+        return self.mStates[theTargetId][1]
+
+    def resolve(self):
+        if self.mInitialStateId == None:
+            # @TODO parse initial transition
+            assert(False)
+        if self.mInitialStateId not in self.mStates:
+            raise ScxmlSyntaxError("Initial state '" + self.mInitialStateId + "' is not part of the parsed states.")
+        self.mStateMachine.setInitialState(self.mStates[self.mInitialStateId][1], None)
+        for t, theTargetId in self.mFixups:
+            t.addTarget(self.findTarget(theTargetId))
+        for s, theTargetId, theAction in self.mInitialFixups:
+            s.setInitialState(self.findTarget(theTargetId), theAction)
+        self.mFixups.clear()
+        self.mInitialFixups.clear()
+        for s in self.mPreOrder:
+            self.mStateMachine.updateStatesMap(s.getAbsoluteId(), s)
+
+    def parseStream(self, source):
+        frames = list()   # frames of the open state elements
+        elements = list() # open elements
+        for event, element in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                if elements.__len__() == 0:
+                    frames.append(self.startScxml(element))
+                elif element.tag in self.mStateTags and elements[-1] is frames[-1].mElement:
+                    frames.append(self.startState(element, frames[-1]))
+                elements.append(element)
+                continue
+            elements.pop()
+            if element is frames[-1].mElement:
+                frame = frames.pop()
+                if frames.__len__() == 0:
+                    self.addChildren(frame, None)
+                    element.clear()
+                    break
+                self.endState(frame, frames[-1])
+            elif elements[-1] is frames[-1].mElement:
+                self.endElement(element, frames[-1])
+            else:
+                # nested in a child of a state: consumed with its parent
+                continue
+            # the element has been consumed: the parent keeps only the
+            # children read ahead by the parser (the earlier ones have been
+            # removed, the element is its first child)
+            element.clear()
+            elements[-1].remove(element)
+        self.resolve()
+        self.mStateMachine.finalize()
+
+    def read(self, fileName, actionList, activityList):
+        self.mActionList = Registry.create(actionList)
+        self.mActivityList = Registry.create(activityList)
+        # see Reader.read
+        self.mStateMachine.setId(fileName)
+        with open(fileName, "rb") as f:
+            self.parseStream(f)
+        return self.mStateMachine
+
+    def readString(self, modelName, text, actionList, activityList):
+        self.mActionList = Registry.create(actionList)
+        self.mActivityList = Registry.create(activityList)
+        if modelName != None:
+            self.mStateMachine.setId(modelName)
+        if isinstance(text, str):
+            self.parseStream(io.StringIO(text))
+        else:
+            self.parseStream(io.BytesIO(text))
+        return self.mStateMachine
@@ -0,0 +1,47 @@
+'''
+    trace module part of scxml4py.
+
+    @authors: landolfa
+'''
+
+import logging
+
+logger = logging.getLogger("scxml4py")
+
+# Global switch for the interpreter traces. When disabled the hot loop
+# does not even check the logger level.
+_enabled = True
+
+
+def setEnabled(isEnabled):
+    global _enabled
+    _enabled = isEnabled
+
+
+def isEnabled():
+    return _enabled
+
+
+def isDebugEnabled(theLogger = logger):
+    """
+    Return true if debug traces have to be produced.
+    The Executor evaluates it once per macrostep and keeps the result,
+    so that disabled traces cost a single attribute test.
+    """
+    return _enabled and theLogger.isEnabledFor(logging.DEBUG)
+
+
+class LazyFormat(object):
+    """
+    Defer an expensive formatting (e.g. helper.formatStatus) until the log
+    record is actually emitted:
+        logger.info("Status: <%s>", LazyFormat(helper.formatStatus, status))
+    """
+    __slots__ = ("mFunc", "mArgs")
+
+    def __init__(self, func, *args):
+        self.mFunc = func
+        self.mArgs = args
+
+    def __str__(self):
+        return self.mFunc(*self.mArgs)
@@ -4,16 +4,24 @@
     @authors: landolfa
 '''
 
+import itertools
+import scxml4py.helper
+from scxml4py.eventDescriptor import isEventMatching
 from scxml4py.executableContent import ExecutableContent
 
+# node ids are unique per process and assigned when the model is loaded
+_nodeIds = itertools.count()
 
 class Transition(object):
     def __init__(self):
+        self.mNodeId = next(_nodeIds)
         self.mEvent = None
         self.mConditions = ExecutableContent()
         self.mActions = ExecutableContent()
         self.mSource = None
         self.mTargets = list()
+        self.mDomain = None       # cached LCA of source and target
+        self.mDomainIndex = None  # ModelIndex the cached domain refers to
 
     def __str__(self):
         tmp = "FromState <"
@@ -37,40 +45,22 @@ class Transition(object):
         tmp += " Actions <" + self.mActions.__str__() + ">"
         return tmp
     
+    # Transitions are compared by identity: each instance is a distinct node
+    # of the model. __str__ is only used for display.
     def __lt__(self, other):
-        if other == None:
+        if other is None:
             return False
-        return self.__str__() < other.__str__()
+        return self.mNodeId < other.mNodeId
     
     def __eq__(self, other):
-        if other == None:
-            return False
-        return self.__str__() == other.__str__()
-        """
-        # compare source state       
-        if self.mSource == None and other.mSource != None:
-            return False
-        if self.mSource != None and other.mSource == None:
-            return False        
-        if self.mSource != None and other.mSource != None:
-            if self.mSource.getAbsoluteId() != other.mSource.getAbsoluteId():
-                return False
-        # compare destination
-        if self.mTargets.__len__() != other.mTargets.__len__():
-            return False
-        if self.mTargets.__len__() > 0:
-            if self.mTargets[0].getAbsoluteId() != other.mTargets[0].getAbsoluteId():
-                return False
-        # compare triggering events
-        if self.mEvent != other.mEvent:
-            return False    
-        # compare guards
-        if self.mConditions != other.mConditions:
-            return False
-        # compare actions
-        return self.mActions == other.mActions
-        """
+        return self is other
+
+    def __hash__(self):
+        return self.mNodeId
         
+    def getNodeId(self):
+        return self.mNodeId
+
     def getSource(self):
         return self.mSource
     
@@ -85,6 +75,25 @@ class Transition(object):
     
     def getConditions(self):
         return self.mConditions
+
+    def getDomain(self):
+        """
+        Return the least common ancestor of the source and the (first) target
+        state. Source and targets are static, the result is cached as long as
+        the model index of the source state is valid.
+        """
+        if self.mTargets.__len__() == 0:
+            return None
+        index = None
+        if self.mSource != None:
+            index = self.mSource.mModelIndex
+            if index is self.mDomainIndex and index != None and index.isValid():
+                return self.mDomain
+        domain = scxml4py.helper.findLeastCommonAncestor(self.mSource, self.mTargets[0])
+        if index != None and index.isValid():
+            self.mDomain = domain
+            self.mDomainIndex = index
+        return domain
     
     
     def addTarget(self, theState):
@@ -106,9 +115,13 @@ class Transition(object):
         # there is an input event but no event on the transition
         elif self.getEvent() == None:
             return False;
-        # there are both input event and event on the transition
+        # there are both input event and event descriptors on the transition
         else:
-            return (self.getEvent().getId() == theEvent.getId() and self.mConditions.evaluate(theContext) == True)
+            # ids are interned: an identical id is the common case
+            eventId = self.getEvent().getId()
+            if eventId is not theEvent.getId() and isEventMatching(eventId, theEvent.getId()) == False:
+                return False
+            return self.mConditions.evaluate(theContext) == True
         
     def setSource(self, theState):
         self.mSource = theState
@@ -1,2 +1,3 @@
 from .application import Application
 from .actionmgr import ActionMgr
+from .shardedApplication import ShardedApplication
@@ -1,29 +1,26 @@
+from scxml4py.registry import Registry
+
+
 class ActionMgr(object):
     # generated class    
     def __init__(self):
-        self.mActionList = list()
-        self.mActivityList = list()
+        self.mActionList = Registry()
+        self.mActivityList = Registry()
 
     def getAction(self, theActionId):
-        for a in self.mActionList:
-            if a.getId() == theActionId:
-                return a
-        return None
+        return self.mActionList.get(theActionId)
 
     def getActions(self):
         return self.mActionList
     
     def getActivity(self, theActivityId):
-        for a in self.mActivityList:
-            if a.getId() == theActivityId:
-                return a
-        return None
+        return self.mActivityList.get(theActivityId)
     
     def getActivities(self):
         return self.mActivityList
     
     def createActions(self, theData, action_classes):
-        self.mActionList = [cls(theData) for cls in action_classes]
+        self.mActionList = Registry([cls(theData) for cls in action_classes])
 
     def createActivities(self, theEventQueue, theData, activity_classes):
-        self.mActivityList = [cls(theEventQueue, theData) for cls in activity_classes]
+        self.mActivityList = Registry([cls(theEventQueue, theData) for cls in activity_classes])
@@ -3,16 +3,20 @@ import threading
 from queue import Queue
 
 import scxml4py.helper
+from scxml4py.trace import LazyFormat
 from scxml4py.reader import Reader
 from scxml4py.context import Context
 from scxml4py.event import Event
 from scxml4py.executor import Executor
+from scxml4py.eventQueue import QueueType
 from scxml4py.listeners import EventListener
 from scxml4py.action import Action
 from scxml4py.listeners import StatusListener
 
 from scxmlApp.actionmgr import ActionMgr
 
+logger = logging.getLogger("scxmlApp")
+
 # Installed as status listener, engine looks for "ActionStatus" action
 class _ActionStatus(Action, StatusListener):
     # implemented by the developer, stub can be generated
@@ -20,18 +24,19 @@ class _ActionStatus(Action, StatusListener):
         Action.__init__(self, "ActionStatus", None, theData)
         self.mStatus = None
         self.mActionMgr = theActionMgr
+        # the actions are created before the listeners: resolved once
+        self.mUserActionStatus = theActionMgr.getAction("ActionStatusListener")
     
     def notify(self, status):
         self.mStatus = status
-        userActionStatus = self.mActionMgr.getAction("ActionStatusListener")
-        if userActionStatus is not None:
-            logging.getLogger("scxmlApp").debug (">>>>>>>>>>>>>>>>>>>>>>>>>>>userActionStatus found")    
-            userActionStatus.execute(status)
-        logging.getLogger("scxmlApp").info(">>>>_ActionStatus::notify Status: <" + scxml4py.helper.formatStatus(self.mStatus) + ">")
+        if self.mUserActionStatus is not None:
+            logger.debug (">>>>>>>>>>>>>>>>>>>>>>>>>>>userActionStatus found")    
+            self.mUserActionStatus.execute(status)
+        logger.info(">>>>_ActionStatus::notify Status: <%s>", LazyFormat(scxml4py.helper.formatStatus, self.mStatus))
     
     # why do I need this?
     def execute(self, theCtx):
-        logging.getLogger("scxmlApp").info(">>>>_ActionStatus::execute Status: <" + scxml4py.helper.formatStatus(self.mStatus) + ">")
+        logger.info(">>>>_ActionStatus::execute Status: <%s>", LazyFormat(scxml4py.helper.formatStatus, self.mStatus))
 
 
 class _EventListener(EventListener):
@@ -40,16 +45,17 @@ class _EventListener(EventListener):
         self.callback = callback
         self.theData = theData
         self.mActionMgr = theActionMgr
+        # see _ActionStatus
+        self.mUserActionEvent = theActionMgr.getAction("ActionEventListener")
     
     def notify(self, event):
         self.mEvent = event
         self.callback()
-        userActionEvent = self.mActionMgr.getAction("ActionEventListener")
-        if userActionEvent is not None:
-            logging.getLogger("scxmlApp").debug (">>>>>>>>>>>>>>>>>>>>>>>>>>>userActionEvent found")    
-            userActionEvent.execute(event)
-        logging.getLogger("scxmlApp").info(">>>>_EventListener::notify EventListener: <" + ">")
-        logging.getLogger("scxmlApp").debug(event.getStatus())
+        if self.mUserActionEvent is not None:
+            logger.debug (">>>>>>>>>>>>>>>>>>>>>>>>>>>userActionEvent found")    
+            self.mUserActionEvent.execute(event)
+        logger.info(">>>>_EventListener::notify EventListener: <>")
+        logger.debug("%s", event.getStatus())
 
 
 class _Application(threading.Thread):   
@@ -65,33 +71,34 @@ class _Application(threading.Thread):
         self.mActionMgr.createActivities(theEventQueue=self.mEventQueue, theData=self.mData, activity_classes=activities)
         
         self.mContext = Context()
-        logging.getLogger("scxmlApp").info("_Application::Loading SCXML model") 
+        logger.info("_Application::Loading SCXML model") 
         self.mModel = Reader().readString("modelName", theScxmlDoc, self.mActionMgr.getActions(), self.mActionMgr.getActivities())
-        logging.getLogger("scxmlApp").debug("_Application::Loaded SCXML model: " + scxml4py.helper.formatModel(self.mModel))
-        self.mExecutor = Executor(self.mModel, self.mContext)
+        logger.debug("_Application::Loaded SCXML model: %s", LazyFormat(scxml4py.helper.formatModel, self.mModel))
+        # events are posted by the Application thread and the activities
+        self.mExecutor = Executor(self.mModel, self.mContext, theQueueType = QueueType.THREADED)
         self.mActionStatus = _ActionStatus(theData=self.mData, theActionMgr = self.mActionMgr)
         self.mEventListener = _EventListener(theData=self.mData, callback=self.event_callback, theActionMgr = self.mActionMgr)
         self.mExecutor.addStatusListener(self.mActionStatus)
         self.mExecutor.addEventListener(self.mEventListener)
-        logging.getLogger("scxmlApp").info("_Application::Status: <" + scxml4py.helper.formatStatus(self.mExecutor.getStatus()) + ">")
+        logger.info("_Application::Status: <%s>", LazyFormat(scxml4py.helper.formatStatus, self.mExecutor.getStatus()))
         
     def run(self):
-        logging.getLogger("scxmlApp").info("_Application::Starting execution of <" + self.mModel.getId() + ">")
+        logger.info("_Application::Starting execution of <%s>", self.mModel.getId())
         self.mRunning = True
         self.mExecutor.start()
-        logging.getLogger("scxmlApp").info("_Application::Status: <" + scxml4py.helper.formatStatus(self.mExecutor.getStatus()) + ">")
+        logger.info("_Application::Status: <%s>", LazyFormat(scxml4py.helper.formatStatus, self.mExecutor.getStatus()))
         while self.mRunning == True:
             theEvent = self.mEventQueue.get(True, None)
             #Queue().get(block, timeout)
             # loop on the event queue send the event to the SM engine
-            logging.getLogger("scxmlApp").debug("_Application::Application received event = <" + theEvent.__str__() + ">")
+            logger.debug("_Application::Application received event = <%s>", theEvent)
             self.mExecutor.processEvent(theEvent)
             if theEvent.getId() == "_EXIT":
-                logging.getLogger("scxmlApp").debug("_Application::Application exiting...")
+                logger.debug("_Application::Application exiting...")
                 self.mRunning = False
-        logging.getLogger("scxmlApp").info("_Application::Stopping execution of <" + self.mModel.getId() + ">")
+        logger.info("_Application::Stopping execution of <%s>", self.mModel.getId())
         self.mExecutor.stop()
-        logging.getLogger("scxmlApp").info("_Application::Status: <" + scxml4py.helper.formatStatus(self.mExecutor.getStatus()) + ">")
+        logger.info("_Application::Status: <%s>", LazyFormat(scxml4py.helper.formatStatus, self.mExecutor.getStatus()))
 
     def event_callback(self):
         self._event.set()  # unblock the waiting method
@@ -118,8 +125,11 @@ class Application:
     def get_current_status(self):
         return scxml4py.helper.formatStatus(self.application.mExecutor.getStatus())
 
-    def send_signal(self, signal_name:str, sync:bool=True, rtc_block:bool=True):
-        self.event_queue.put(Event(signal_name), sync, 2)
+    def send_signal(self, signal_name:str, sync:bool=True, rtc_block:bool=True, data=None):
+        # data (e.g. a memoryview) is attached to the event as it is,
+        # actions and guards read it as _event.data.
+        # A new Event per signal: its status is read by the listeners.
+        self.event_queue.put(Event(signal_name, theData = data), sync, 2)
         if rtc_block:
             self.application.wait_for_event()
 
@@ -0,0 +1,222 @@
+'''
+    shardedApplication module part of scxmlApp.
+
+    Run many state machine sessions partitioned across worker processes.
+
+    @authors: landolfa
+'''
+
+import logging
+import threading
+import zlib
+import multiprocessing
+from queue import Queue, Empty
+
+from scxml4py.reader import Reader
+from scxml4py.context import Context
+from scxml4py.event import Event
+from scxml4py.executor import Executor
+from scxml4py.eventQueue import QueueType
+from scxml4py.session import Session
+from scxml4py.exceptions import ScxmlError
+
+from scxmlApp.actionmgr import ActionMgr
+
+logger = logging.getLogger("scxmlApp")
+
+# requests sent to the shards: (command, sessionId, argument, isReplyRequired)
+_CREATE = "create"
+_DELETE = "delete"
+_EVENT = "event"
+_STATUS = "status"
+_SESSIONS = "sessions"
+_EXIT = "exit"
+
+
+class _Shard(object):
+    """
+    Worker process: the model is loaded once and shared by the Executors
+    of all the sessions assigned to the shard.
+
+    Actions are instantiated once per shard, they can identify the
+    session from the context (Context.getSessionId). Activities are
+    instantiated per session (see Session.getActivity) and post their
+    events to the queue of their session: the events are delivered, as
+    they are, to the Executor of that session only.
+    """
+
+    def __init__(self, theConnection, theScxmlDoc, data, actions, activities):
+        self.mConnection = theConnection
+        self.mActionMgr = ActionMgr()
+        self.mActionMgr.createActions(theData=data, action_classes=actions)
+        # prototypes: the sessions use their own instances
+        self.mActionMgr.createActivities(theEventQueue=None, theData=data, activity_classes=activities)
+        self.mModel = Reader().readString("modelName", theScxmlDoc, self.mActionMgr.getActions(), self.mActionMgr.getActivities())
+        # shared by the sessions, each one has its own runtime Session
+        self.mModel.freeze()
+        self.mExecutors = dict()
+
+    def run(self):
+        while True:
+            if self.mConnection.poll(0.05):
+                command, theSessionId, argument, isReplyRequired = self.mConnection.recv()
+                if command == _EXIT:
+                    break
+                try:
+                    reply = ("ok", self.execute(command, theSessionId, argument))
+                except Exception as e:
+                    logger.exception("Shard error processing <%s> for session <%s>", command, theSessionId)
+                    reply = ("error", str(e))
+                if isReplyRequired:
+                    self.mConnection.send(reply)
+            self.dispatchActivityEvents()
+        for executor in self.mExecutors.values():
+            executor.stop()
+        self.mConnection.send(("ok", None))
+
+    def execute(self, command, theSessionId, argument):
+        if command == _CREATE:
+            if theSessionId in self.mExecutors:
+                raise ScxmlError("Session <" + str(theSessionId) + "> already exists")
+            ctx = Context()
+            ctx.setSessionId(theSessionId)
+            # the activities of the session post their events from their threads
+            session = Session(ctx, None, Queue())
+            executor = Executor(self.mModel, ctx, theQueueType = QueueType.SIMPLE, theSession = session)
+            self.mExecutors[theSessionId] = executor
+            executor.start()
+            return self.getConfiguration(executor)
+        elif command == _SESSIONS:
+            return list(self.mExecutors.keys())
+        executor = self.mExecutors.get(theSessionId)
+        if executor == None:
+            raise ScxmlError("Unknown session <" + str(theSessionId) + ">")
+        if command == _EVENT:
+            signalName, data = argument
+            e = Event(signalName, theData = data)
+            executor.processEvent(e)
+            return (e.getStatus().value, self.getConfiguration(executor))
+        elif command == _STATUS:
+            return self.getConfiguration(executor)
+        elif command == _DELETE:
+            executor.stop()
+            del self.mExecutors[theSessionId]
+            return None
+        raise ScxmlError("Unknown command <" + str(command) + ">")
+
+    def getConfiguration(self, executor):
+        # only the ids cross the process boundary
+        return tuple(s.getId() for s in executor.getStatus())
+
+    def dispatchActivityEvents(self):
+        for executor in list(self.mExecutors.values()):
+            queue = executor.getSession().getEventQueue()
+            while True:
+                try:
+                    e = queue.get_nowait()
+                except Empty:
+                    break
+                executor.processEvent(e)
+
+
+def _runShard(theConnection, theScxmlDoc, data, actions, activities):
+    _Shard(theConnection, theScxmlDoc, data, actions, activities).run()
+
+
+class ShardedApplication(object):
+    """
+    Front-end of a pool of worker processes, each one hosting the
+    Executors of a subset of the sessions. Sessions are assigned to the
+    shards by hashing their id.
+
+    The configurations are returned as tuples of state ids (or formatted
+    as in Application.get_current_status), the State objects never leave
+    the worker processes.
+    """
+
+    def __init__(self, scxmlDoc: str, actions, activities, data, numberOfShards = None):
+        self.doc = scxmlDoc
+        self.data = data
+        self.actions = actions
+        self.activities = activities
+        if numberOfShards == None:
+            numberOfShards = multiprocessing.cpu_count()
+        assert(numberOfShards > 0)
+        self.mNumberOfShards = numberOfShards
+        self.mConnections = list()
+        self.mLocks = list()
+        self.mProcesses = list()
+
+    def start(self):
+        for n in range(self.mNumberOfShards):
+            connection, workerConnection = multiprocessing.Pipe()
+            p = multiprocessing.Process(target=_runShard, name="scxmlApp-shard-" + str(n),
+                                        args=(workerConnection, self.doc, self.data, self.actions, self.activities),
+                                        daemon=True)
+            p.start()
+            self.mConnections.append(connection)
+            self.mLocks.append(threading.Lock())
+            self.mProcesses.append(p)
+
+    def terminate(self):
+        for n in range(self.mProcesses.__len__()):
+            with self.mLocks[n]:
+                self.mConnections[n].send((_EXIT, None, None, True))
+                self.mConnections[n].recv()
+        for p in self.mProcesses:
+            p.join()
+        self.mConnections.clear()
+        self.mLocks.clear()
+        self.mProcesses.clear()
+
+    def get_shard(self, sessionId):
+        # stable across processes, unlike hash()
+        return zlib.crc32(str(sessionId).encode("utf-8")) % self.mNumberOfShards
+
+    def request(self, sessionId, command, argument = None, isReplyRequired = True):
+        n = self.get_shard(sessionId)
+        with self.mLocks[n]:
+            self.mConnections[n].send((command, sessionId, argument, isReplyRequired))
+            if isReplyRequired == False:
+                return None
+            result, value = self.mConnections[n].recv()
+        if result == "error":
+            raise ScxmlError(value)
+        return value
+
+    def create_session(self, sessionId):
+        """
+        Create and start an Executor for the session.
+        Returns the initial configuration.
+        """
+        return self.request(sessionId, _CREATE)
+
+    def delete_session(self, sessionId):
+        self.request(sessionId, _DELETE)
+
+    def get_sessions(self):
+        sessions = list()
+        for n in range(self.mConnections.__len__()):
+            with self.mLocks[n]:
+                self.mConnections[n].send((_SESSIONS, None, None, True))
+                result, value = self.mConnections[n].recv()
+            sessions.extend(value)
+        return sessions
+
+    def get_configuration(self, sessionId):
+        return self.request(sessionId, _STATUS)
+
+    def get_current_status(self, sessionId):
+        # same format as helper.formatStatus
+        return " ".join(sorted(self.get_configuration(sessionId)))
+
+    def send_signal(self, sessionId, signal_name:str, rtc_block:bool=True, data=None):
+        """
+        Send an event to a session, see Application.send_signal. With
+        rtc_block the call returns once the event has been processed,
+        with the EventStatus value and the new configuration.
+        data is sent to the shard process: it must be picklable, the
+        actions and guards read a copy of it as _event.data.
+        """
+        return self.request(sessionId, _EVENT, (signal_name, data), rtc_block)
+
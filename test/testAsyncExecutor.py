@@ -0,0 +1,197 @@
+'''
+    testAsyncExecutor module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import asyncio
+from scxml4py.action import Action
+from scxml4py.activity import CoroActivity
+from scxml4py.asyncExecutor import AsyncExecutor
+from scxml4py.context import Context
+from scxml4py.event import Event, EventStatus
+from scxml4py.eventQueue import AsyncQueue
+from scxml4py.state import StateAtomic, StateCompound
+from scxml4py.stateMachine import StateMachine
+
+
+class AsyncCounterAction(Action):
+    def __init__(self, theId):
+        Action.__init__(self, theId)
+        self.mCounter = 0
+    async def execute(self, theCtx):
+        await asyncio.sleep(0)
+        self.mCounter += 1
+
+class AsyncGuard(Action):
+    def __init__(self, theId, theResult):
+        Action.__init__(self, theId)
+        self.mResult = theResult
+    async def evaluate(self, theCtx):
+        await asyncio.sleep(0)
+        return self.mResult
+
+class PostEventAction(Action):
+    def __init__(self, theId, theEventQueue, theEvent):
+        Action.__init__(self, theId, theEventQueue)
+        self.mEvent = theEvent
+    def execute(self, theCtx):
+        self.sendInternalEvent(self.mEvent)
+
+class ProcessEventAction(Action):
+    def __init__(self, theId, theEvent):
+        Action.__init__(self, theId)
+        self.mExecutor = None
+        self.mEvent = theEvent
+    async def execute(self, theCtx):
+        await self.mExecutor.processEvent(self.mEvent)
+
+class StopAction(Action):
+    def __init__(self, theId):
+        Action.__init__(self, theId)
+        self.mExecutor = None
+    async def execute(self, theCtx):
+        await self.mExecutor.stop()
+
+class PostEventActivity(CoroActivity):
+    async def run(self):
+        await asyncio.sleep(0)
+        self.sendInternalEvent(Event("done"))
+
+
+class TestAsyncExecutor(unittest.TestCase):
+
+    def createModel(self):
+        """
+        S1 -e1[false]-> S3
+        S1 -e1[true]/a-> S2 (entry: post e2)
+        S2 -e2-> C
+        C
+          C1 (entry: b) -next-> C2
+          C2
+        C -stop-> S1
+        """
+        self.s1 = StateAtomic("S1")
+        self.s2 = StateAtomic("S2")
+        self.s3 = StateAtomic("S3")
+        self.c = StateCompound("C")
+        self.c1 = StateAtomic("C1")
+        self.c2 = StateAtomic("C2")
+        self.c.addSubstate(self.c1)
+        self.c.addSubstate(self.c2)
+        self.c.setInitialState(self.c1, None)
+        self.sm = StateMachine("AsyncStateMachine")
+        for s in [self.s1, self.s2, self.s3, self.c]:
+            self.sm.addSubstate(s)
+        self.sm.setInitialState(self.s1, None)
+        self.a = AsyncCounterAction("a")
+        self.b = AsyncCounterAction("b")
+        self.s1.addTransition(self.s3, Event("e1"), None, AsyncGuard("false", False))
+        self.s1.addTransition(self.s2, Event("e1"), self.a, AsyncGuard("true", True))
+        self.s2.addTransition(self.c, Event("e2"), None, None)
+        self.c1.addEntryAction(self.b)
+        self.c1.addTransition(self.c2, Event("next"), None, None)
+        self.c.addTransition(self.s1, Event("stop"), None, None)
+
+    def testProcessEvent(self):
+        self.createModel()
+        async def run():
+            executor = AsyncExecutor(self.sm, Context())
+            assert(type(executor.mInternalEvents) == AsyncQueue)
+            self.s2.addEntryAction(PostEventAction("post", executor.mInternalEvents, Event("e2")))
+            await executor.start()
+            assert(self.s1 in executor.getStatus())
+            e = Event("e1")
+            await executor.processEvent(e)
+            assert(e.getStatus() == EventStatus.PROCESSED)
+            assert(self.c1 in executor.getStatus())
+            assert(self.a.mCounter == 1)
+            assert(self.b.mCounter == 1)
+            assert(await executor.isEventProcessable(Event("next")) == True)
+            # concurrent calls are serialized
+            await asyncio.gather(executor.processEvent(Event("next")), executor.processEvent(Event("stop")))
+            assert(self.s1 in executor.getStatus())
+            statuses = await executor.processEventBatch([Event("e1"), Event("e2")])
+            assert(list(statuses) == [EventStatus.PROCESSED.value, EventStatus.IGNORED.value])
+            assert(self.c1 in executor.getStatus())
+            await executor.stop()
+            assert(executor.getStatus().__len__() == 0)
+        asyncio.run(run())
+
+    def testReentrantProcessEvent(self):
+        """
+        S1 -e1[true]/a, process e2-> S2 -e2-> C
+        """
+        self.createModel()
+        e2 = Event("e2")
+        action = ProcessEventAction("process", e2)
+        self.s1.getTransitions()[1].addAction(action)
+        async def run():
+            executor = AsyncExecutor(self.sm, Context())
+            action.mExecutor = executor
+            await executor.start()
+            e1 = Event("e1")
+            # e2 is processed once e1 has been processed
+            await asyncio.wait_for(executor.processEvent(e1), 1)
+            assert(e1.getStatus() == EventStatus.PROCESSED)
+            assert(e2.getStatus() == EventStatus.PROCESSED)
+            assert(self.c1 in executor.getStatus())
+            assert(self.b.mCounter == 1)
+            await executor.stop()
+        asyncio.run(run())
+
+    def testReentrantStop(self):
+        """
+        S1 -e1[true]/a, stop-> S2
+        """
+        self.createModel()
+        action = StopAction("stop")
+        self.s1.getTransitions()[1].addAction(action)
+        async def run():
+            executor = AsyncExecutor(self.sm, Context())
+            action.mExecutor = executor
+            # S2 posts e2 on entry, it is not processed
+            self.s2.addEntryAction(PostEventAction("post", executor.mInternalEvents, Event("e2")))
+            await executor.start()
+            e1 = Event("e1")
+            await asyncio.wait_for(executor.processEvent(e1), 1)
+            assert(e1.getStatus() == EventStatus.PROCESSED)
+            assert(executor.isRunning() == False)
+            assert(executor.getStatus().__len__() == 0)
+            assert(self.b.mCounter == 0)
+            # the lock has been released
+            await asyncio.wait_for(executor.stop(), 1)
+        asyncio.run(run())
+
+    def testCoroActivity(self):
+        """
+        S1 (invoke: activity posting 'done') -done-> S2
+        """
+        s1 = StateAtomic("S1")
+        s2 = StateAtomic("S2")
+        sm = StateMachine("ActivityStateMachine")
+        sm.addSubstate(s1)
+        sm.addSubstate(s2)
+        sm.setInitialState(s1, None)
+        s1.addTransition(s2, Event("done"), None, None)
+        async def run():
+            executor = AsyncExecutor(sm, Context())
+            activity = PostEventActivity("activity", executor.mExternalEvents)
+            s1.addActivity(activity)
+            await executor.start()
+            # as for the Executor the activities are started at the end of a macrostep
+            await executor.processEvent(Event("tick"))
+            assert(activity.getLoop() is asyncio.get_running_loop())
+            assert(activity.isRunning() == True)
+            await asyncio.sleep(0.01)
+            await executor.processEvents()
+            assert(s2 in executor.getStatus())
+            assert(activity.isRunning() == False)
+            await executor.stop()
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
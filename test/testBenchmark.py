@@ -0,0 +1,99 @@
+'''
+    testBenchmark module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import json
+from pathlib import Path
+
+import scxml4py.benchmark
+from scxml4py.benchmark import Benchmark, generateModel, createStubs, createReport, compare
+from scxml4py.reader import Reader
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        # setup the path to the directory containing the SCXML models
+        self.mModelsPath = Path(".")
+        for x in self.mModelsPath.iterdir():
+            if x.is_dir() and x.__str__() == "models":
+                self.mModelsPath = self.mModelsPath / "models"
+                break
+            elif x.is_dir() and x.__str__() == "test":
+                self.mModelsPath = self.mModelsPath / "test" / "models"
+                break
+
+    def testGenerateModel(self):
+        text, events = generateModel(2, 2, 3, 0.5)
+        assert(events == ["next"])
+        actions, activities = createStubs(text)
+        assert(sorted([a.getId() for a in actions]) == ["entry", "exit", "guard", "trans"])
+        sm = Reader().readString("synthetic", text, actions, activities)
+        # ROOT + 3 regions x (1 + 2 + 4) states
+        assert(sm.getIndex().getStates().__len__() == 22)
+        text, events = generateModel(1, 3, 0, 0.0)
+        assert(text.find("cond=") == -1)
+        sm = Reader().readString("synthetic", text, *createStubs(text))
+        assert(sm.getIndex().getStates().__len__() == 4)
+
+    def testRunSynthetic(self):
+        text, events = generateModel(2, 2, 2, 1.0)
+        b = Benchmark("synthetic", text, events, 5)
+        report = createReport([b])
+        result = report["results"][0]
+        assert(result["events"] == 5)
+        # the regions take their transitions in the same microstep
+        assert(result["microsteps"] == 5)
+        assert(result["events_per_sec"] > 0)
+        assert(result["microstep_p50_us"] <= result["microstep_p99_us"])
+        assert(result["peak_memory_kb"] > 0)
+        json.dumps(report)
+
+    def testClone(self):
+        text, events = generateModel(1, 2, 1, 0.0)
+        b = Benchmark("cloned", text, events, 2)
+        b.setClones(4, "ROOT")
+        result = b.run()
+        # ROOT + original region + 4 cloned regions, 3 states each
+        assert(result["states"] == 16)
+        assert(result["clone_time_s"] > 0)
+
+    def testShutterModel(self):
+        with open(self.mModelsPath / "scxmlShutter.xml", encoding="utf-8") as f:
+            text = f.read()
+        b = Benchmark("shutter", text, ["INIT", "INITCLOSED", "ENABLE", "OPEN", "ISOPEN"], 3)
+        result = b.run()
+        assert(result["events"] == 15)
+        assert(result["microsteps"] > 0)
+
+    def testCompare(self):
+        previous = {"results": [{"name": "a", "events_per_sec": 100.0, "parse_time_s": 1.0}]}
+        report = {"results": [{"name": "a", "events_per_sec": 80.0, "parse_time_s": 1.0},
+                              {"name": "b", "events_per_sec": 80.0, "parse_time_s": 1.0}]}
+        comparison = compare(report, previous, 0.1)
+        assert(comparison.__len__() == 1)
+        assert(comparison[0]["regression"] == True)
+        comparison = compare(report, previous, 0.25)
+        assert(comparison[0]["regression"] == False)
+
+    def testMain(self):
+        import tempfile, os
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "result.json")
+            assert(scxml4py.benchmark.main(["--depth", "1", "--fanout", "2", "--regions", "1",
+                                             "--repeat", "2", "--output", output]) == 0)
+            with open(output, encoding="utf-8") as f:
+                report = json.load(f)
+            assert(report["version"] == scxml4py.benchmark.REPORT_VERSION)
+            assert(scxml4py.benchmark.main(["--depth", "1", "--fanout", "2", "--regions", "1",
+                                             "--repeat", "2", "--output", output,
+                                             "--compare", output, "--tolerance", "1.0"]) == 0)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
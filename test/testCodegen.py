@@ -0,0 +1,161 @@
+'''
+    testCodegen module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+from pathlib import Path
+import scxml4py.helper
+import scxml4py.trace
+import testExecutor
+import testShutter
+from scxml4py.action import Action
+from scxml4py.activity import ThreadedActivity
+from scxml4py.benchmark import Benchmark, generateModel, createStubs
+from scxml4py.codegen import GeneratedExecutor, generateSource, getEngine
+from scxml4py.context import Context
+from scxml4py.event import Event
+from scxml4py.executor import Executor
+from scxml4py.reader import Reader
+from scxml4py.state import StateAtomic
+from scxml4py.stateMachine import StateMachine
+
+
+class GuardFlag(Action):
+    def __init__(self, theId):
+        Action.__init__(self, theId)
+        self.mValue = False
+    def evaluate(self, theCtx):
+        return self.mValue
+
+
+class GeneratedScenarios(object):
+    """
+    Run the scenarios of a test module with the GeneratedExecutor
+    and without traces, so that the generated code is used.
+    """
+    mModule = None
+
+    def setUp(self):
+        super().setUp()
+        self.mExecutor = self.mModule.Executor
+        self.mModule.Executor = GeneratedExecutor
+        self.mIsTraceEnabled = scxml4py.trace.isEnabled()
+        scxml4py.trace.setEnabled(False)
+
+    def tearDown(self):
+        self.mModule.Executor = self.mExecutor
+        scxml4py.trace.setEnabled(self.mIsTraceEnabled)
+        super().tearDown()
+
+
+class TestGeneratedExecutor(GeneratedScenarios, testExecutor.TestExecutor):
+    mModule = testExecutor
+
+
+class TestGeneratedShutter(GeneratedScenarios, testShutter.TestShutter):
+    mModule = testShutter
+
+
+class TestCodegen(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self.mModelsPath = Path(__file__).parent / "models"
+        self.mIsTraceEnabled = scxml4py.trace.isEnabled()
+        scxml4py.trace.setEnabled(False)
+
+    def tearDown(self):
+        scxml4py.trace.setEnabled(self.mIsTraceEnabled)
+        unittest.TestCase.tearDown(self)
+
+    def runBoth(self, sm, events):
+        statuses = list()
+        for executorType in [Executor, GeneratedExecutor]:
+            ex = executorType(sm, Context())
+            ex.start()
+            trace = [scxml4py.helper.formatStatus(ex.getStatus())]
+            for e in events:
+                ex.processEvent(Event(e))
+                trace.append(scxml4py.helper.formatStatus(ex.getStatus()))
+            ex.stop()
+            statuses.append(trace)
+        assert(statuses[0] == statuses[1])
+        return statuses[1]
+
+    def testShutterModel(self):
+        actions = testShutter.ActionMgr()
+        actions.createActions(None, None)
+        activities = [ThreadedActivity(a) for a in ["Initializing", "Opening", "Closing", "Disabling"]]
+        sm = Reader().read((self.mModelsPath / "scxmlShutter.xml").__str__(), actions.getActions(), activities)
+        events = ["INIT", "INITCLOSED", "ENABLE", "OPEN", "ISOPEN", "CLOSE", "ISCLOSED", "DISABLE", "DISABLECLOSED", "RESET", "INIT", "STOP"]
+        self.runBoth(sm, events)
+
+    def testHistoryModel(self):
+        sm = Reader().read((self.mModelsPath / "scxmlModelHistory.xml").__str__(), None, None)
+        statuses = self.runBoth(sm, ["Play", "Next", "Pause", "Play", "Next", "Stop", "Play"])
+        assert(statuses[4] == "PLAYING SONG2")
+        assert(statuses[5] == "PLAYING SONG3")
+
+    def testGuards(self):
+        """
+        S1 -e1 [g1]-> S2, S1 -e1-> S3: the guard is inlined in the select function.
+        """
+        g1 = GuardFlag("g1")
+        s1 = StateAtomic("S1")
+        s2 = StateAtomic("S2")
+        s3 = StateAtomic("S3")
+        sm = StateMachine("StateMachine")
+        sm.addSubstate(s1)
+        sm.addSubstate(s2)
+        sm.addSubstate(s3)
+        s1.addTransition(s2, Event("e1"), None, g1)
+        s1.addTransition(s3, Event("e1"), None, None)
+        s2.addTransition(s1, None, None, None)
+        sm.setInitialState(s1, None)
+        source = generateSource(sm)
+        assert("G_0.evaluate(ctx) != False" in source)
+        executor = GeneratedExecutor(sm, Context())
+        executor.start()
+        executor.processEvent(Event("e1"))
+        assert(scxml4py.helper.formatStatus(executor.getStatus()) == "S3")
+        executor.stop()
+        g1.mValue = True
+        executor.start()
+        # S2 is left at once by the event-less transition
+        executor.processEvent(Event("e1"))
+        assert(scxml4py.helper.formatStatus(executor.getStatus()) == "S1")
+        executor.stop()
+
+    def testEngine(self):
+        text, events = generateModel(2, 2, 1, 0.5)
+        actions, activities = createStubs(text)
+        sm = Reader().readString("model", text, actions, activities)
+        engine = getEngine(sm)
+        assert(getEngine(sm) is engine)
+        executor = GeneratedExecutor(sm, Context())
+        executor.start()
+        assert(executor.getEngine() is engine)
+        # the cloned regions rebuild the index and the engine
+        sm.cloneParallel(2, "ROOT", {}, {})
+        sm1 = Reader().readString("model", text, actions, activities)
+        sm1.cloneParallel(2, "ROOT", {}, {})
+        events = ["next"] * 6
+        executor.processEvent(Event("next"))
+        assert(executor.getEngine() is not engine)
+        self.runBoth(sm1, events)
+
+    def testBenchmark(self):
+        text, events = generateModel(2, 2, 2, 0.5)
+        for isGenerated in [False, True]:
+            b = Benchmark("synthetic", text, events, 2)
+            b.setGenerated(isGenerated)
+            result = b.run()
+            assert(result["events"] == 2)
+            assert(result["name"].endswith("-generated") == isGenerated)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
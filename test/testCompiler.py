@@ -0,0 +1,125 @@
+'''
+    testCompiler module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import os
+import unittest
+import tempfile
+from pathlib import Path
+import scxml4py.helper
+from scxml4py.action import Action
+from scxml4py.activity import ThreadedActivity
+from scxml4py.compiler import compileModel, loadModel, ModelCache
+from scxml4py.context import Context
+from scxml4py.event import Event
+from scxml4py.exceptions import ScxmlError, ScxmlSyntaxError
+from scxml4py.executor import Executor
+from scxml4py.reader import Reader
+from scxml4py.state import StateHistory
+
+
+class GuardTrue(Action):
+    def __init__(self, theId):
+        Action.__init__(self, theId)
+    def evaluate(self, theCtx):
+        return True
+
+
+class TestCompiler(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self.mModelsPath = Path(__file__).parent / "models"
+
+    def run_events(self, sm, events):
+        ex = Executor(sm, Context())
+        ex.start()
+        statuses = [scxml4py.helper.formatStatus(ex.getStatus())]
+        for e in events:
+            ex.processEvent(Event(e))
+            statuses.append(scxml4py.helper.formatStatus(ex.getStatus()))
+        ex.stop()
+        return statuses
+
+    def testRoundTripHistory(self):
+        fileName = (self.mModelsPath / "scxmlModelHistory.xml").__str__()
+        sm = Reader().read(fileName, None, None)
+        sm1 = loadModel(compileModel(sm), None, None)
+        assert(sm1.getId() == sm.getId())
+        assert(scxml4py.helper.formatModel(sm1) == scxml4py.helper.formatModel(sm))
+        h = sm1.findStateInMap("PLAYING.HISTORY")
+        assert(type(h) == StateHistory)
+        assert(sm1.findStateInMap("PLAYING").getHistory() is h)
+        events = ["Play", "Next", "Next", "Pause", "Play", "Stop"]
+        assert(self.run_events(sm1, events) == self.run_events(sm, events))
+        # the artifact is deterministic
+        assert(compileModel(sm1) == compileModel(sm))
+
+    def testRoundTripActions(self):
+        actionList = [Action("logEntry"), Action("logExit"), Action("logTrans"), GuardTrue("logGuard")]
+        activityList = [ThreadedActivity("activityTest")]
+        fileName = (self.mModelsPath / "scxmlModel1.xml").__str__()
+        sm = Reader().read(fileName, actionList, activityList)
+        data = compileModel(sm)
+        sm1 = loadModel(data, actionList, activityList)
+        for s in sm1.getIndex().getStates():
+            for a in s.getEntryActions().getActions() + s.getExitActions().getActions():
+                assert(a in actionList)
+            for a in s.getActivities():
+                assert(a in activityList)
+        events = ["INIT", "ENABLE", "START", "STOP", "DISABLE", "ENABLE", "RESET"]
+        assert(self.run_events(sm1, events) == self.run_events(sm, events))
+        with self.assertRaises(ScxmlSyntaxError):
+            loadModel(data, actionList[1:], activityList)
+        with self.assertRaises(ScxmlSyntaxError):
+            loadModel(data, actionList, None)
+
+    def testRoundTripCloned(self):
+        listAction = [Action("myEntryAction"), Action("myExitAction"), Action("myTransAction"), GuardTrue("myGuard")]
+        listActivity = [ThreadedActivity("myRecordingActivity")]
+        fileName = (self.mModelsPath / "scxmlModelCloned.xml").__str__()
+        sm = Reader().read(fileName, listAction, listActivity)
+        sm.cloneParallel(2, "online", {}, {})
+        sm1 = loadModel(compileModel(sm), listAction, listActivity)
+        events = ["startRec", "startRec1", "stopRec", "stopRec1"]
+        assert(self.run_events(sm1, events) == self.run_events(sm, events))
+
+    def testInvalidArtifact(self):
+        fileName = (self.mModelsPath / "scxmlModelHistory.xml").__str__()
+        data = compileModel(Reader().read(fileName, None, None))
+        corrupted = bytearray(data)
+        corrupted[-1] ^= 0xFF
+        with self.assertRaises(ScxmlError):
+            loadModel(bytes(corrupted), None, None)
+        with self.assertRaises(ScxmlError):
+            loadModel(b"XXXX" + data[4:], None, None)
+        with self.assertRaises(ScxmlError):
+            loadModel(data[:10], None, None)
+
+    def testModelCache(self):
+        fileName = (self.mModelsPath / "scxmlModelHistory.xml").__str__()
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ModelCache(directory)
+            sm = cache.read(fileName, None, None)
+            assert(cache.getMisses() == 1 and cache.getHits() == 0)
+            assert(sm.getId() == fileName)
+            sm1 = cache.read(fileName, None, None)
+            assert(cache.getMisses() == 1 and cache.getHits() == 1)
+            assert(sm1 is not sm)
+            assert(scxml4py.helper.formatModel(sm1) == scxml4py.helper.formatModel(sm))
+            # a corrupted artifact is replaced
+            path = cache.getPath(fileName, open(fileName, "rb").read())
+            with open(path, "wb") as f:
+                f.write(b"garbage")
+            cache.read(fileName, None, None)
+            assert(cache.getMisses() == 2)
+            cache.read(fileName, None, None)
+            assert(cache.getHits() == 2)
+            assert(os.listdir(directory).__len__() == 1)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
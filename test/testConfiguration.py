@@ -0,0 +1,114 @@
+'''
+    testConfiguration module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import scxml4py.helper
+from scxml4py.configuration import Configuration
+from scxml4py.exceptions import ScxmlError
+from scxml4py.state import StateAtomic, StateCompound, StateParallel
+from scxml4py.stateMachine import StateMachine
+
+
+class TestConfiguration(unittest.TestCase):
+
+    def setUp(self):
+        """
+        P
+          A
+            A1
+            A2
+          B
+            B1
+        """
+        self.p = StateParallel("P")
+        self.a = StateCompound("A")
+        self.a1 = StateAtomic("A1")
+        self.a2 = StateAtomic("A2")
+        self.b = StateCompound("B")
+        self.b1 = StateAtomic("B1")
+        self.p.addSubstate(self.a)
+        self.p.addSubstate(self.b)
+        self.a.addSubstate(self.a1)
+        self.a.addSubstate(self.a2)
+        self.b.addSubstate(self.b1)
+        self.sm = StateMachine("MyStateMachine")
+        self.sm.addSubstate(self.p)
+        self.index = self.sm.getIndex()
+
+    def testAddRemove(self):
+        c = Configuration(self.index)
+        assert(c.__len__() == 0)
+        c.add(self.a1)
+        c.add(self.b1)
+        c.add(self.b1)
+        assert(c.__len__() == 2)
+        assert(self.a1 in c)
+        assert(c.isActive(self.b1) == True)
+        assert(self.a2 not in c)
+        assert(None not in c)
+        c.remove(self.a1)
+        assert(self.a1 not in c)
+        with self.assertRaises(KeyError):
+            c.remove(self.a1)
+        c.discard(self.a1)
+        c.clear()
+        assert(c.__len__() == 0)
+        with self.assertRaises(ScxmlError):
+            c.add(StateAtomic("Unknown"))
+
+    def testDocumentOrder(self):
+        c = Configuration(self.index)
+        for s in [self.b1, self.a1, self.p, self.b, self.a]:
+            c.add(s)
+        assert(list(c) == [self.p, self.a, self.a1, self.b, self.b1])
+        assert(c.getAtomicStates() == [self.a1, self.b1])
+        assert(scxml4py.helper.getAtomicStates(c) == [self.a1, self.b1])
+        assert(scxml4py.helper.formatStatus(c) == "A A1 B B1 P")
+
+    def testSetOperations(self):
+        c1 = Configuration(self.index)
+        c1.add(self.a)
+        c1.add(self.a1)
+        c2 = Configuration(self.index)
+        c2.add(self.a1)
+        c2.add(self.b1)
+        assert(list(c1 | c2) == [self.a, self.a1, self.b1])
+        assert(list(c1 - c2) == [self.a])
+        assert(list(c1 & c2) == [self.a1])
+        assert(c1 == {self.a, self.a1})
+        assert((c1 | {self.b1}) == {self.a, self.a1, self.b1})
+
+    def testSnapshot(self):
+        c = Configuration(self.index)
+        c.add(self.a1)
+        snapshot = c.snapshot()
+        c.add(self.b1)
+        assert(snapshot.getKey() != c.getKey())
+        assert(list(snapshot) == [self.a1])
+        c.remove(self.b1)
+        assert(snapshot.getKey() == c.getKey())
+        cache = {snapshot.getKey(): "cached"}
+        assert(cache[c.getKey()] == "cached")
+
+    def testRebind(self):
+        c = Configuration(self.index)
+        c.add(self.p)
+        c.add(self.b)
+        c.add(self.b1)
+        # a new region changes the document order
+        a0 = StateCompound("A0")
+        a0.setParent(self.p)
+        self.p.setSubstates([a0, self.a, self.b])
+        index = self.sm.getIndex()
+        assert(index is not self.index)
+        c.rebind(index)
+        assert(list(c) == [self.p, self.b, self.b1])
+        assert(self.b1.getDocumentOrder() == 6)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -5,9 +5,20 @@
 '''
 
 import unittest
+from scxml4py.action import Action
 from scxml4py.context import Context
 from scxml4py.event import Event
         
+class CountingGuard(Action):
+    def __init__(self, theId):
+        Action.__init__(self, theId)
+        self.mCounter = 0
+    def evaluate(self, theContext):
+        self.mCounter += 1
+        return True
+    def isPure(self):
+        return True
+
 class TestContext(unittest.TestCase):
 
     def testContextName(self):
@@ -46,6 +57,48 @@ class TestContext(unittest.TestCase):
         ctx = Context()
         element = ctx.getElement("element3")
         assert(element == None)
+
+    def testContextVersion(self):
+        ctx = Context()
+        version = ctx.getVersion()
+        ctx.addElement("element1", "testElement1")
+        assert(ctx.getVersion() > version)
+        version = ctx.getVersion()
+        ctx.delElement("element1")
+        assert(ctx.getVersion() > version)
+        version = ctx.getVersion()
+        ctx.delElement("element1")
+        ctx.getElement("element1")
+        assert(ctx.getVersion() == version)
+        ctx.setLastEvent(Event("event1"))
+        assert(ctx.getVersion() > version)
+
+    def testContextEvaluateGuard(self):
+        ctx = Context()
+        guard = CountingGuard("guard1")
+        assert(ctx.evaluateGuard(guard) == True)
+        assert(ctx.evaluateGuard(guard) == True)
+        assert(guard.mCounter == 1)
+        ctx.addElement("element1", "testElement1")
+        assert(ctx.evaluateGuard(guard) == True)
+        assert(guard.mCounter == 2)
+        ctx.incrementVersion()
+        assert(ctx.evaluateGuard(guard) == True)
+        assert(guard.mCounter == 3)
+
+    def testContextDataVersion(self):
+        ctx = Context()
+        version = ctx.getDataVersion()
+        ctx.invalidateGuardResults()
+        assert(ctx.getDataVersion() == version)
+        ctx.incrementVersion()
+        assert(ctx.getDataVersion() > version)
+        version = ctx.getDataVersion()
+        ctx.addElement("element1", "testElement1")
+        assert(ctx.getDataVersion() > version)
+        version = ctx.getDataVersion()
+        ctx.setLastEvent(Event("event1"))
+        assert(ctx.getDataVersion() > version)
         
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
@@ -0,0 +1,188 @@
+'''
+    testDeferral module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import asyncio
+import scxml4py.helper
+from scxml4py.asyncExecutor import AsyncExecutor
+from scxml4py.context import Context
+from scxml4py.deferral import DeferredEventQueue, OverflowPolicy
+from scxml4py.event import Event, EventStatus
+from scxml4py.eventQueue import QueueType
+from scxml4py.executor import Executor, EventHandlingPolicy
+from scxml4py.listeners import EventListener
+from scxml4py.state import StateAtomic
+from scxml4py.stateMachine import StateMachine
+
+
+class RecordingListener(EventListener):
+    def __init__(self):
+        self.mEvents = list()
+    def notify(self, event):
+        self.mEvents.append((event.getId(), event.getStatus()))
+
+
+class TestDeferral(unittest.TestCase):
+
+    def setUp(self):
+        """
+        IDLE -start-> MOVING -arrived-> READY -cmd-> DONE -reset-> IDLE
+        """
+        unittest.TestCase.setUp(self)
+        idle = StateAtomic("IDLE")
+        moving = StateAtomic("MOVING")
+        ready = StateAtomic("READY")
+        done = StateAtomic("DONE")
+        idle.addTransition(moving, Event("start"), None, None)
+        moving.addTransition(ready, Event("arrived"), None, None)
+        ready.addTransition(done, Event("cmd"), None, None)
+        done.addTransition(idle, Event("reset"), None, None)
+        self.sm = StateMachine("Deferral")
+        for s in [idle, moving, ready, done]:
+            self.sm.addSubstate(s)
+        self.sm.setInitialState(idle)
+
+    def createExecutor(self, theExecutorType = Executor, theQueueType = QueueType.SIMPLE):
+        executor = theExecutorType(self.sm, Context(), None, None, theQueueType)
+        executor.setEventHandlingPolicy(EventHandlingPolicy.DEFFERRED)
+        listener = RecordingListener()
+        executor.addEventListener(listener)
+        return executor, listener
+
+    def testQueue(self):
+        q = DeferredEventQueue(3, OverflowPolicy.DROP_OLDEST)
+        events = [Event("a"), Event("b"), Event("a")]
+        for e in events:
+            assert(q.defer(e) == None)
+            assert(e.getStatus() == EventStatus.DEFERRED)
+        assert(q.getIds() == {"a", "b"})
+        # the oldest event is dropped
+        e = Event("c")
+        dropped = q.defer(e)
+        assert(dropped is events[0])
+        assert(dropped.getStatus() == EventStatus.IGNORED)
+        assert(q.getDroppedCount() == 1)
+        # only the accepted ids are released, in arrival order
+        released = q.release({"a", "c", "x"})
+        assert(released == [events[2], e])
+        assert(released[0] is events[2])
+        assert(q.__len__() == 1)
+        assert(q.release({"x"}) == [])
+        assert(q.getDeferredCount() == 4)
+        assert(q.getReleasedCount() == 2)
+        q = DeferredEventQueue(1, OverflowPolicy.REJECT)
+        q.defer(Event("a"))
+        e = Event("b")
+        assert(q.defer(e) is e)
+        assert(e.getStatus() == EventStatus.REJECTED)
+        assert(q.getRejectedCount() == 1)
+        assert(q.getIds() == {"a"})
+
+    def testDeferAgain(self):
+        """
+        A released event deferred again goes back to its place.
+        """
+        q = DeferredEventQueue(5)
+        a1, b, a2 = Event("a"), Event("b"), Event("a")
+        for e in [a1, b, a2]:
+            q.defer(e)
+        assert(q.release({"a"}) == [a1, a2])
+        c = Event("c")
+        q.defer(c)
+        q.defer(a2)
+        q.defer(a1)
+        assert([e is f for e, f in zip(q, [a1, b, a2, c])] == [True] * 4)
+        released = q.release({"a", "c"})
+        assert(released[0] is a1 and released[1] is a2 and released[2] is c)
+        # once processed, an event deferred again is a new one
+        a1.setStatus(EventStatus.PROCESSED)
+        q.defer(a2)
+        q.defer(a1)
+        assert([e is f for e, f in zip(q, [b, a2, a1])] == [True] * 3)
+
+    def testDeferredCommand(self):
+        executor, listener = self.createExecutor()
+        executor.start()
+        executor.processEvent(Event("start"))
+        cmd = Event("cmd")
+        executor.processEvent(cmd)
+        assert(cmd.getStatus() == EventStatus.DEFERRED)
+        # the configuration changes but does not accept cmd
+        executor.processEvent(Event("reset"))
+        assert(scxml4py.helper.formatStatus(executor.getStatus()) == "MOVING")
+        assert(executor.getDeferredEvents().__len__() == 2)
+        executor.processEvent(Event("arrived"))
+        # cmd is taken in READY, then reset in DONE
+        assert(cmd.getStatus() == EventStatus.PROCESSED)
+        assert(scxml4py.helper.formatStatus(executor.getStatus()) == "IDLE")
+        assert(executor.getDeferredEvents().__len__() == 0)
+        assert(listener.mEvents == [("start", EventStatus.PROCESSED), ("cmd", EventStatus.DEFERRED),
+                                    ("reset", EventStatus.DEFERRED), ("arrived", EventStatus.PROCESSED),
+                                    ("cmd", EventStatus.PROCESSED), ("reset", EventStatus.PROCESSED)])
+        executor.stop()
+
+    def testBacklog(self):
+        """
+        The deferred events not accepted by a new configuration are not examined.
+        """
+        executor, listener = self.createExecutor()
+        executor.setDeferredEvents(DeferredEventQueue(100, OverflowPolicy.DROP_OLDEST))
+        executor.start()
+        executor.processEvent(Event("start"))
+        statuses = executor.processEventBatch([Event("cmd") for n in range(150)])
+        assert(statuses.__len__() == 150)
+        deferred = executor.getDeferredEvents()
+        assert(deferred.__len__() == 100)
+        assert(deferred.getDroppedCount() == 50)
+        index = self.sm.getIndex()
+        assert(index.getAcceptedEvents(executor.getStatus().getKey()) == {"arrived"})
+        listener.mEvents.clear()
+        executor.processEvent(Event("arrived"))
+        # one cmd is processed in READY, the other ones are deferred again in DONE
+        assert(scxml4py.helper.formatStatus(executor.getStatus()) == "DONE")
+        assert(listener.mEvents.count(("cmd", EventStatus.PROCESSED)) == 1)
+        # the status of the other ones has not changed
+        assert(("cmd", EventStatus.DEFERRED) not in listener.mEvents)
+        assert(deferred.getReleasedCount() == 100)
+        assert(deferred.__len__() == 99)
+        # DONE -reset-> IDLE: no deferred event is accepted
+        listener.mEvents.clear()
+        executor.processEvent(Event("reset"))
+        assert(listener.mEvents == [("reset", EventStatus.PROCESSED)])
+        assert(deferred.getReleasedCount() == 100)
+        # the queue is emptied when the executor is stopped
+        executor.stop()
+        assert(deferred.__len__() == 0)
+
+    def testReject(self):
+        executor, listener = self.createExecutor()
+        executor.setDeferredEvents(DeferredEventQueue(1, OverflowPolicy.REJECT))
+        executor.start()
+        executor.processEvent(Event("cmd"))
+        e = Event("cmd")
+        executor.processEvent(e)
+        assert(e.getStatus() == EventStatus.REJECTED)
+        assert(executor.getDeferredEvents().getRejectedCount() == 1)
+        executor.stop()
+
+    def testAsyncExecutor(self):
+        async def scenario():
+            executor, listener = self.createExecutor(AsyncExecutor, QueueType.ASYNC)
+            await executor.start()
+            await executor.processEvent(Event("start"))
+            cmd = Event("cmd")
+            await executor.processEvent(cmd)
+            assert(cmd.getStatus() == EventStatus.DEFERRED)
+            await executor.processEvent(Event("arrived"))
+            assert(cmd.getStatus() == EventStatus.PROCESSED)
+            assert(scxml4py.helper.formatStatus(executor.getStatus()) == "DONE")
+            await executor.stop()
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
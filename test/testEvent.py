@@ -5,7 +5,8 @@
 '''
 
 import unittest
-from scxml4py.event import Event
+from scxml4py.event import Event, EventType, getSignal
+from scxml4py.transition import Transition
 
 
 class CustomEvent1(Event):
@@ -42,6 +43,28 @@ class TestEvent(unittest.TestCase):
             clonedEvent = e.clone(i)
             assert(clonedEvent.getId() == "myEvent"+str(i))
 
+    def testEventSlots(self):
+        e = Event("e1")
+        assert(hasattr(e, "__dict__") == False)
+        # the ids are interned
+        name = "".join(["e", "1"])
+        assert(Event(name).getId() is e.getId())
+        assert(e.getData() == None)
+        data = bytearray(16)
+        e.setData(data)
+        assert(e.getData() is data)
+        assert(Event("e2", theData = data).getData() is data)
+
+    def testSignal(self):
+        s = getSignal("s1")
+        assert(getSignal("".join(["s", "1"])) is s)
+        assert(s.mType == EventType.SIGNAL_EVENT)
+        assert(s.getData() == None)
+        t = Transition()
+        t.setEvent(Event("s1"))
+        assert(t.isEnabled(None, s))
+        assert(t.isEnabled(None, getSignal("s2")) == False)
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
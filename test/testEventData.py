@@ -0,0 +1,174 @@
+'''
+    testEventData module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import asyncio
+import tracemalloc
+import scxml4py.helper
+import scxml4py.trace
+from scxml4py.action import Action
+from scxml4py.asyncExecutor import AsyncExecutor
+from scxml4py.context import Context, EVENT_ELEMENT
+from scxml4py.event import Event, EventStatus, EventType, getSignal
+from scxml4py.eventQueue import QueueType
+from scxml4py.executor import Executor, EventHandlingPolicy
+from scxml4py.listeners import EventListener
+from scxml4py.reader import Reader
+from scxmlApp.application import Application
+
+
+MODEL_FRAMES = """<?xml version="1.0" encoding="us-ascii"?>
+<scxml xmlns="http://www.w3.org/2005/07/scxml" xmlns:customActionDomain="http://my.custom-actions.domain/CUSTOM"
+       version="1.0" initial="IDLE">
+  <state id="IDLE">
+    <transition event="frame" cond="GuardFrame" target="BUSY">
+      <customActionDomain:ActionFrame name="ActionFrame"/>
+    </transition>
+  </state>
+  <state id="BUSY">
+    <transition event="frame" target="IDLE">
+      <customActionDomain:ActionFrame name="ActionFrame"/>
+    </transition>
+  </state>
+</scxml>
+"""
+
+# a copy of a frame would show in the peak of the traced allocations
+FRAME_SIZE = 4 * 1024 * 1024
+
+
+class GuardFrame(Action):
+    def __init__(self, theData = None):
+        Action.__init__(self, "GuardFrame", None, theData)
+        self.mFrames = list()
+    def evaluate(self, theCtx):
+        frame = theCtx.getElement(EVENT_ELEMENT).data
+        self.mFrames.append(frame)
+        return frame is not None and frame[0] == 1
+
+
+class ActionFrame(Action):
+    def __init__(self, theData = None):
+        Action.__init__(self, "ActionFrame", None, theData)
+        self.mFrames = list()
+    def execute(self, theCtx):
+        self.mFrames.append(theCtx.getElement(EVENT_ELEMENT).data)
+        assert(theCtx.getEventData() is theCtx.getLastEvent().getData())
+
+
+class FrameListener(EventListener):
+    def __init__(self):
+        self.mFrames = list()
+    def notify(self, event):
+        self.mFrames.append(event.data)
+
+
+class TestEventData(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self.mIsTraceEnabled = scxml4py.trace.isEnabled()
+        scxml4py.trace.setEnabled(False)
+        buffer = bytearray(FRAME_SIZE)
+        buffer[0] = 1
+        self.mFrame = memoryview(buffer)
+
+    def tearDown(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        scxml4py.trace.setEnabled(self.mIsTraceEnabled)
+        unittest.TestCase.tearDown(self)
+
+    def startTracing(self):
+        # the frames are allocated before: only the copies are traced
+        tracemalloc.start()
+
+    def assertNoCopy(self):
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert(peak < FRAME_SIZE // 4)
+
+    def createExecutor(self, theExecutorType = Executor, theQueueType = QueueType.SIMPLE):
+        self.mGuard = GuardFrame()
+        self.mAction = ActionFrame()
+        sm = Reader().readString("frames", MODEL_FRAMES, [self.mGuard, self.mAction], None)
+        self.mListener = FrameListener()
+        executor = theExecutorType(sm, Context(), None, None, theQueueType)
+        executor.addEventListener(self.mListener)
+        return executor
+
+    def testContext(self):
+        ctx = Context()
+        assert(ctx.getEventData() == None)
+        e = Event("frame", theData = self.mFrame)
+        ctx.setLastEvent(e)
+        assert(ctx.getElement(EVENT_ELEMENT) is e)
+        assert(ctx.getElement(EVENT_ELEMENT).name == "frame")
+        assert(ctx.getElement(EVENT_ELEMENT).data is self.mFrame)
+        assert(ctx.getEventData() is self.mFrame)
+
+    def testExecutor(self):
+        executor = self.createExecutor()
+        frame = memoryview(bytearray(FRAME_SIZE))
+        executor.start()
+        self.startTracing()
+        # through the external queue
+        executor.postEvent(Event("frame", theData = self.mFrame))
+        executor.processEvents()
+        assert(scxml4py.helper.formatStatus(executor.getStatus()) == "BUSY")
+        # from an action, through the internal queue
+        executor.mInternalEvents.put(Event("frame", theData = frame))
+        executor.processInternalEvents()
+        assert(scxml4py.helper.formatStatus(executor.getStatus()) == "IDLE")
+        # the guard does not accept the frame: deferred, then released
+        executor.setEventHandlingPolicy(EventHandlingPolicy.DEFFERRED)
+        e = Event("frame", theData = frame)
+        executor.processEvent(e)
+        assert(e.getStatus() == EventStatus.DEFERRED)
+        assert(list(executor.getDeferredEvents())[0].getData() is frame)
+        executor.stop()
+        self.assertNoCopy()
+        # the deferred frame may be examined again when it is released
+        assert(self.mGuard.mFrames[0] is self.mFrame)
+        assert(all(f is frame for f in self.mGuard.mFrames[1:]))
+        assert(self.mAction.mFrames[0] is self.mFrame and self.mAction.mFrames[1] is frame)
+        assert(self.mListener.mFrames[0] is self.mFrame)
+        assert(self.mListener.mFrames[1] is frame)
+
+    def testAsyncExecutor(self):
+        async def scenario():
+            executor = self.createExecutor(AsyncExecutor, QueueType.ASYNC)
+            await executor.start()
+            await executor.processEvent(Event("frame", theData = self.mFrame))
+            assert(scxml4py.helper.formatStatus(executor.getStatus()) == "BUSY")
+            await executor.stop()
+        asyncio.run(scenario())
+        assert(self.mAction.mFrames == [self.mFrame])
+        assert(self.mAction.mFrames[0] is self.mFrame)
+        assert(self.mListener.mFrames[0] is self.mFrame)
+
+    def testApplication(self):
+        app = Application(MODEL_FRAMES, [GuardFrame, ActionFrame], [], None)
+        action = app.application.mActionMgr.getAction("ActionFrame")
+        app.start()
+        self.startTracing()
+        app.send_signal("frame", data = self.mFrame)
+        assert(app.get_current_status() == "BUSY")
+        # the events are processed in order before _EXIT
+        app.send_signal("frame", rtc_block = False)
+        app.terminate()
+        self.assertNoCopy()
+        assert(action.mFrames[0] is self.mFrame)
+        assert(action.mFrames[1] == None)
+        assert(app.application.mEventListener.mEvent.getId() == "_EXIT")
+        # the posted events are not the shared signals
+        assert(app.application.mEventListener.mEvent is not getSignal("_EXIT"))
+        assert(app.application.mEventListener.mEvent.mType == EventType.CHANGE_EVENT)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,117 @@
+'''
+    testEventDescriptor module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import scxml4py.trace
+from scxml4py.codegen import GeneratedExecutor
+from scxml4py.context import Context
+from scxml4py.event import Event
+from scxml4py.eventDescriptor import DescriptorTrie, parseDescriptors, isDescriptorMatching, isEventMatching
+from scxml4py.executor import Executor
+from scxml4py.reader import Reader
+from scxml4py.transition import Transition
+
+
+MODEL_DESCRIPTORS = """<?xml version="1.0" encoding="us-ascii"?>
+<scxml xmlns="http://www.w3.org/2005/07/scxml" version="1.0" initial="S1">
+  <state id="S1">
+    <initial>
+      <transition target="S11"/>
+    </initial>
+    <state id="S11">
+      <transition event="device.motor.stop" target="S12"/>
+      <transition event="device.*" target="S13"/>
+    </state>
+    <state id="S12">
+      <transition event="go resume" target="S11"/>
+    </state>
+    <state id="S13">
+      <transition event="device.motor" target="S12"/>
+    </state>
+    <transition event="error" target="S2"/>
+  </state>
+  <state id="S2">
+    <transition event="*" target="S1"/>
+  </state>
+</scxml>
+"""
+
+
+class TestEventDescriptor(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self.mIsTraceEnabled = scxml4py.trace.isEnabled()
+        scxml4py.trace.setEnabled(False)
+
+    def tearDown(self):
+        scxml4py.trace.setEnabled(self.mIsTraceEnabled)
+        unittest.TestCase.tearDown(self)
+
+    def testParse(self):
+        assert(parseDescriptors("error.* done.state.S1") == ["error", "done.state.S1"])
+        assert(parseDescriptors("*") == [""])
+        assert(parseDescriptors("a. a") == ["a"])
+        assert(parseDescriptors(None) == [])
+
+    def testMatch(self):
+        assert(isDescriptorMatching("error", "error"))
+        assert(isDescriptorMatching("error", "error.send.failed"))
+        assert(isDescriptorMatching("error", "errors") == False)
+        assert(isDescriptorMatching("error.send", "error") == False)
+        assert(isDescriptorMatching("", "anything"))
+        assert(isEventMatching("a b.c", "b.c.d"))
+        assert(isEventMatching("a b.c", "b") == False)
+        assert(isEventMatching("error.*", "error.execution"))
+        t = Transition()
+        t.setEvent(Event("error.*"))
+        assert(t.isEnabled(None, Event("error.communication")))
+        assert(t.isEnabled(None, Event("errors")) == False)
+
+    def testTrie(self):
+        trie = DescriptorTrie()
+        for d in ["device", "device.motor", "device.motor.stop", "error", ""]:
+            assert(trie.add(d))
+        assert(trie.add("device") == False)
+        assert(trie.__len__() == 5)
+        assert(trie.match("device.motor.stop") == ("", "device", "device.motor", "device.motor.stop"))
+        assert(trie.match("device.camera") == ("", "device"))
+        assert(trie.match("motor") == ("",))
+
+    def testIndex(self):
+        sm = Reader().readString("descriptors", MODEL_DESCRIPTORS, None, None)
+        index = sm.getIndex()
+        s11 = sm.findStateInMap("S1.S11")
+        s1 = sm.findStateInMap("S1")
+        # exit order: S11 first (document order), then S1
+        candidates = index.getTransitions(s11, "device.motor.stop")
+        assert(candidates == (s11.getTransitions()[0], s11.getTransitions()[1]))
+        assert(index.getTransitions(s11, "device.motor.stop") is candidates)
+        candidates = index.getTransitions(s11, "error.io")
+        assert(candidates == (s1.getTransitions()[0],))
+        assert(index.getTransitions(s11, "devices") == ())
+        assert(index.getDescriptors("device.camera.on") == ("", "device"))
+        accepted = index.getAcceptedEvents(1 << s11.getDocumentOrder())
+        assert(index.isEventAccepted(accepted, "device.camera"))
+        assert(index.isEventAccepted(accepted, "go") == False)
+
+    def testExecutor(self):
+        for executorType in [Executor, GeneratedExecutor]:
+            sm = Reader().readString("descriptors", MODEL_DESCRIPTORS, None, None)
+            ex = executorType(sm, Context())
+            ex.start()
+            statuses = list()
+            for e in ["device.motor.stop", "resume", "device.camera.on", "device.motor.stop",
+                      "go", "error.io", "anything", "device.motor"]:
+                ex.processEvent(Event(e))
+                statuses.append([s.getId() for s in ex.getStatus().getAtomicStates()])
+            ex.stop()
+            assert(statuses == [["S12"], ["S11"], ["S13"], ["S12"], ["S11"], ["S2"], ["S11"], ["S13"]])
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
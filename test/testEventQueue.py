@@ -0,0 +1,87 @@
+'''
+    testEventQueue module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import asyncio
+import queue
+from scxml4py.action import Action
+from scxml4py.context import Context
+from scxml4py.event import Event
+from scxml4py.eventQueue import QueueType, SimpleQueue, AsyncQueue, createQueue, clearQueue
+from scxml4py.executor import Executor
+from scxml4py.state import StateAtomic
+from scxml4py.stateMachine import StateMachine
+
+
+class TriggerEventAction(Action):
+    def __init__(self, theId, theEventQueue, theEvent):
+        Action.__init__(self, theId, theEventQueue)
+        self.mEvent = theEvent
+    def execute(self, theCtx):
+        self.sendInternalEvent(self.mEvent)
+
+
+class TestEventQueue(unittest.TestCase):
+
+    def checkQueue(self, q):
+        assert(q.empty() == True)
+        q.put(Event("e1"), True, 2)
+        q.put_nowait(Event("e2"))
+        assert(q.qsize() == 2)
+        assert(q.get_nowait().getId() == "e1")
+        assert(q.empty() == False)
+        q.put(Event("e3"))
+        clearQueue(q)
+        assert(q.empty() == True)
+        with self.assertRaises((queue.Empty, asyncio.QueueEmpty)):
+            q.get_nowait()
+
+    def testBackends(self):
+        assert(type(createQueue(QueueType.THREADED)) == queue.Queue)
+        assert(type(createQueue(QueueType.SIMPLE)) == SimpleQueue)
+        assert(type(createQueue(QueueType.ASYNC)) == AsyncQueue)
+        self.checkQueue(queue.Queue())
+        self.checkQueue(SimpleQueue())
+        self.checkQueue(AsyncQueue())
+
+    def testAsyncQueue(self):
+        async def run():
+            q = AsyncQueue()
+            await q.putAsync(Event("e1"))
+            return await q.getAsync()
+        assert(asyncio.run(run()).getId() == "e1")
+
+    def testExecutor(self):
+        """
+        S1 -e1-> S2 (entry: post e2) -e2-> S1 with each backend.
+        """
+        for queueType in QueueType:
+            s1 = StateAtomic("S1")
+            s2 = StateAtomic("S2")
+            s3 = StateAtomic("S3")
+            sm = StateMachine("StateMachine")
+            sm.addSubstate(s1)
+            sm.addSubstate(s2)
+            sm.addSubstate(s3)
+            s1.addTransition(s2, Event("e1"), None, None)
+            s2.addTransition(s1, Event("e2"), None, None)
+            s1.addTransition(s3, Event("e3"), None, None)
+            sm.setInitialState(s1, None)
+            executor = Executor(sm, Context(), theQueueType = queueType)
+            s2.addEntryAction(TriggerEventAction("a1", executor.mInternalEvents, Event("e2")))
+            executor.start()
+            executor.processEvent(Event("e1"))
+            assert(s1 in executor.getStatus())
+            executor.postEvent(Event("e3"))
+            executor.mInternalEvents.put(Event("e2"), True, 2)
+            executor.stop()
+            assert(executor.mExternalEvents.empty() == True)
+            assert(executor.mInternalEvents.empty() == True)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -29,6 +29,17 @@ class CustomAction2(Action):
         # do something useful
         logging.getLogger('scxml4py').info("Execute action: " + self.getId())    
 
+class PureGuard(Action):
+    def __init__(self, theId):
+        Action.__init__(self, theId)
+        self.mCounter = 0
+    def evaluate(self, theContext):
+        self.mCounter += 1
+        return True
+    def isPure(self):
+        return True
+
+
 class TestExecutableContent(unittest.TestCase):
 
     def testEvaluateTwoAction(self):
@@ -49,6 +60,31 @@ class TestExecutableContent(unittest.TestCase):
         execContent.addAction(a2)
         execContent.execute(ctx);
         
+    def testGuardCache(self):
+        """
+        Pure guards are memoized until an action is executed.
+        """
+        ctx = Context()
+        guard = PureGuard("pureGuard")
+        guards = ExecutableContent()
+        guards.addAction(guard)
+        guards.addAction(CustomAction1("CustomAction1"))
+        actions = ExecutableContent()
+        actions.addAction(CustomAction1("CustomAction1"))
+        assert(guards.evaluate(ctx) == True)
+        assert(guards.evaluate(ctx) == True)
+        assert(guard.mCounter == 2)
+        ctx.setGuardCacheEnabled(True)
+        assert(guards.evaluate(ctx) == True)
+        assert(guards.evaluate(ctx) == True)
+        assert(guard.mCounter == 3)
+        actions.execute(ctx)
+        assert(guards.evaluate(ctx) == True)
+        assert(guard.mCounter == 4)
+        ExecutableContent().execute(ctx)
+        assert(guards.evaluate(ctx) == True)
+        assert(guard.mCounter == 4)
+
     def testCompare(self):
         a1 = Action("a1")
         a2 = Action("a2")
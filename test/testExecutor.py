@@ -11,10 +11,12 @@ import logging
 import time
 import scxml4py.helper
 from scxml4py.context import Context
-from scxml4py.event import Event
+from scxml4py.event import Event, EventStatus
+from scxml4py.listeners import EventListener, StatusListener
 from scxml4py.action import Action
 from scxml4py.state import StateAtomic
 from scxml4py.state import StateCompound
+from scxml4py.state import StateParallel
 from scxml4py.stateMachine import StateMachine
 from scxml4py.executor import Executor
 
@@ -25,7 +27,7 @@ class CounterAction(Action):
         self.mLastExecutionTime = 0
     def execute(self, theCtx):
         self.mCounter += 1
-        self.mLastExecutionTime = time.clock()
+        self.mLastExecutionTime = time.perf_counter()
         #print("executing action: " + self.getId())
     def getCounter(self):
         return self.mCounter
@@ -342,7 +344,337 @@ class TestExecutor(unittest.TestCase):
         print(scxml4py.helper.formatStatus(executor.getStatus()))
         assert(executor.getStatus().__len__() == 1)
         assert(s1 in executor.getStatus())
-        
+
+    def testProcessEventBatch(self):
+        """
+        Same model as testExecutorSM4: e1 leads to S2 which posts the
+        internal event e2 leading back to S1 (run-to-completion).
+        """
+        internalEventQueue = Queue()
+        a1 = TriggerEventAction("a1", internalEventQueue, Event("e2"))
+        s1 = StateAtomic("S1")
+        s2 = StateAtomic("S2")
+        s3 = StateAtomic("S3")
+        s2.addEntryAction(a1)
+        sm = StateMachine("StateMachineBatch")
+        sm.addSubstate(s1)
+        sm.addSubstate(s2)
+        sm.addSubstate(s3)
+        s1.addTransition(s2, Event("e1"), None, None)
+        s2.addTransition(s1, Event("e2"), None, None)
+        s1.addTransition(s3, Event("e3"), None, None)
+        sm.setInitialState(s1, None)
+        executor = Executor(sm, Context(), None, internalEventQueue)
+        assert(executor.processEventBatch([Event("e1")]).__len__() == 0)
+        statusListener = RecordStatusListener()
+        eventListener = RecordEventListener()
+        executor.addStatusListener(statusListener)
+        executor.addEventListener(eventListener)
+        executor.start()
+        statusListener.mStatus.clear()
+        events = (Event(e) for e in ["e1", "e2", "e1"])
+        statuses = executor.processEventBatch(events)
+        assert(list(statuses) == [EventStatus.PROCESSED.value, EventStatus.IGNORED.value, EventStatus.PROCESSED.value])
+        assert(s1 in executor.getStatus())
+        assert(eventListener.mEvents == ["e1", "e2", "e1"])
+        # S2 and S1 entered for each e1
+        assert(statusListener.mStatus.__len__() == 4)
+
+        statusListener.mStatus.clear()
+        eventListener.mEvents.clear()
+        statuses = executor.processEventBatch([Event("e1"), Event("e1"), Event("e3")], True)
+        assert(list(statuses) == [EventStatus.PROCESSED.value] * 3)
+        assert(s3 in executor.getStatus())
+        assert(eventListener.mEvents == ["e1", "e1", "e3"])
+        assert(statusListener.mStatus == ["S3"])
+        assert(executor.mEventListeners == [eventListener])
+        assert(executor.mStatusListeners == [statusListener])
+        executor.stop()
+
+    def testGuardCache(self):
+        """
+        The same pure guard in two orthogonal regions is evaluated once.
+        P
+          A: A1 -go[hw]-> A2
+          B: B1 -go[hw]-> B2
+        """
+        guard = PureGuard("hw")
+        p = StateParallel("P")
+        regions = list()
+        for r in ["A", "B"]:
+            region = StateCompound(r)
+            s1 = StateAtomic(r + "1")
+            s2 = StateAtomic(r + "2")
+            region.addSubstate(s1)
+            region.addSubstate(s2)
+            region.setInitialState(s1, None)
+            s1.addTransition(s2, Event("go"), None, guard)
+            p.addSubstate(region)
+            regions.append(s2)
+        sm = StateMachine("StateMachineGuards")
+        sm.addSubstate(p)
+        sm.setInitialState(p, None)
+        ctx = Context()
+        ctx.setGuardCacheEnabled(True)
+        executor = Executor(sm, ctx)
+        executor.start()
+        executor.processEvent(Event("go"))
+        assert(regions[0] in executor.getStatus())
+        assert(regions[1] in executor.getStatus())
+        assert(guard.mCounter == 1)
+        executor.stop()
+
+    def testEventlessTransitions(self):
+        """
+        P
+          A: A1 -[g1]-> A2, A1 -[g1]-> A3 (event-less)
+          B: B1 -e-> B2 -> B3 (event-less), B3 -e-> B1
+        Only the first enabled event-less transition of a state is taken
+        and the pure guard of A1 is evaluated again only when the context
+        changes, not after each microstep.
+        """
+        g1 = FlagGuard("g1")
+        p = StateParallel("P")
+        a = StateCompound("A")
+        b = StateCompound("B")
+        a1 = StateAtomic("A1")
+        a2 = StateAtomic("A2")
+        a3 = StateAtomic("A3")
+        b1 = StateAtomic("B1")
+        b2 = StateAtomic("B2")
+        b3 = StateAtomic("B3")
+        for s in [a1, a2, a3]:
+            a.addSubstate(s)
+        for s in [b1, b2, b3]:
+            b.addSubstate(s)
+        a.setInitialState(a1, None)
+        b.setInitialState(b1, None)
+        p.addSubstate(a)
+        p.addSubstate(b)
+        a1.addTransition(a2, None, None, g1)
+        a1.addTransition(a3, None, None, g1)
+        b1.addTransition(b2, Event("e"), None, None)
+        b2.addTransition(b3, None, None, None)
+        b3.addTransition(b1, Event("e"), None, None)
+        sm = StateMachine("StateMachineEventless")
+        sm.addSubstate(p)
+        sm.setInitialState(p, None)
+        index = sm.getIndex()
+        assert(index.getEventlessMask() == (1 << a1.getDocumentOrder()) | (1 << b2.getDocumentOrder()))
+        assert(index.getPureEventlessMask() == 1 << a1.getDocumentOrder())
+        ctx = Context()
+        ctx.setGuardCacheEnabled(True)
+        executor = Executor(sm, ctx)
+        executor.start()
+        # one evaluation for both candidates (memoized)
+        assert(g1.mCounter == 1)
+        executor.processEvent(Event("e"))
+        assert(b3 in executor.getStatus())
+        # evaluated again for the event, not after B2 -> B3
+        assert(g1.mCounter == 2)
+        g1.mValue = True
+        executor.processEvent(Event("e"))
+        assert(a2 in executor.getStatus())
+        assert(a3 not in executor.getStatus())
+        assert(b1 in executor.getStatus())
+        executor.stop()
+        # without the guard cache the pure guard is evaluated after each
+        # microstep: a change which does not go through the context is seen
+        g1.mValue = False
+        g1.mCounter = 0
+        executor = Executor(sm, Context())
+        executor.start()
+        executor.processEvent(Event("e"))
+        assert(b3 in executor.getStatus())
+        # evaluated again after B2 -> B3
+        assert(g1.mCounter == 6)
+        g1.mValue = True
+        executor.processEvent(Event("e"))
+        assert(a2 in executor.getStatus())
+        executor.stop()
+
+    def testDoneEvents(self):
+        """
+        ROOT -done.state.ROOT-> END (final)
+          P -done.state.P-> DONE (final)
+            R1: A1 -go-> F1 (final), R1 -back-> A1
+            R2: A2 -go2-> F2 (final)
+        """
+        root = StateCompound("ROOT")
+        end = StateAtomic("END")
+        end.setIsFinal(True)
+        p = StateParallel("P")
+        done = StateAtomic("DONE")
+        done.setIsFinal(True)
+        r1 = StateCompound("R1")
+        r2 = StateCompound("R2")
+        a1 = StateAtomic("A1")
+        a2 = StateAtomic("A2")
+        f1 = StateAtomic("F1")
+        f2 = StateAtomic("F2")
+        f1.setIsFinal(True)
+        f2.setIsFinal(True)
+        for r, a, f in [(r1, a1, f1), (r2, a2, f2)]:
+            r.addSubstate(a)
+            r.addSubstate(f)
+            r.setInitialState(a, None)
+            p.addSubstate(r)
+        a1.addTransition(f1, Event("go"), None, None)
+        a2.addTransition(f2, Event("go2"), None, None)
+        r1.addTransition(a1, Event("back"), None, None)
+        p.addTransition(done, Event("done.state.P"), None, None)
+        root.addSubstate(p)
+        root.addSubstate(done)
+        root.setInitialState(p, None)
+        root.addTransition(end, Event("done.state.ROOT"), None, None)
+        sm = StateMachine("StateMachineDone")
+        sm.addSubstate(root)
+        sm.addSubstate(end)
+        sm.setInitialState(root, None)
+        internalEvents = RecordQueue()
+        listener = RecordEventListener()
+        executor = Executor(sm, Context(), None, internalEvents)
+        executor.addEventListener(listener)
+        executor.start()
+        executor.processEvent(Event("go"))
+        assert(f1 in executor.getStatus())
+        assert(internalEvents.mIds == ["done.state.R1"])
+        # F1 is exited: P is not completed by F2
+        executor.processEvent(Event("back"))
+        executor.processEvent(Event("go2"))
+        assert(internalEvents.mIds == ["done.state.R1", "done.state.R2"])
+        assert(executor.isFinal() == False)
+        executor.processEvent(Event("go"))
+        assert(internalEvents.mIds == ["done.state.R1", "done.state.R2", "done.state.R1",
+                                       "done.state.P", "done.state.ROOT"])
+        assert(scxml4py.helper.formatStatus(executor.getStatus()) == "END")
+        assert(executor.isFinal())
+        executor.stop()
+        assert(listener.mEvents[-1] == "done.invoke.StateMachineDone")
+
+    def testExitEntryOrder(self):
+        """
+        P -leave-> D
+          A, B, C (regions)
+        D -back-> P
+        """
+        ids = list()
+        p = StateParallel("P")
+        d = StateAtomic("D")
+        for s in [p] + [StateAtomic(i) for i in ["A", "B", "C"]]:
+            s.addEntryAction(RecordAction("in_" + s.getId(), ids))
+            s.addExitAction(RecordAction("out_" + s.getId(), ids))
+            if s is not p:
+                p.addSubstate(s)
+        p.addTransition(d, Event("leave"), None, None)
+        d.addTransition(p, Event("back"), None, None)
+        sm = StateMachine("StateMachineOrder")
+        sm.addSubstate(p)
+        sm.addSubstate(d)
+        sm.setInitialState(p, None)
+        executor = Executor(sm, Context())
+        executor.start()
+        assert(ids == ["in_P", "in_A", "in_B", "in_C"])
+        # regions are exited in reverse document order
+        del ids[:]
+        executor.processEvent(Event("leave"))
+        assert(ids == ["out_C", "out_B", "out_A", "out_P"])
+        del ids[:]
+        executor.processEvent(Event("back"))
+        assert(ids == ["in_P", "in_A", "in_B", "in_C"])
+        del ids[:]
+        executor.stop()
+        assert(ids == ["out_C", "out_B", "out_A", "out_P"])
+
+    def testDoneEventsCloneParallel(self):
+        """
+        P -done.state.P-> DONE, R: A -[g]-> F (final) cloned in 64 regions,
+        the regions are completed in the same microstep.
+        """
+        g = FlagGuard("g")
+        p = StateParallel("P")
+        r = StateCompound("R")
+        a = StateAtomic("A")
+        f = StateAtomic("F")
+        f.setIsFinal(True)
+        done = StateAtomic("DONE")
+        r.addSubstate(a)
+        r.addSubstate(f)
+        r.setInitialState(a, None)
+        a.addTransition(f, None, None, g)
+        p.addSubstate(r)
+        p.setInitialState(r, None)
+        p.addTransition(done, Event("done.state.P"), None, None)
+        p.addTransition(None, Event("tick"), None, None)
+        sm = StateMachine("StateMachineDoneClone")
+        for s in [p, r, a, f, done]:
+            s.resolveAbsoluteId()
+            sm.updateStatesMap(s.getAbsoluteId(), s)
+        sm.addSubstate(p)
+        sm.addSubstate(done)
+        sm.setInitialState(p, None)
+        sm.cloneParallel(63, "P", {}, {})
+        assert(sm.getIndex().getRegionCount(p) == 64)
+        internalEvents = RecordQueue()
+        executor = Executor(sm, Context(), None, internalEvents)
+        executor.start()
+        g.mValue = True
+        executor.processEvent(Event("tick"))
+        assert(internalEvents.mIds.__len__() == 65)
+        assert(internalEvents.mIds[0] == "done.state.R")
+        assert(internalEvents.mIds[63] == "done.state.R63")
+        assert(internalEvents.mIds[64] == "done.state.P")
+        assert(scxml4py.helper.formatStatus(executor.getStatus()) == "DONE")
+        executor.stop()
+
+class RecordAction(Action):
+    def __init__(self, theId, theIds):
+        Action.__init__(self, theId)
+        self.mIds = theIds
+    def execute(self, theCtx):
+        self.mIds.append(self.getId())
+
+class RecordQueue(Queue):
+    def __init__(self):
+        Queue.__init__(self)
+        self.mIds = list()
+    def put(self, item, block = True, timeout = None):
+        self.mIds.append(item.getId())
+        Queue.put(self, item, block, timeout)
+
+class FlagGuard(Action):
+    def __init__(self, theId):
+        Action.__init__(self, theId)
+        self.mCounter = 0
+        self.mValue = False
+    def evaluate(self, theCtx):
+        self.mCounter += 1
+        return self.mValue
+    def isPure(self):
+        return True
+
+class PureGuard(Action):
+    def __init__(self, theId):
+        Action.__init__(self, theId)
+        self.mCounter = 0
+    def evaluate(self, theCtx):
+        self.mCounter += 1
+        return True
+    def isPure(self):
+        return True
+
+class RecordStatusListener(StatusListener):
+    def __init__(self):
+        self.mStatus = list()
+    def notify(self, status):
+        self.mStatus.append(scxml4py.helper.formatStatus(status))
+
+class RecordEventListener(EventListener):
+    def __init__(self):
+        self.mEvents = list()
+    def notify(self, event):
+        self.mEvents.append(event.getId())
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
@@ -0,0 +1,292 @@
+'''
+    testModelIndex module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import threading
+from pathlib import Path
+import scxml4py.helper
+from scxml4py.event import Event
+from scxml4py.action import Action
+from scxml4py.exceptions import ScxmlError
+from scxml4py.reader import Reader
+from scxml4py.state import HistoryType, StateAtomic, StateCompound, StateHistory, StateParallel
+from scxml4py.stateMachine import StateMachine
+
+
+class TestModelIndex(unittest.TestCase):
+
+    def setUp(self):
+        """
+        S1
+          S11 -e1-> S12, -e2-> S12
+          S12
+        S1 -e1-> S2, -> S2 (event-less)
+        S2 (not contained in the state machine, only a transition target)
+        """
+        self.s1 = StateCompound("S1")
+        self.s11 = StateAtomic("S11")
+        self.s12 = StateAtomic("S12")
+        self.s2 = StateAtomic("S2")
+        self.s1.addSubstate(self.s11)
+        self.s1.addSubstate(self.s12)
+        self.s1.setInitialState(self.s11, None)
+        self.s11.addTransition(self.s12, Event("e1"), None, None)
+        self.s11.addTransition(self.s12, Event("e2"), None, None)
+        self.s1.addTransition(self.s2, Event("e1"), None, None)
+        self.s1.addTransition(self.s2, None, None, None)
+        self.sm = StateMachine("MyStateMachine")
+        self.sm.addSubstate(self.s1)
+        self.sm.setInitialState(self.s1)
+
+    def testStatesInDocumentOrder(self):
+        index = self.sm.getIndex()
+        assert(index.getStates() == [self.s1, self.s11, self.s12, self.s2])
+
+    def testTransitionsInExitOrder(self):
+        index = self.sm.getIndex()
+        candidates = index.getTransitions(self.s11, "e1")
+        assert(candidates.__len__() == 2)
+        assert(candidates[0] is self.s11.getTransitions()[0])
+        assert(candidates[1] is self.s1.getTransitions()[0])
+        candidates = index.getTransitions(self.s11, "e2")
+        assert(candidates.__len__() == 1)
+        assert(candidates[0] is self.s11.getTransitions()[1])
+        candidates = index.getTransitions(self.s12, None)
+        assert(candidates.__len__() == 1)
+        assert(candidates[0] is self.s1.getTransitions()[1])
+        assert(index.getTransitions(self.s12, "e2").__len__() == 0)
+        assert(index.getTransitions(self.s2, "e1").__len__() == 0)
+
+    def testTreeMetadata(self):
+        self.sm.finalize()
+        assert(self.s1.isFinalized() == True)
+        assert(self.s1.getDocumentOrder() == 0)
+        assert(self.s11.getDocumentOrder() == 1)
+        assert(self.s12.getDocumentOrder() == 2)
+        assert(self.s2.getDocumentOrder() == 3)
+        assert(self.s1.getDepth() == 0)
+        assert(self.s11.getDepth() == 1)
+        assert(self.s11.getAncestors() == (self.s1,))
+        assert(self.s1.getAncestors() == ())
+        assert(self.s11.isDescendantFrom(self.s1) == True)
+        assert(self.s1.isDescendantFrom(self.s11) == False)
+        assert(self.s11.isDescendantFrom(self.s12) == False)
+        assert(self.s11.isDescendantFrom(self.s11) == False)
+        assert(self.s2.isDescendantFrom(self.s1) == False)
+        assert(self.s11.getProperAncestors(None) == [self.s1])
+        assert(self.s11.getProperAncestors(self.s1) == [])
+
+    def testTreeModifiedAfterFinalize(self):
+        index = self.sm.getIndex()
+        s111 = StateAtomic("S111")
+        self.s11.addSubstate(s111)
+        assert(index.isValid() == False)
+        assert(self.s11.isFinalized() == False)
+        # metadata falls back on walking the parent chain
+        assert(s111.getDepth() == 2)
+        assert(s111.isDescendantFrom(self.s1) == True)
+        index = self.sm.getIndex()
+        assert(index.isValid() == True)
+        assert(s111.isFinalized() == True)
+        assert(s111.getDepth() == 2)
+        assert(s111.getDocumentOrder() == 2)
+        assert(s111.isDescendantFrom(self.s1) == True)
+        assert(s111.isDescendantFrom(self.s12) == False)
+
+    def testLeastCommonAncestor(self):
+        """
+        Compare the index LCA with the one computed walking the parent chain.
+        """
+        sm = StateMachine("Deep")
+        root = StateCompound("R")
+        sm.addSubstate(root)
+        other = StateCompound("O")
+        sm.addSubstate(other)
+        other.addSubstate(StateAtomic("O1"))
+        allStates = [root, other] + other.getSubstates()
+        parents = [root]
+        for level in range(4):
+            children = list()
+            for p in parents:
+                for n in range(3):
+                    c = StateCompound(p.getId() + str(n))
+                    p.addSubstate(c)
+                    children.append(c)
+            allStates.extend(children)
+            parents = children
+        index = sm.getIndex()
+        for s1 in allStates:
+            ancestors1 = [s1] + list(s1.getAncestors())
+            for s2 in allStates:
+                expected = None
+                for a in ancestors1:
+                    if a is s2 or s2.isDescendantFrom(a):
+                        expected = a
+                        break
+                assert(index.findLeastCommonAncestor(s1, s2) is expected)
+                assert(scxml4py.helper.findLeastCommonAncestor(s1, s2) is expected)
+
+    def testTransitionDomain(self):
+        t = self.s11.getTransitions()[0]
+        assert(t.getDomain() is self.s1)
+        index = self.sm.getIndex()
+        assert(t.getDomain() is self.s1)
+        assert(t.mDomainIndex is index)
+        t = self.s1.getTransitions()[0]
+        assert(t.getDomain() == None)
+        targetless = StateAtomic("S3")
+        targetless.addTransition(None, Event("e3"), None, None)
+        assert(targetless.getTransitions()[0].getDomain() == None)
+
+    def testInvalidation(self):
+        index = self.sm.getIndex()
+        assert(self.sm.getIndex() is index)
+        s3 = StateAtomic("S3")
+        self.sm.addSubstate(s3)
+        assert(self.sm.getIndex() is not index)
+        assert(s3 in self.sm.getIndex().getStates())
+        # the states which are not part of the index are rejected,
+        # as by Configuration.add
+        index = self.sm.getIndex()
+        s4 = StateAtomic("S4")
+        with self.assertRaises(ScxmlError):
+            index.getTransitions(s4, "e1")
+        with self.assertRaises(ScxmlError):
+            index.getRegionCount(s4)
+        t = self.s11.getTransitions()[0]
+        t.getTargets()[0] = s4
+        with self.assertRaises(ScxmlError):
+            index.getPlan(t)
+
+    def testCloneParallel(self):
+        sm = StateMachine("MyStateMachine")
+        p = StateParallel("P")
+        a = StateCompound("A")
+        b = StateAtomic("B")
+        c = StateAtomic("C")
+        a.addSubstate(b)
+        a.addSubstate(c)
+        a.setInitialState(b, None)
+        b.addTransition(c, Event("go"), Action("myAction"), None)
+        p.addSubstate(a)
+        for s in [p, a, b, c]:
+            s.resolveAbsoluteId()
+            sm.updateStatesMap(s.getAbsoluteId(), s)
+        sm.addParallel(p)
+        index = sm.getIndex()
+        assert(index.getStates().__len__() == 4)
+        sm.cloneParallel(2, "P", {}, {})
+        assert(sm.getIndex() is not index)
+        index = sm.getIndex()
+        assert(index.getStates().__len__() == 10)
+        assert(index.getRegionCount(p) == 3)
+        assert(index.getDoneEventId(p) == "done.state.P")
+        assert(index.getDoneEventId(p) is index.getDoneEventId(p))
+        b1 = sm.findStateInMap("P.A1.B1")
+        candidates = index.getTransitions(b1, "go1")
+        assert(candidates.__len__() == 1)
+        assert(candidates[0].getTargets()[0] is sm.findStateInMap("P.A1.C1"))
+        assert(index.getTransitions(b1, "go").__len__() == 0)
+        # the plans are computed by the new index
+        plan = index.getPlan(candidates[0])
+        assert(plan.mExitMask == index.getDescendantMask(sm.findStateInMap("P.A1")))
+        assert(plan.mSortedStatesToEnter == (sm.findStateInMap("P.A1.C1"),))
+
+    def testPlans(self):
+        index = self.sm.getIndex()
+        assert(index.getDescendantRange(self.s1) == (1, 3))
+        assert(index.getDescendantMask(self.s1) == 0b0110)
+        assert(index.getDescendantMask(self.s11) == 0)
+        assert(index.getDescendantMask(None) == 0b1111)
+        assert(index.getChildMask(self.s1) == 0b0110)
+        # S11 -e1-> S12: exits the active children of S1, enters S12
+        t = self.s11.getTransitions()[0]
+        plan = index.getPlan(t)
+        assert(index.getPlan(t) is plan)
+        assert(plan.isStatic() == True)
+        assert(plan.mExitMask == 0b0110)
+        assert(plan.mSource == None)
+        assert(plan.mSortedStatesToEnter == (self.s12,))
+        # S1 -e1-> S2: exits everything, enters S2
+        plan = index.getPlan(self.s1.getTransitions()[0])
+        assert(plan.mExitMask == 0b1111)
+        assert(plan.mSortedStatesToEnter == (self.s2,))
+        # initial transition: S1 entered by default
+        plan = index.getPlan(self.sm.getInitialTrans()[0])
+        assert(plan.mSortedStatesToEnter == (self.s1, self.s11))
+        assert(plan.mStatesForDefaultEntry == (self.s1,))
+        # self transition on S11
+        self.s11.addTransition(self.s11, Event("e3"), None, None)
+        index = self.sm.getIndex()
+        plan = index.getPlan(self.s11.getTransitions()[2])
+        assert(plan.mExitMask == 0)
+        assert(plan.mSource is self.s11)
+        assert(self.s11 in plan.mSortedStatesToEnter)
+
+    def testEventlessMask(self):
+        index = self.sm.getIndex()
+        # the event-less transition of S1 is a candidate of S11 and S12
+        assert(index.getEventlessMask() == 0b0110)
+        assert(index.getPureEventlessMask() == 0)
+        self.s1.setTransitions([self.s1.getTransitions()[0]])
+        assert(self.sm.getIndex().getEventlessMask() == 0)
+
+    def testPlanWithHistory(self):
+        h = StateHistory("H", HistoryType.SHALLOW)
+        self.s1.setHistory(h)
+        h.setParent(self.s1)
+        h.addTransition(self.s11, None, None, None)
+        self.s2.addTransition(h, Event("back"), None, None)
+        index = self.sm.getIndex()
+        plan = index.getPlan(self.s2.getTransitions()[0])
+        # the entry depends on the history values
+        assert(plan.isStatic() == False)
+        assert(plan.mStatesToEnter == None)
+        assert(plan.mExitMask == 0b1111)
+
+    def testPlanWithIndexedHistory(self):
+        """
+        The history states read from SCXML are substates, part of the index.
+        """
+        sm = Reader().read((Path(__file__).parent / "models" / "scxmlModelHistory.xml").__str__(), None, None)
+        index = sm.getIndex()
+        h = sm.findStateInMap("PLAYING.HISTORY")
+        playing = sm.findStateInMap("PLAYING")
+        assert(h.mModelIndex is index)
+        assert(h.getDocumentOrder() == playing.getDocumentOrder() + 4)
+        t = sm.findStateInMap("PAUSE").getTransitions()[0]
+        plan = index.getPlan(t)
+        assert(plan.mStatesToEnter == None)
+        assert(plan.mExitMask == index.getDescendantMask(t.getDomain()))
+
+    def testFrozenCaches(self):
+        index = self.sm.getIndex()
+        self.sm.freeze()
+        # the plans and the done event ids are not added at runtime
+        for s in index.getStates():
+            for t in s.getTransitions() + s.getInitialTrans():
+                assert(t in index.mPlans)
+        assert(self.s1 in index.mDoneEventIds)
+        plans = dict(index.mPlans)
+        # the runtime caches are filled concurrently
+        results = list()
+        def lookup():
+            for n in range(300):
+                results.append(index.getTransitions(self.s11, "e" + str(n % 3)))
+        threads = [threading.Thread(target=lookup) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert(results.__len__() == 1200)
+        e1 = (self.s11.getTransitions()[0], self.s1.getTransitions()[0])
+        assert(results.count(e1) == 400)
+        assert(index.mPlans == plans)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
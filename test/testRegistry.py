@@ -0,0 +1,93 @@
+'''
+    testRegistry module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+from pathlib import Path
+import scxml4py.helper
+from scxml4py.action import Action
+from scxml4py.activity import ThreadedActivity
+from scxml4py.exceptions import ScxmlError, ScxmlSyntaxError
+from scxml4py.reader import Reader
+from scxml4py.registry import Registry
+from scxml4py.streamReader import StreamReader
+from scxmlApp.actionmgr import ActionMgr
+from scxmlApp.application import _ActionStatus
+
+
+class GuardTrue(Action):
+    def __init__(self, theId):
+        Action.__init__(self, theId)
+    def evaluate(self, theCtx):
+        return True
+
+
+class UserActionStatus(Action):
+    def __init__(self, theData):
+        Action.__init__(self, "ActionStatusListener", None, theData)
+        self.mStatuses = list()
+    def execute(self, status):
+        self.mStatuses.append(status)
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self.mModelsPath = Path(__file__).parent / "models"
+
+    def testRegistry(self):
+        a1 = Action("a1")
+        a2 = Action("a2")
+        r = Registry([a1, a2])
+        assert(r.__len__() == 2)
+        assert(r.get("a1") is a1)
+        assert(r.get("a3") == None)
+        assert("a2" in r)
+        assert(list(r) == [a1, a2])
+        assert(r.getIds() == ["a1", "a2"])
+        with self.assertRaises(ScxmlError):
+            r.add(Action("a1"))
+        assert(r.remove("a1") is a1)
+        assert(r.get("a1") == None)
+        assert(Registry.create(r) is r)
+        assert(Registry.create(None).__len__() == 0)
+        assert(scxml4py.helper.findActionInList("a2", r) is a2)
+        assert(scxml4py.helper.findActivityInList("a1", r) == None)
+
+    def testReader(self):
+        actions = Registry([Action("logEntry"), Action("logExit"), Action("logTrans"), GuardTrue("logGuard")])
+        activities = Registry([ThreadedActivity("activityTest")])
+        fileName = (self.mModelsPath / "scxmlModel1.xml").__str__()
+        for reader in [Reader(), StreamReader()]:
+            sm = reader.read(fileName, actions, activities)
+            for s in sm.getIndex().getStates():
+                for a in s.getEntryActions().getActions():
+                    assert(actions.get(a.getId()) is a)
+        # duplicate ids in a list are detected
+        with self.assertRaises(ScxmlError):
+            Reader().read(fileName, list(actions) + [Action("logEntry")], activities)
+        with self.assertRaises(ScxmlSyntaxError):
+            Reader().read(fileName, Registry(), activities)
+
+    def testActionMgr(self):
+        mgr = ActionMgr()
+        mgr.createActions(None, [UserActionStatus])
+        assert(type(mgr.getActions()) == Registry)
+        assert(mgr.getAction("ActionStatusListener") != None)
+        assert(mgr.getAction("unknown") == None)
+        with self.assertRaises(ScxmlError):
+            mgr.createActions(None, [UserActionStatus, UserActionStatus])
+        # the user hook is resolved when the listener is created
+        listener = _ActionStatus(None, mgr)
+        userAction = mgr.getAction("ActionStatusListener")
+        mgr.getActions().remove("ActionStatusListener")
+        listener.notify(set())
+        assert(userAction.mStatuses.__len__() == 1)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
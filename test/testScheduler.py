@@ -0,0 +1,109 @@
+'''
+    testScheduler module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import threading
+from scxml4py.action import Action
+from scxml4py.context import Context
+from scxml4py.event import Event
+from scxml4py.eventQueue import QueueType
+from scxml4py.exceptions import ScxmlError
+from scxml4py.executor import Executor
+from scxml4py.scheduler import Scheduler
+from scxml4py.state import StateAtomic
+from scxml4py.stateMachine import StateMachine
+
+
+class RecordAction(Action):
+    """
+    Record the events processed by a session and check that
+    they are not processed concurrently.
+    """
+    def __init__(self, theId, theRecord):
+        Action.__init__(self, theId)
+        self.mRecord = theRecord
+        self.mLock = threading.Lock()
+    def execute(self, theCtx):
+        assert(self.mLock.acquire(False) == True)
+        self.mRecord.append(theCtx.getLastEvent().getId())
+        self.mLock.release()
+
+class FailingAction(Action):
+    def execute(self, theCtx):
+        raise RuntimeError("failure")
+
+
+class TestScheduler(unittest.TestCase):
+
+    def createExecutor(self, theSessionId, theRecord):
+        """
+        S1 -ping/record-> S2 -pong/record-> S1
+        S1 -fail/raise-> S1
+        """
+        s1 = StateAtomic("S1")
+        s2 = StateAtomic("S2")
+        sm = StateMachine("SchedulerStateMachine")
+        sm.addSubstate(s1)
+        sm.addSubstate(s2)
+        sm.setInitialState(s1, None)
+        a = RecordAction("record", theRecord)
+        s1.addTransition(s2, Event("ping"), a, None)
+        s2.addTransition(s1, Event("pong"), a, None)
+        s1.addTransition(None, Event("fail"), FailingAction("fail"), None)
+        ctx = Context()
+        ctx.setSessionId(theSessionId)
+        return Executor(sm, ctx, theQueueType = QueueType.SIMPLE)
+
+    def testRouting(self):
+        scheduler = Scheduler(3, 4)
+        records = dict()
+        for n in range(20):
+            sessionId = "session" + str(n)
+            records[sessionId] = list()
+            assert(scheduler.addExecutor(self.createExecutor(sessionId, records[sessionId])) == sessionId)
+        with self.assertRaises(ScxmlError):
+            scheduler.addExecutor(self.createExecutor("session0", list()))
+        with self.assertRaises(ScxmlError):
+            scheduler.sendEvent("unknown", Event("ping"))
+        for i in range(50):
+            for sessionId in records.keys():
+                scheduler.sendEvent(sessionId, Event("ping"))
+                scheduler.sendEvent(sessionId, Event("pong"))
+        assert(scheduler.waitIdle(60) == True)
+        for sessionId in records.keys():
+            # per session ordering
+            assert(records[sessionId] == ["ping", "pong"] * 50)
+            assert(scheduler.getStatus(sessionId).__len__() == 1)
+            metrics = scheduler.getMetrics(sessionId)
+            assert(metrics.getProcessed() == 100)
+            assert(metrics.getQueueDepth() == 0)
+            assert(metrics.getMaxQueueDepth() >= 1)
+            assert(metrics.getMeanLatency() > 0)
+            assert(metrics.getMaxLatency() >= metrics.getMeanLatency())
+        scheduler.shutdown()
+        assert(scheduler.getSessionIds() == [])
+        with self.assertRaises(ScxmlError):
+            scheduler.addExecutor(self.createExecutor("late", list()))
+
+    def testRemoveAndErrors(self):
+        scheduler = Scheduler(2)
+        record = list()
+        executor = self.createExecutor("s", record)
+        scheduler.addExecutor(executor)
+        scheduler.sendEvent("s", Event("fail"))
+        scheduler.sendEvent("s", Event("ping"))
+        scheduler.removeExecutor("s")
+        with self.assertRaises(ScxmlError):
+            scheduler.sendEvent("s", Event("pong"))
+        assert(scheduler.waitIdle(10) == True)
+        assert(record == ["ping"])
+        assert(executor.isRunning() == False)
+        scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
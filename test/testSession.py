@@ -0,0 +1,151 @@
+'''
+    testSession module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import sys
+from pathlib import Path
+import scxml4py.helper
+from queue import Queue
+from scxml4py.activity import AbstractActivity, ThreadedActivity
+from scxml4py.context import Context
+from scxml4py.event import Event
+from scxml4py.eventQueue import QueueType
+from scxml4py.exceptions import ScxmlError
+from scxml4py.executor import Executor
+from scxml4py.reader import Reader
+from scxml4py.session import Session
+from scxml4py.state import StateAtomic
+from scxml4py.stateMachine import StateMachine
+
+
+class FlagActivity(AbstractActivity):
+    def start(self):
+        self.setRunning(True)
+    def stop(self):
+        self.setRunning(False)
+
+
+class TestSession(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        # setup the path to the directory containing the SCXML models
+        self.mModelsPath = Path(".")
+        for x in self.mModelsPath.iterdir():
+            if x.is_dir() and x.__str__() == "models":
+                self.mModelsPath = self.mModelsPath / "models"
+                break
+            elif x.is_dir() and x.__str__() == "test":
+                self.mModelsPath = self.mModelsPath / "test" / "models"
+                break
+
+    def testSharedModelHistory(self):
+        """
+        Two executors sharing the same model keep their own history.
+        """
+        sm = Reader().read((self.mModelsPath / 'scxmlModelHistory.xml').__str__(), None, None)
+        sm.freeze()
+        ex1 = Executor(sm, Context(), theQueueType = QueueType.SIMPLE)
+        ex2 = Executor(sm, Context(), theQueueType = QueueType.SIMPLE)
+        ex1.start()
+        ex2.start()
+        for e in ["Play", "Next", "Pause"]:
+            ex1.processEvent(Event(e))
+        for e in ["Play", "Next", "Next", "Pause"]:
+            ex2.processEvent(Event(e))
+        ex1.processEvent(Event("Play"))
+        ex2.processEvent(Event("Play"))
+        assert(scxml4py.helper.formatStatus(ex1.getStatus()) == "PLAYING SONG2")
+        assert(scxml4py.helper.formatStatus(ex2.getStatus()) == "PLAYING SONG3")
+        # nothing is stored in the model
+        history = sm.findStateInMap("PLAYING.HISTORY")
+        assert(history.getHistoryValues() == [])
+        assert(ex1.getSession().getConfiguration() is ex1.getStatus())
+        ex1.stop()
+        ex2.stop()
+
+    def testFrozenModel(self):
+        sm = Reader().read((self.mModelsPath / 'scxmlModelHistory.xml').__str__(), None, None)
+        assert(sm.isFrozen() == False)
+        sm.freeze()
+        assert(sm.isFrozen() == True)
+        idle = sm.findStateInMap("IDLE")
+        with self.assertRaises(ScxmlError):
+            idle.addSubstate(StateAtomic("NEW"))
+        with self.assertRaises(ScxmlError):
+            idle.addTransition(idle, Event("e"), None, None)
+        with self.assertRaises(ScxmlError):
+            sm.addSubstate(StateAtomic("NEW"))
+        assert(idle.getSubstates() == [])
+        assert(idle.getTransitions().__len__() == 1)
+
+    def testActivities(self):
+        """
+        The first session uses the activity of the model,
+        the others their own instance.
+        """
+        s1 = StateAtomic("S1")
+        s2 = StateAtomic("S2")
+        activity = FlagActivity("myActivity")
+        s1.addActivity(activity)
+        s1.addTransition(s2, Event("e1"), None, None)
+        sm = StateMachine("ActivityStateMachine")
+        sm.addSubstate(s1)
+        sm.addSubstate(s2)
+        sm.setInitialState(s1, None)
+        sm.freeze()
+        ex1 = Executor(sm, Context(), theQueueType = QueueType.SIMPLE)
+        ex2 = Executor(sm, Context(), theQueueType = QueueType.SIMPLE)
+        ex1.start()
+        ex2.start()
+        # activities are started at the end of the next macrostep
+        ex1.processEvent(Event("tick"))
+        ex2.processEvent(Event("tick"))
+        instance = ex2.getSession().getActivity(activity)
+        assert(ex1.getSession().getActivity(activity) is activity)
+        assert(instance is not activity)
+        assert(activity.isRunning() == True)
+        assert(instance.isRunning() == True)
+        ex2.processEvent(Event("e1"))
+        assert(activity.isRunning() == True)
+        assert(instance.isRunning() == False)
+        ex1.stop()
+        assert(activity.mOwner == None)
+        ex2.stop()
+
+    def testHistoryValues(self):
+        session = Session()
+        h = object()
+        assert(session.getHistoryValues(h) == ())
+        s = StateAtomic("S")
+        session.pushHistoryValue(h, s)
+        session.pushHistoryValue(h, None)
+        assert(session.getHistoryValues(h) == [s])
+        session.clearHistoryValues(h)
+        assert(session.getHistoryValues(h) == ())
+
+    def testEventQueue(self):
+        activity = ThreadedActivity("A1", Queue())
+        queue = Queue()
+        session = Session(Context(), None, queue)
+        assert(session.getEventQueue() is queue)
+        # the prototype is not used: its queue is shared by the sessions
+        instance = session.getActivity(activity)
+        assert(instance is not activity)
+        assert(instance.mEventQueue is queue)
+        assert(activity.mOwner == None)
+        instance.sendInternalEvent(Event("done"))
+        assert(queue.get_nowait().getId() == "done")
+        assert(activity.mEventQueue.empty())
+
+    def testSize(self):
+        # the per session record is small
+        assert(sys.getsizeof(Session(Context())) < 128)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,144 @@
+'''
+    testShardedApplication module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import time
+from scxml4py.action import Action
+from scxml4py.activity import ThreadedActivity
+from scxml4py.context import EVENT_ELEMENT
+from scxml4py.event import Event, EventStatus
+from scxml4py.exceptions import ScxmlError
+from scxmlApp.shardedApplication import ShardedApplication
+
+SCXML_DOC = '''<?xml version="1.0" encoding="us-ascii"?>
+<scxml xmlns="http://www.w3.org/2005/07/scxml" xmlns:customActionDomain="http://my.custom-actions.domain/CUSTOM" version="1.0" initial="Off" name="Switch">
+  <state id="Off">
+    <transition event="toggle" target="On"/>
+  </state>
+  <state id="On">
+    <onentry>
+      <customActionDomain:ActionCount name="ActionCount"/>
+    </onentry>
+    <transition event="toggle" target="Off"/>
+  </state>
+</scxml>
+'''
+
+SCXML_TICKER = '''<?xml version="1.0" encoding="us-ascii"?>
+<scxml xmlns="http://www.w3.org/2005/07/scxml" xmlns:customActionDomain="http://my.custom-actions.domain/CUSTOM" version="1.0" initial="Idle" name="Ticker">
+  <state id="Idle">
+    <transition event="start" target="Running"/>
+  </state>
+  <state id="Running">
+    <invoke id="ActivityTicker"/>
+    <transition event="tick" cond="GuardPayload" target="Ticked"/>
+  </state>
+  <state id="Ticked">
+    <transition event="tick" target="TickedTwice"/>
+  </state>
+  <state id="TickedTwice"/>
+</scxml>
+'''
+
+SCXML_PAYLOAD = '''<?xml version="1.0" encoding="us-ascii"?>
+<scxml xmlns="http://www.w3.org/2005/07/scxml" xmlns:customActionDomain="http://my.custom-actions.domain/CUSTOM" version="1.0" initial="Idle" name="Payload">
+  <state id="Idle">
+    <transition event="tick" cond="GuardPayload" target="Ticked"/>
+  </state>
+  <state id="Ticked"/>
+</scxml>
+'''
+
+class ActivityTicker(ThreadedActivity):
+    def __init__(self, theEventQueue, theData):
+        ThreadedActivity.__init__(self, "ActivityTicker", theEventQueue, theData)
+    def run(self):
+        # once all the sessions are running
+        time.sleep(0.3)
+        self.sendInternalEvent(Event("tick", theData = "payload"))
+
+
+class GuardPayload(Action):
+    def __init__(self, theData):
+        Action.__init__(self, "GuardPayload", None, theData)
+    def evaluate(self, theCtx):
+        return theCtx.getElement(EVENT_ELEMENT).data == "payload"
+
+
+class ActionCount(Action):
+    def __init__(self, theData):
+        Action.__init__(self, "ActionCount", None, theData)
+        self.mCounter = dict()
+    def execute(self, theCtx):
+        # one action instance is shared by the sessions of a shard
+        sessionId = theCtx.getSessionId()
+        self.mCounter[sessionId] = self.mCounter.get(sessionId, 0) + 1
+
+
+class TestShardedApplication(unittest.TestCase):
+
+    def testSessions(self):
+        app = ShardedApplication(SCXML_DOC, [ActionCount], [], None, 2)
+        app.start()
+        try:
+            sessions = ["device" + str(n) for n in range(10)]
+            for sessionId in sessions:
+                assert(app.create_session(sessionId) == ("Off",))
+            with self.assertRaises(ScxmlError):
+                app.create_session("device0")
+            assert(sorted(app.get_sessions()) == sorted(sessions))
+            assert(set([app.get_shard(s) for s in sessions]) == set([0, 1]))
+            status, configuration = app.send_signal("device1", "toggle")
+            assert(status == EventStatus.PROCESSED.value)
+            assert(configuration == ("On",))
+            status, configuration = app.send_signal("device1", "unknown")
+            assert(status == EventStatus.IGNORED.value)
+            # without waiting for the run to completion
+            assert(app.send_signal("device2", "toggle", False) == None)
+            assert(app.get_current_status("device2") == "On")
+            assert(app.get_current_status("device3") == "Off")
+            app.delete_session("device3")
+            with self.assertRaises(ScxmlError):
+                app.get_current_status("device3")
+        finally:
+            app.terminate()
+
+    def testEventData(self):
+        app = ShardedApplication(SCXML_PAYLOAD, [GuardPayload], [], None, 1)
+        app.start()
+        try:
+            app.create_session("device1")
+            status, configuration = app.send_signal("device1", "tick")
+            assert(status == EventStatus.IGNORED.value)
+            status, configuration = app.send_signal("device1", "tick", data = "payload")
+            assert(status == EventStatus.PROCESSED.value)
+            assert(configuration == ("Ticked",))
+        finally:
+            app.terminate()
+
+    def testActivityEvents(self):
+        """
+        The event posted by the activity of a session is delivered, with
+        its payload, to that session only, even in a shard shared by other
+        sessions running the same activity.
+        """
+        app = ShardedApplication(SCXML_TICKER, [GuardPayload], [ActivityTicker], None, 1)
+        app.start()
+        try:
+            sessions = ["device1", "device2"]
+            for sessionId in sessions:
+                app.create_session(sessionId)
+                app.send_signal(sessionId, "start")
+            time.sleep(1)
+            for sessionId in sessions:
+                assert(app.get_current_status(sessionId) == "Ticked")
+        finally:
+            app.terminate()
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
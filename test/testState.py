@@ -179,6 +179,23 @@ class TestState(unittest.TestCase):
         assert(s1.getHistoryValues().__len__() == 0)
         assert(s == s2)
 
+    def testStateIdentity(self):
+        s1 = StateAtomic("S1")
+        s2 = StateAtomic("S1")
+        assert(s1 == s1)
+        assert(s1 != s2)
+        assert(s1 != None)
+        assert(s1.getNodeId() != s2.getNodeId())
+        assert(s1 < s2)
+        assert(hash(s1) == s1.getNodeId())
+        assert(s1 in {s1})
+        assert(s2 not in {s1})
+        # equality does not depend on the string representation
+        c = StateCompound("C")
+        c.addSubstate(s1)
+        assert(c == c)
+        assert(c.__str__() != s1.__str__())
+
     def testStateCloneAtomic(self):
         statesMap = {}
         a = StateAtomic("A")
@@ -0,0 +1,146 @@
+'''
+    testStreamReader module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import tracemalloc
+from pathlib import Path
+import scxml4py.helper
+from scxml4py.action import Action
+from scxml4py.activity import ThreadedActivity
+from scxml4py.benchmark import generateModel, createStubs
+from scxml4py.context import Context
+from scxml4py.event import Event
+from scxml4py.exceptions import ScxmlSyntaxError
+from scxml4py.executor import Executor
+from scxml4py.reader import Reader
+from scxml4py.streamReader import StreamReader
+
+
+class GuardTrue(Action):
+    def __init__(self, theId):
+        Action.__init__(self, theId)
+    def evaluate(self, theCtx):
+        return True
+
+
+MODEL_FORWARD = """<?xml version="1.0" encoding="us-ascii"?>
+<scxml xmlns="http://www.w3.org/2005/07/scxml" version="1.0" initial="S1">
+  <state id="S1">
+    <transition event="e1" target="S3"/>
+  </state>
+  <state id="S2">
+    <transition event="e2" target="S1"/>
+  </state>
+  <state id="S3">
+    <initial>
+      <transition target="S32"/>
+    </initial>
+    <state id="S31"/>
+    <state id="S32">
+      <transition event="e3" target="S2"/>
+    </state>
+  </state>
+</scxml>
+"""
+
+MODEL_MISSING_TARGET = """<?xml version="1.0" encoding="us-ascii"?>
+<scxml xmlns="http://www.w3.org/2005/07/scxml" version="1.0" initial="S1">
+  <state id="S1">
+    <transition event="e1" target="S9"/>
+  </state>
+</scxml>
+"""
+
+MODEL_STATE_AND_PARALLEL = """<?xml version="1.0" encoding="us-ascii"?>
+<scxml xmlns="http://www.w3.org/2005/07/scxml" version="1.0" initial="S1">
+  <state id="S1">
+    <state id="S11"/>
+    <parallel id="P1"/>
+  </state>
+</scxml>
+"""
+
+
+class ChildrenReader(StreamReader):
+    """
+    Record the largest number of children of the open state elements.
+    """
+    def __init__(self):
+        StreamReader.__init__(self)
+        self.mMaxChildren = 0
+    def endState(self, frame, parentFrame):
+        self.mMaxChildren = max(self.mMaxChildren, parentFrame.mElement.__len__())
+        StreamReader.endState(self, frame, parentFrame)
+    def endElement(self, element, frame):
+        self.mMaxChildren = max(self.mMaxChildren, frame.mElement.__len__())
+        StreamReader.endElement(self, element, frame)
+
+
+class TestStreamReader(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self.mModelsPath = Path(__file__).parent / "models"
+
+    def testSameModel(self):
+        actionList = [Action("logEntry"), Action("logExit"), Action("logTrans"), GuardTrue("logGuard"),
+                      Action("myEntryAction"), Action("myExitAction"), Action("myTransAction"), GuardTrue("myGuard")]
+        activityList = [ThreadedActivity("activityTest"), ThreadedActivity("myRecordingActivity")]
+        for name in ["scxmlModel1.xml", "scxmlModelCloned.xml", "scxmlModelHistory.xml", "scxmlModelParallel.xml"]:
+            fileName = (self.mModelsPath / name).__str__()
+            sm = Reader().read(fileName, actionList, activityList)
+            sm1 = StreamReader().read(fileName, actionList, activityList)
+            assert(sm1.getId() == sm.getId())
+            assert(scxml4py.helper.formatModel(sm1) == scxml4py.helper.formatModel(sm))
+            assert(sorted(sm1.mStatesMap.keys()) == sorted(sm.mStatesMap.keys()))
+            assert([s.getAbsoluteId() for s in sm1.getIndex().getStates()] == [s.getAbsoluteId() for s in sm.getIndex().getStates()])
+
+    def testForwardTargets(self):
+        sm = StreamReader().readString("forward", MODEL_FORWARD, None, None)
+        assert(sm.findStateInMap("S3.S32") != None)
+        ex = Executor(sm, Context())
+        ex.start()
+        assert(scxml4py.helper.formatStatus(ex.getStatus()) == "S1")
+        ex.processEvent(Event("e1"))
+        assert(scxml4py.helper.formatStatus(ex.getStatus()) == "S3 S32")
+        ex.processEvent(Event("e3"))
+        assert(scxml4py.helper.formatStatus(ex.getStatus()) == "S2")
+        ex.stop()
+
+    def testSyntaxErrors(self):
+        with self.assertRaises(ScxmlSyntaxError):
+            StreamReader().readString("missing", MODEL_MISSING_TARGET, None, None)
+        with self.assertRaises(ScxmlSyntaxError):
+            StreamReader().readString("mixed", MODEL_STATE_AND_PARALLEL, None, None)
+        with self.assertRaises(ScxmlSyntaxError):
+            # custom actions not provided
+            StreamReader().read((self.mModelsPath / "scxmlModel1.xml").__str__(), None, None)
+
+    def testMemory(self):
+        text, events = generateModel(3, 4, 4, 0.5)
+        actionList, activityList = createStubs(text)
+        data = text.encode("utf-8")
+        peaks = list()
+        for reader in [Reader(), StreamReader()]:
+            tracemalloc.start()
+            sm = reader.readString("model", data, actionList, activityList)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        assert(peaks[1] < peaks[0])
+
+    def testConsumedElements(self):
+        # the consumed elements are removed from their parent: only the
+        # ones read ahead by the parser are kept, whatever the size of the model
+        text, events = generateModel(1, 1000, 0, 0.5)
+        actionList, activityList = createStubs(text)
+        reader = ChildrenReader()
+        reader.readString("model", text, actionList, activityList)
+        assert(reader.mMaxChildren < 100)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,108 @@
+'''
+    testTrace module part of scxml4py unit tests.
+
+    @authors: landolfa
+'''
+
+import unittest
+import logging
+import scxml4py.trace
+from scxml4py.trace import LazyFormat
+from scxml4py.context import Context
+from scxml4py.event import Event
+from scxml4py.state import StateAtomic
+from scxml4py.stateMachine import StateMachine
+from scxml4py.executor import Executor
+
+
+class RecordHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.mRecords = list()
+    def emit(self, record):
+        self.mRecords.append(record.getMessage())
+
+
+class TestTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.mLogger = logging.getLogger("scxml4py")
+        self.mLevel = self.mLogger.level
+        self.mPropagate = self.mLogger.propagate
+        self.mLogger.propagate = False
+        self.mHandler = RecordHandler()
+        self.mLogger.addHandler(self.mHandler)
+
+    def tearDown(self):
+        self.mLogger.removeHandler(self.mHandler)
+        self.mLogger.setLevel(self.mLevel)
+        self.mLogger.propagate = self.mPropagate
+        scxml4py.trace.setEnabled(True)
+
+    def createExecutor(self):
+        s1 = StateAtomic("S1")
+        s2 = StateAtomic("S2")
+        s1.addTransition(s2, Event("e1"), None, None)
+        sm = StateMachine("TraceStateMachine")
+        sm.addSubstate(s1)
+        sm.addSubstate(s2)
+        sm.setInitialState(s1, None)
+        return Executor(sm, Context())
+
+    def testLazyFormat(self):
+        calls = list()
+        def format(value):
+            calls.append(value)
+            return "<" + value + ">"
+        self.mLogger.setLevel(logging.INFO)
+        self.mLogger.debug("Status: %s", LazyFormat(format, "S1"))
+        assert(calls.__len__() == 0)
+        self.mLogger.info("Status: %s", LazyFormat(format, "S1"))
+        assert(calls == ["S1"])
+        assert(self.mHandler.mRecords[-1] == "Status: <S1>")
+
+    def testDebugEnabled(self):
+        self.mLogger.setLevel(logging.DEBUG)
+        assert(scxml4py.trace.isDebugEnabled() == True)
+        scxml4py.trace.setEnabled(False)
+        assert(scxml4py.trace.isEnabled() == False)
+        assert(scxml4py.trace.isDebugEnabled() == False)
+        scxml4py.trace.setEnabled(True)
+        self.mLogger.setLevel(logging.INFO)
+        assert(scxml4py.trace.isDebugEnabled() == False)
+
+    def testExecutorTraces(self):
+        self.mLogger.setLevel(logging.DEBUG)
+        executor = self.createExecutor()
+        executor.start()
+        executor.processEvent(Event("e1"))
+        assert(executor.mTrace == True)
+        assert("Entering state <S2>" in self.mHandler.mRecords)
+        # tracing switched off: the hot loop does not produce any record
+        scxml4py.trace.setEnabled(False)
+        executor = self.createExecutor()
+        self.mHandler.mRecords.clear()
+        executor.start()
+        executor.processEvent(Event("e1"))
+        assert(executor.mTrace == False)
+        assert("Entering state <S2>" not in self.mHandler.mRecords)
+        assert("Selected transitions" not in " ".join(self.mHandler.mRecords))
+        assert("Adding event <e1> to the external queue" not in self.mHandler.mRecords)
+
+    def testTraceLevelChange(self):
+        # the first event after the change uses the new level
+        self.mLogger.setLevel(logging.INFO)
+        executor = self.createExecutor()
+        executor.start()
+        self.mLogger.setLevel(logging.DEBUG)
+        executor.processEvent(Event("e1"))
+        assert("Adding event <e1> to the external queue" in self.mHandler.mRecords)
+        self.mLogger.setLevel(logging.INFO)
+        self.mHandler.mRecords.clear()
+        executor.processEvent(Event("e2"))
+        assert(self.mHandler.mRecords == [])
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -99,6 +99,12 @@ class TestTransition(unittest.TestCase):
         t2.addTarget(s1)
         assert(t1 != t2)
         assert(t1 == t1)
+        assert(t1 < t2)
+        assert(t1 in {t1})
+        assert(t2 not in {t1})
+        # transitions are equal only if they are the same instance
+        t3 = t1.clone(1, s1, {})
+        assert(t3 != t1)
         
     def testClone(self):
         e = Event("e")